@@ -0,0 +1,61 @@
+"""add search_docs and search_postings (BM25 index over element and constraint text)
+
+Revision ID: a4e9c1f6b8d2
+Revises: f7a3d8c1e6b4
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4e9c1f6b8d2"
+down_revision: Union[str, Sequence[str], None] = "f7a3d8c1e6b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "search_docs",
+        sa.Column(
+            "package_id",
+            sa.Integer(),
+            sa.ForeignKey("packages.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("doc_id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "artifact_id",
+            sa.Integer(),
+            sa.ForeignKey("artifacts.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "path_id", sa.Integer(), sa.ForeignKey("element_paths.id"), nullable=False
+        ),
+        sa.Column("kind", sa.Text(), nullable=False),
+        sa.Column("key", sa.Text(), nullable=True),
+        sa.Column("snippet", sa.Text(), nullable=True),
+    )
+    op.create_table(
+        "search_postings",
+        sa.Column(
+            "package_id",
+            sa.Integer(),
+            sa.ForeignKey("packages.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("term", sa.Text(), primary_key=True),
+        sa.Column("doc_ids", sa.LargeBinary(), nullable=False),
+        sa.Column("weights", sa.LargeBinary(), nullable=False),
+    )
+    # The index is filled by the sd-elements / sd-constraints loaders or `build-search-index`.
+
+
+def downgrade() -> None:
+    op.drop_table("search_postings")
+    op.drop_table("search_docs")
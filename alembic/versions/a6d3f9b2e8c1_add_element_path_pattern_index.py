@@ -0,0 +1,40 @@
+"""add text_pattern_ops index on element_paths.path for subtree queries
+
+Revision ID: a6d3f9b2e8c1
+Revises: f4c8e1a9d2b6
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a6d3f9b2e8c1"
+down_revision: Union[str, Sequence[str], None] = "f4c8e1a9d2b6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_element_paths_path_pattern",
+            "element_paths",
+            ["path"],
+            postgresql_ops={"path": "text_pattern_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_element_paths_path_pattern",
+            table_name="element_paths",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,30 @@
+"""add packages.generation ingest counter
+
+Revision ID: b3e1f7a2c6d4
+Revises: 9a1c5b0c2f3b
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b3e1f7a2c6d4"
+down_revision: Union[str, Sequence[str], None] = "9a1c5b0c2f3b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bumped by every import/loader run; in-process caches poll it to know when to rebuild.
+    op.add_column(
+        "packages",
+        sa.Column("generation", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("packages", "generation")
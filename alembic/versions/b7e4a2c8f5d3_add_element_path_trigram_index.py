@@ -0,0 +1,44 @@
+"""add pg_trgm GIN index on element_paths.path for element search
+
+Revision ID: b7e4a2c8f5d3
+Revises: a6d3f9b2e8c1
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e4a2c8f5d3"
+down_revision: Union[str, Sequence[str], None] = "a6d3f9b2e8c1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_element_paths_path_trgm",
+            "element_paths",
+            ["path"],
+            postgresql_using="gin",
+            postgresql_ops={"path": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    # pg_trgm is left installed; later migrations or other schemas may use it.
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_element_paths_path_trgm",
+            table_name="element_paths",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,77 @@
+"""add ValueSet reverse, partial mustSupport, covering binding listing and constraint listing indexes
+
+Revision ID: c5d2a8e4f1b7
+Revises: b3e1f7a2c6d4
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d2a8e4f1b7"
+down_revision: Union[str, Sequence[str], None] = "b3e1f7a2c6d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, include, where)
+INDEXES = [
+    # /gq/value-set/where-used: lookup by value_set without touching the heap.
+    (
+        "ix_sd_binding_value_set_covering",
+        "sd_bindings",
+        ["value_set"],
+        ["artifact_id", "path", "strength", "source_choice"],
+        None,
+    ),
+    # mustSupport listing/count: only the must-support slice of each profile.
+    (
+        "ix_sd_element_must_support",
+        "sd_elements",
+        ["artifact_id", "path"],
+        ["min", "max"],
+        "must_support IS TRUE",
+    ),
+    # Per-profile binding listing ordered by (path, strength, value_set).
+    (
+        "ix_sd_binding_listing_covering",
+        "sd_bindings",
+        ["artifact_id", "path", "strength", "value_set"],
+        ["source_choice"],
+        None,
+    ),
+    # Per-profile constraint listing ordered by (path, key); the unbounded human/expression
+    # text is read from the heap (it would bloat the index and can exceed the btree row limit).
+    (
+        "ix_sd_constraint_listing",
+        "sd_constraints",
+        ["artifact_id", "path", "key"],
+        ["severity", "source_choice"],
+        None,
+    ),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for name, table, columns, include, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_include=include,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _include, _where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,74 @@
+"""add full-text search vector and expression trigram index to sd_constraints
+
+Revision ID: c9f1d4e7a3b5
+Revises: b7e4a2c8f5d3
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c9f1d4e7a3b5"
+down_revision: Union[str, Sequence[str], None] = "b7e4a2c8f5d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.db.models.CONSTRAINT_SEARCH_VECTOR.
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(key, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(human, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(expression, '')), 'C') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(expression, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "sd_constraints",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR, persisted=True),
+        ),
+    )
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_sd_constraint_search_vector",
+            "sd_constraints",
+            ["search_vector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_sd_constraint_expression_trgm",
+            "sd_constraints",
+            ["expression"],
+            postgresql_using="gin",
+            postgresql_ops={"expression": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_sd_constraint_expression_trgm",
+            table_name="sd_constraints",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_sd_constraint_search_vector",
+            table_name="sd_constraints",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("sd_constraints", "search_vector")
@@ -0,0 +1,83 @@
+"""add sd_element_type_refs for profile/extension where-used
+
+Revision ID: d1b6e8a4c2f9
+Revises: c9f1d4e7a3b5
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d1b6e8a4c2f9"
+down_revision: Union[str, Sequence[str], None] = "c9f1d4e7a3b5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sd_element_type_refs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "artifact_id",
+            sa.Integer(),
+            sa.ForeignKey("artifacts.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("path_id", sa.Integer(), sa.ForeignKey("element_paths.id"), nullable=False),
+        sa.Column("kind", sa.Text(), nullable=False),
+        sa.Column("code", sa.Text(), nullable=False),
+        sa.Column("ref_canonical", sa.Text(), nullable=False),
+        sa.UniqueConstraint(
+            "artifact_id", "path_id", "kind", "code", "ref_canonical", name="uq_sd_element_type_ref"
+        ),
+    )
+    op.create_index(
+        "ix_sd_element_type_ref_canonical",
+        "sd_element_type_refs",
+        ["ref_canonical", "kind"],
+        postgresql_include=["artifact_id", "path_id", "code"],
+    )
+    op.create_index(
+        "ix_sd_element_type_ref_artifact_id", "sd_element_type_refs", ["artifact_id"]
+    )
+
+    # Backfill from the stored element JSON. sd_elements keeps one row per path, so refs
+    # that only appear on other slices of the same path arrive on the next load-sd-elements.
+    op.execute(
+        sa.text(
+            """
+            INSERT INTO sd_element_type_refs (artifact_id, path_id, kind, code, ref_canonical)
+            SELECT DISTINCT e.artifact_id, e.path_id, r.kind, t->>'code', split_part(r.ref, '|', 1)
+            FROM sd_elements e
+            JOIN sd_json_blobs b ON b.content_hash = e.raw_json_hash
+            CROSS JOIN LATERAL jsonb_array_elements(
+                CASE WHEN jsonb_typeof(b.body->'type') = 'array' THEN b.body->'type' ELSE '[]' END
+            ) AS t
+            CROSS JOIN LATERAL (
+                SELECT 'profile' AS kind, p AS ref
+                FROM jsonb_array_elements_text(
+                    CASE WHEN jsonb_typeof(t->'profile') = 'array' THEN t->'profile' ELSE '[]' END
+                ) AS p
+                UNION ALL
+                SELECT 'targetProfile', p
+                FROM jsonb_array_elements_text(
+                    CASE WHEN jsonb_typeof(t->'targetProfile') = 'array'
+                         THEN t->'targetProfile' ELSE '[]' END
+                ) AS p
+            ) AS r
+            WHERE coalesce(t->>'code', '') <> '' AND r.ref <> ''
+            ON CONFLICT DO NOTHING
+            """
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sd_element_type_ref_artifact_id", table_name="sd_element_type_refs")
+    op.drop_index("ix_sd_element_type_ref_canonical", table_name="sd_element_type_refs")
+    op.drop_table("sd_element_type_refs")
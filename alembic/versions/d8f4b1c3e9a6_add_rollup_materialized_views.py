@@ -0,0 +1,76 @@
+"""add artifact_fact_counts and value_set_usage_matrix materialized views
+
+Revision ID: d8f4b1c3e9a6
+Revises: c5d2a8e4f1b7
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d8f4b1c3e9a6"
+down_revision: Union[str, Sequence[str], None] = "c5d2a8e4f1b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        sa.text(
+            """
+            CREATE MATERIALIZED VIEW artifact_fact_counts AS
+            SELECT
+                a.id AS artifact_id,
+                a.package_id,
+                (SELECT count(*) FROM sd_elements e
+                  WHERE e.artifact_id = a.id AND e.must_support IS TRUE) AS must_support_count,
+                (SELECT count(*) FROM sd_bindings b WHERE b.artifact_id = a.id) AS binding_count,
+                (SELECT count(*) FROM sd_constraints c WHERE c.artifact_id = a.id) AS constraint_count
+            FROM artifacts a
+            """
+        )
+    )
+    # REFRESH ... CONCURRENTLY requires a unique index on the view.
+    op.create_index(
+        "uq_artifact_fact_counts_artifact", "artifact_fact_counts", ["artifact_id"], unique=True
+    )
+
+    op.execute(
+        sa.text(
+            """
+            CREATE MATERIALIZED VIEW value_set_usage_matrix AS
+            SELECT
+                a.package_id,
+                b.value_set,
+                count(*) FILTER (WHERE b.strength = 'required') AS required_count,
+                count(*) FILTER (WHERE b.strength = 'extensible') AS extensible_count,
+                count(*) FILTER (WHERE b.strength = 'preferred') AS preferred_count,
+                count(*) FILTER (WHERE b.strength = 'example') AS example_count,
+                count(*) FILTER (
+                    WHERE b.strength IS NULL
+                       OR b.strength NOT IN ('required', 'extensible', 'preferred', 'example')
+                ) AS other_count,
+                count(*) AS total_count,
+                count(DISTINCT b.artifact_id) AS profile_count
+            FROM sd_bindings b
+            JOIN artifacts a ON a.id = b.artifact_id
+            WHERE b.value_set <> ''
+            GROUP BY a.package_id, b.value_set
+            """
+        )
+    )
+    op.create_index(
+        "uq_value_set_usage_matrix_pkg_vs",
+        "value_set_usage_matrix",
+        ["package_id", "value_set"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.execute(sa.text("DROP MATERIALIZED VIEW IF EXISTS value_set_usage_matrix"))
+    op.execute(sa.text("DROP MATERIALIZED VIEW IF EXISTS artifact_fact_counts"))
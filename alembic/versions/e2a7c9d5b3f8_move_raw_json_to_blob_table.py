@@ -0,0 +1,94 @@
+"""move raw JSON out of sd_* tables into deduplicated sd_json_blobs
+
+Revision ID: e2a7c9d5b3f8
+Revises: d8f4b1c3e9a6
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+import hashlib
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2a7c9d5b3f8"
+down_revision: Union[str, Sequence[str], None] = "d8f4b1c3e9a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, old json column, new hash column)
+MOVES = [
+    ("sd_elements", "raw_json", "raw_json_hash"),
+    ("sd_bindings", "binding_json", "binding_json_hash"),
+    ("sd_constraints", "constraint_json", "constraint_json_hash"),
+]
+
+BATCH = 1000
+
+
+def _content_hash(body) -> str:
+    # Frozen copy of app.db.blobs.content_hash.
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sd_json_blobs",
+        sa.Column("content_hash", sa.Text(), primary_key=True),
+        sa.Column("body", postgresql.JSONB(), nullable=False),
+    )
+    op.execute("ALTER TABLE sd_json_blobs ALTER COLUMN body SET COMPRESSION lz4")
+
+    conn = op.get_bind()
+    insert_blob = sa.text(
+        "INSERT INTO sd_json_blobs (content_hash, body) VALUES (:h, CAST(:b AS jsonb)) "
+        "ON CONFLICT (content_hash) DO NOTHING"
+    )
+    for table, old_col, new_col in MOVES:
+        op.add_column(table, sa.Column(new_col, sa.Text(), nullable=True))
+        rows = conn.execute(
+            sa.text(f"SELECT id, {old_col} FROM {table} WHERE {old_col} IS NOT NULL")
+        ).all()
+        set_hash = sa.text(f"UPDATE {table} SET {new_col} = :h WHERE id = :id")
+        seen: set[str] = set()
+        for start in range(0, len(rows), BATCH):
+            blobs, updates = [], []
+            for row_id, body in rows[start : start + BATCH]:
+                digest = _content_hash(body)
+                if digest not in seen:
+                    seen.add(digest)
+                    blobs.append({"h": digest, "b": json.dumps(body)})
+                updates.append({"h": digest, "id": row_id})
+            if blobs:
+                conn.execute(insert_blob, blobs)
+            conn.execute(set_hash, updates)
+        op.create_foreign_key(
+            f"fk_{table}_{new_col}", table, "sd_json_blobs", [new_col], ["content_hash"]
+        )
+        op.drop_column(table, old_col)
+
+    # types_json / slicing_json are sub-objects of the element JSON now stored as a blob.
+    op.drop_column("sd_elements", "types_json")
+    op.drop_column("sd_elements", "slicing_json")
+
+
+def downgrade() -> None:
+    op.add_column("sd_elements", sa.Column("slicing_json", postgresql.JSONB(), nullable=True))
+    op.add_column("sd_elements", sa.Column("types_json", postgresql.JSONB(), nullable=True))
+    for table, old_col, new_col in reversed(MOVES):
+        op.add_column(table, sa.Column(old_col, postgresql.JSONB(), nullable=True))
+        op.execute(
+            f"UPDATE {table} t SET {old_col} = b.body "
+            f"FROM sd_json_blobs b WHERE b.content_hash = t.{new_col}"
+        )
+        op.drop_constraint(f"fk_{table}_{new_col}", table, type_="foreignkey")
+        op.drop_column(table, new_col)
+    op.execute(
+        "UPDATE sd_elements SET types_json = raw_json -> 'type', slicing_json = raw_json -> 'slicing'"
+    )
+    op.drop_table("sd_json_blobs")
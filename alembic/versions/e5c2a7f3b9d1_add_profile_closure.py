@@ -0,0 +1,74 @@
+"""add profile_closure (transitive baseDefinition lineage)
+
+Revision ID: e5c2a7f3b9d1
+Revises: d1b6e8a4c2f9
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5c2a7f3b9d1"
+down_revision: Union[str, Sequence[str], None] = "d1b6e8a4c2f9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "profile_closure",
+        sa.Column(
+            "ancestor_id",
+            sa.Integer(),
+            sa.ForeignKey("artifacts.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "descendant_id",
+            sa.Integer(),
+            sa.ForeignKey("artifacts.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("depth", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "ix_profile_closure_descendant",
+        "profile_closure",
+        ["descendant_id", "depth"],
+        postgresql_include=["ancestor_id"],
+    )
+
+    # One-time backfill; same parent resolution as app.ingest.lineage._parent_map
+    # (same package first, then unversioned, highest version, newest id).
+    op.execute(
+        sa.text(
+            """
+            WITH RECURSIVE parent AS (
+                SELECT DISTINCT ON (c.id) c.id AS child_id, p.id AS parent_id
+                FROM artifacts c
+                JOIN artifacts p ON p.canonical_url = c.base_definition AND p.id <> c.id
+                ORDER BY c.id, (p.package_id = c.package_id) DESC, (p.version IS NULL) DESC,
+                         p.version DESC, p.id DESC
+            ),
+            closure (ancestor_id, descendant_id, depth, trail) AS (
+                SELECT id, id, 0, ARRAY[id] FROM artifacts
+                UNION ALL
+                SELECT pr.parent_id, cl.descendant_id, cl.depth + 1, cl.trail || pr.parent_id
+                FROM closure cl
+                JOIN parent pr ON pr.child_id = cl.ancestor_id
+                WHERE NOT pr.parent_id = ANY (cl.trail)
+            )
+            INSERT INTO profile_closure (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, descendant_id, depth FROM closure
+            """
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_profile_closure_descendant", table_name="profile_closure")
+    op.drop_table("profile_closure")
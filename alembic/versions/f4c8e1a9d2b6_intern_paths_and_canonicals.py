@@ -0,0 +1,150 @@
+"""intern element paths and canonical URLs into dictionary tables
+
+Revision ID: f4c8e1a9d2b6
+Revises: e2a7c9d5b3f8
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f4c8e1a9d2b6"
+down_revision: Union[str, Sequence[str], None] = "e2a7c9d5b3f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FACT_TABLES = ["sd_elements", "sd_bindings", "sd_constraints"]
+
+# (name, table, columns) of the unique constraints keyed on path.
+UNIQUES = [
+    ("uq_sd_element_artifact_path", "sd_elements", ["artifact_id", "{path}"]),
+    ("uq_sd_bindings_artifact_path_valueset", "sd_bindings", ["artifact_id", "{path}", "value_set"]),
+    ("uq_sd_constraint_artifact_path_key", "sd_constraints", ["artifact_id", "{path}", "key"]),
+]
+
+# (name, table, columns, include, where) of every index touching path or canonical.
+INDEXES = [
+    ("ix_sd_element_{canonical_name}_path", "sd_elements", ["{canonical}", "{path}"], None, None),
+    ("ix_sd_binding_{canonical_name}_path", "sd_bindings", ["{canonical}", "{path}"], None, None),
+    ("ix_sd_constraint_{canonical_name}_path", "sd_constraints", ["{canonical}", "{path}"], None, None),
+    (
+        "ix_sd_binding_value_set_covering",
+        "sd_bindings",
+        ["value_set"],
+        ["artifact_id", "{path}", "strength", "source_choice"],
+        None,
+    ),
+    (
+        "ix_sd_element_must_support",
+        "sd_elements",
+        ["artifact_id", "{path}"],
+        ["min", "max"],
+        "must_support IS TRUE",
+    ),
+    (
+        "ix_sd_binding_listing_covering",
+        "sd_bindings",
+        ["artifact_id", "{path}", "strength", "value_set"],
+        ["source_choice"],
+        None,
+    ),
+    (
+        "ix_sd_constraint_listing",
+        "sd_constraints",
+        ["artifact_id", "{path}", "key"],
+        ["severity", "source_choice"],
+        None,
+    ),
+]
+
+
+def _cols(columns, path: str, canonical: str) -> list[str]:
+    return [c.format(path=path, canonical=canonical) for c in columns]
+
+
+def _create_keys(path: str, canonical: str, canonical_name: str) -> None:
+    for name, table, columns in UNIQUES:
+        op.create_unique_constraint(name, table, _cols(columns, path, canonical))
+    for name, table, columns, include, where in INDEXES:
+        op.create_index(
+            name.format(canonical_name=canonical_name),
+            table,
+            _cols(columns, path, canonical),
+            postgresql_include=_cols(include, path, canonical) if include else None,
+            postgresql_where=sa.text(where) if where else None,
+        )
+
+
+def upgrade() -> None:
+    op.create_table(
+        "element_paths",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("path", sa.Text(), nullable=False, unique=True),
+    )
+    op.create_table(
+        "canonicals",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("url", sa.Text(), nullable=False, unique=True),
+    )
+
+    union_paths = " UNION ".join(f"SELECT path FROM {t}" for t in FACT_TABLES)
+    union_urls = " UNION ".join(f"SELECT sd_canonical_url FROM {t}" for t in FACT_TABLES)
+    op.execute(sa.text(f"INSERT INTO element_paths (path) SELECT path FROM ({union_paths}) p ORDER BY path"))
+    op.execute(
+        sa.text(
+            f"INSERT INTO canonicals (url) SELECT sd_canonical_url FROM ({union_urls}) c "
+            "ORDER BY sd_canonical_url"
+        )
+    )
+
+    for table in FACT_TABLES:
+        op.add_column(table, sa.Column("path_id", sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column("canonical_id", sa.Integer(), nullable=True))
+        op.execute(
+            sa.text(
+                f"""
+                UPDATE {table} t
+                SET path_id = p.id, canonical_id = c.id
+                FROM element_paths p, canonicals c
+                WHERE p.path = t.path AND c.url = t.sd_canonical_url
+                """
+            )
+        )
+        op.alter_column(table, "path_id", nullable=False)
+        op.alter_column(table, "canonical_id", nullable=False)
+        op.create_foreign_key(f"fk_{table}_path_id", table, "element_paths", ["path_id"], ["id"])
+        op.create_foreign_key(f"fk_{table}_canonical_id", table, "canonicals", ["canonical_id"], ["id"])
+        # Drops the text-keyed unique constraints and indexes along with the columns.
+        op.drop_column(table, "path")
+        op.drop_column(table, "sd_canonical_url")
+
+    _create_keys("path_id", "canonical_id", "canonical")
+
+
+def downgrade() -> None:
+    for table in FACT_TABLES:
+        op.add_column(table, sa.Column("path", sa.Text(), nullable=True))
+        op.add_column(table, sa.Column("sd_canonical_url", sa.Text(), nullable=True))
+        op.execute(
+            sa.text(
+                f"""
+                UPDATE {table} t
+                SET path = p.path, sd_canonical_url = c.url
+                FROM element_paths p, canonicals c
+                WHERE p.id = t.path_id AND c.id = t.canonical_id
+                """
+            )
+        )
+        op.alter_column(table, "path", nullable=False)
+        op.alter_column(table, "sd_canonical_url", nullable=False)
+        op.drop_column(table, "path_id")
+        op.drop_column(table, "canonical_id")
+
+    _create_keys("path", "sd_canonical_url", "sd_canonical")
+
+    op.drop_table("canonicals")
+    op.drop_table("element_paths")
@@ -0,0 +1,46 @@
+"""add normalized content_hash columns to sd_elements, sd_bindings and sd_constraints
+
+Revision ID: f7a3d8c1e6b4
+Revises: e5c2a7f3b9d1
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f7a3d8c1e6b4"
+down_revision: Union[str, Sequence[str], None] = "e5c2a7f3b9d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.db.models.fact_hash() and the *_FACT_COLUMNS tuples.
+FACT_COLUMNS = {
+    "sd_elements": ("min", "max", "must_support", "is_modifier", "is_summary", "raw_json_hash"),
+    "sd_bindings": ("strength", "value_set"),
+    "sd_constraints": ("severity", "human", "expression"),
+}
+
+
+def _fact_hash(columns: tuple[str, ...]) -> str:
+    parts = " || E'\\x1f' || ".join(f"coalesce('v' || {column}::text, 'n')" for column in columns)
+    return f"decode(md5({parts}), 'hex')"
+
+
+def upgrade() -> None:
+    # Adding a stored generated column rewrites the table and fills it for existing rows.
+    for table, columns in FACT_COLUMNS.items():
+        op.add_column(
+            table,
+            sa.Column(
+                "content_hash", sa.LargeBinary(), sa.Computed(_fact_hash(columns), persisted=True)
+            ),
+        )
+
+
+def downgrade() -> None:
+    for table in FACT_COLUMNS:
+        op.drop_column(table, "content_hash")
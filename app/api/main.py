@@ -1,38 +1,98 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from contextlib import asynccontextmanager
 from typing import Optional, List
 
-from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi import Depends, FastAPI, Query, Request
 from fastapi.responses import JSONResponse
-from sqlalchemy import select, desc, func
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
-from app.api.db import get_session
-from app.db.models import Artifact, Package, SDBinding, SDElement, SDConstraint
+from app.api.db import SessionLocal, get_session
+from app.facts.aliases import ProfileAliasStore
+from app.facts.db import DbFacts
+from app.facts.provider import FACTS_REFRESH_SECONDS, FactsProvider
+from app.facts.slot_terms import SlotTermsStore
+from app.service import gq
+from app.service.gq import ServiceError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    provider = FactsProvider(SessionLocal)
+    provider.start()
+    app.state.facts_provider = provider
+    try:
+        yield
+    finally:
+        provider.stop()
+
+
+app = FastAPI(title="FHIR IG RAG API", version="0.1.0", lifespan=lifespan)
+
+
+def get_facts(request: Request, session: Session = Depends(get_session)):
+    """In-memory or snapshot facts when FACTS_ENGINE selects them; otherwise Postgres."""
+    provider = getattr(request.app.state, "facts_provider", None)
+    shared = provider.shared() if provider is not None else None
+    if shared is not None:
+        return shared
+    return DbFacts(session)
+
+
+def get_profile_aliases(request: Request) -> ProfileAliasStore:
+    provider = getattr(request.app.state, "facts_provider", None)
+    if provider is not None:
+        return provider.aliases
+    store = getattr(request.app.state, "profile_aliases", None)
+    if store is None:
+        store = request.app.state.profile_aliases = ProfileAliasStore(
+            SessionLocal, refresh_seconds=FACTS_REFRESH_SECONDS
+        )
+    return store
 
 
-app = FastAPI(title="FHIR IG RAG API", version="0.1.0")
+def get_slot_terms(request: Request) -> SlotTermsStore:
+    provider = getattr(request.app.state, "facts_provider", None)
+    if provider is not None:
+        return provider.slot_terms
+    store = getattr(request.app.state, "slot_terms", None)
+    if store is None:
+        store = request.app.state.slot_terms = SlotTermsStore(
+            SessionLocal, refresh_seconds=FACTS_REFRESH_SECONDS
+        )
+    return store
 
 
-def _resolve_artifact(
-    session: Session, canonical: str, version: Optional[str]
-) -> tuple[Artifact, Package]:
-    stmt = select(Artifact, Package).join(Package).where(Artifact.canonical_url == canonical)
-    if version is not None:
-        stmt = stmt.where(Artifact.version == version)
-    else:
-        stmt = stmt.order_by(
-            desc(Artifact.version.is_(None)),
-            desc(Artifact.version),
-            desc(Artifact.indexed_at),
-            desc(Artifact.id),
-        )
-    result = session.execute(stmt).first()
-    if not result:
-        raise HTTPException(status_code=404, detail="Artifact not found for canonical/version")
-    artifact, pkg = result
-    return artifact, pkg
+def profile_canonical(
+    canonical: Optional[str] = Query(None, description="StructureDefinition canonical URL"),
+    profile: Optional[str] = Query(
+        None,
+        description="Profile name, title or id, resolved to a canonical (instead of canonical)",
+    ),
+    aliases: ProfileAliasStore = Depends(get_profile_aliases),
+) -> str:
+    """The canonical= parameter, or the canonical profile= resolves to (400/404/409 otherwise)."""
+    return gq.resolve_canonical(aliases, canonical, profile)
+
+
+def optional_profile_canonical(
+    canonical: Optional[str] = Query(None, description="StructureDefinition canonical URL"),
+    profile: Optional[str] = Query(
+        None,
+        description="Profile name, title or id, resolved to a canonical (instead of canonical)",
+    ),
+    aliases: ProfileAliasStore = Depends(get_profile_aliases),
+) -> Optional[str]:
+    """Like profile_canonical, but None when neither parameter is given."""
+    if not canonical and not profile:
+        return None
+    return gq.resolve_canonical(aliases, canonical, profile)
+
+
+@app.exception_handler(ServiceError)
+def service_error_handler(request: Request, exc: ServiceError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
 
 
 @app.exception_handler(Exception)
@@ -50,133 +110,123 @@ def health():
 
 @app.get("/gq/must-support")
 def gq_must_support(
-    canonical: str = Query(..., description="StructureDefinition canonical URL"),
+    canonical: str = Depends(profile_canonical),
     version: Optional[str] = Query(None, description="Optional version"),
-    session: Session = Depends(get_session),
+    path_prefix: Optional[str] = Query(
+        None, description="Only this element and its descendants (e.g. Composition.section)"
+    ),
+    facts=Depends(get_facts),
 ):
-    artifact, pkg = _resolve_artifact(session, canonical, version)
-    paths = (
-        session.execute(
-            select(SDElement.path, SDElement.min, SDElement.max)
-            .where(SDElement.artifact_id == artifact.id, SDElement.must_support.is_(True))
-            .order_by(SDElement.path)
-        )
-        .all()
-    )
-    if not paths:
-        raise HTTPException(status_code=404, detail="No mustSupport elements found for this profile")
-
-    generated_at = datetime.now(timezone.utc).isoformat()
-    return {
-        "query_id": "PSCA-GQ-MS-01",
-        "question": "List mustSupport paths",
-        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
-        "profile": {
-            "canonical_url": artifact.canonical_url,
-            "version": artifact.version,
-            "name": artifact.name,
-            "sd_type": artifact.sd_type,
-        },
-        "must_support_paths": [
-            {"path": row.path, "min": row.min, "max": row.max} for row in paths
-        ],
-        "generated_at": generated_at,
-    }
+    return gq.must_support(facts, canonical=canonical, version=version, path_prefix=path_prefix)
 
 
 @app.get("/gq/bindings")
 def gq_bindings(
-    canonical: str = Query(..., description="StructureDefinition canonical URL"),
+    canonical: str = Depends(profile_canonical),
     path: str = Query(..., description="Element path"),
     version: Optional[str] = Query(None, description="Optional version"),
-    session: Session = Depends(get_session),
+    facts=Depends(get_facts),
 ):
-    artifact, pkg = _resolve_artifact(session, canonical, version)
-    bindings = (
-        session.execute(
-            select(SDBinding.strength, SDBinding.value_set, SDBinding.source_choice)
-            .where(SDBinding.artifact_id == artifact.id, SDBinding.path == path)
-            .order_by(SDBinding.value_set)
-        )
-        .all()
-    )
-    if not bindings:
-        raise HTTPException(status_code=404, detail="No bindings found for this path")
-
-    generated_at = datetime.now(timezone.utc).isoformat()
-    return {
-        "query_id": "PSCA-GQ-BIND-01",
-        "question": "List bindings for path",
-        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
-        "profile": {
-            "canonical_url": artifact.canonical_url,
-            "version": artifact.version,
-            "name": artifact.name,
-            "sd_type": artifact.sd_type,
-            "file_path": artifact.file_path,
-        },
-        "path": path,
-        "bindings": [
-            {"strength": row.strength, "value_set": row.value_set, "source": row.source_choice}
-            for row in bindings
-        ],
-        "generated_at": generated_at,
-    }
+    return gq.bindings(facts, canonical=canonical, path=path, version=version)
 
 
 @app.get("/gq/constraints")
 def gq_constraints(
-    canonical: str = Query(..., description="StructureDefinition canonical URL"),
+    canonical: str = Depends(profile_canonical),
     version: Optional[str] = Query(None, description="Optional version"),
     path: Optional[str] = Query(None, description="Optional element path filter"),
-    session: Session = Depends(get_session),
+    path_prefix: Optional[str] = Query(
+        None, description="Only this element and its descendants (e.g. Patient.name)"
+    ),
+    facts=Depends(get_facts),
 ):
-    artifact, pkg = _resolve_artifact(session, canonical, version)
-    stmt = (
-        select(
-            SDConstraint.path,
-            SDConstraint.key,
-            SDConstraint.severity,
-            SDConstraint.human,
-            SDConstraint.expression,
-            SDConstraint.source_choice,
-        )
-        .where(SDConstraint.artifact_id == artifact.id)
-        .order_by(SDConstraint.path, SDConstraint.key)
+    return gq.constraints(
+        facts, canonical=canonical, version=version, path=path, path_prefix=path_prefix
+    )
+
+
+@app.get("/gq/constraints/search")
+def gq_constraints_search(
+    q: Optional[str] = Query(
+        None, description="Full-text query over key, human text and expression (web-search syntax)"
+    ),
+    expression: Optional[str] = Query(
+        None, description="Case-insensitive substring of the FHIRPath expression (e.g. hasValue())"
+    ),
+    ig: Optional[str] = Query(None, description="Optional IG code"),
+    ig_version: Optional[str] = Query(None, description="Optional IG version"),
+    limit: int = Query(
+        20, ge=1, le=gq.CONSTRAINTS_SEARCH_MAX_LIMIT, description="Constraints per page"
+    ),
+    offset: int = Query(0, ge=0, description="Constraints to skip"),
+    facts=Depends(get_facts),
+):
+    return gq.constraints_search(
+        facts, q=q, expression=expression, ig=ig, ig_version=ig_version, limit=limit, offset=offset
+    )
+
+
+@app.get("/gq/search")
+def gq_search(
+    q: str = Query(..., description="Free text matched against element and constraint text"),
+    ig: Optional[str] = Query(None, description="Optional IG code"),
+    ig_version: Optional[str] = Query(None, description="Optional IG version"),
+    limit: int = Query(10, ge=1, le=gq.SEARCH_MAX_LIMIT, description="Results to return"),
+    facts=Depends(get_facts),
+):
+    return gq.search(facts, q=q, ig=ig, ig_version=ig_version, limit=limit)
+
+
+@app.get("/gq/elements")
+def gq_elements(
+    canonical: str = Depends(profile_canonical),
+    version: Optional[str] = Query(None, description="Optional version"),
+    path_prefix: Optional[str] = Query(
+        None, description="Only this element and its descendants (e.g. Patient.name)"
+    ),
+    must_support_only: bool = Query(False, description="Only mustSupport elements"),
+    facts=Depends(get_facts),
+):
+    return gq.elements(
+        facts,
+        canonical=canonical,
+        version=version,
+        path_prefix=path_prefix,
+        must_support_only=must_support_only,
+    )
+
+
+@app.get("/gq/elements/search")
+def gq_elements_search(
+    path: str = Query(..., description="Element path; '*' is a wildcard (e.g. *.identifier)"),
+    match: str = Query(
+        "exact",
+        pattern=f"^({'|'.join(gq.ELEMENT_MATCHES)})$",
+        description="exact, prefix (the path and its descendants) or fuzzy (trigram similarity)",
+    ),
+    must_support: Optional[bool] = Query(None, description="Filter on mustSupport"),
+    card_min: Optional[int] = Query(None, alias="min", description="Filter on min cardinality"),
+    card_max: Optional[str] = Query(None, alias="max", description="Filter on max cardinality"),
+    ig: Optional[str] = Query(None, description="Optional IG code"),
+    ig_version: Optional[str] = Query(None, description="Optional IG version"),
+    limit: int = Query(
+        20, ge=1, le=gq.ELEMENTS_SEARCH_MAX_LIMIT, description="Profiles per page"
+    ),
+    offset: int = Query(0, ge=0, description="Profiles to skip"),
+    facts=Depends(get_facts),
+):
+    return gq.elements_search(
+        facts,
+        path=path,
+        match=match,
+        must_support=must_support,
+        card_min=card_min,
+        card_max=card_max,
+        ig=ig,
+        ig_version=ig_version,
+        limit=limit,
+        offset=offset,
     )
-    if path:
-        stmt = stmt.where(SDConstraint.path == path)
-    rows = session.execute(stmt).all()
-    if not rows:
-        raise HTTPException(status_code=404, detail="No constraints found for this profile/path")
-
-    generated_at = datetime.now(timezone.utc).isoformat()
-    question = "List constraints for path" if path else "List constraints for profile"
-    return {
-        "query_id": "PSCA-GQ-CONSTR-01",
-        "question": question,
-        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
-        "profile": {
-            "canonical_url": artifact.canonical_url,
-            "version": artifact.version,
-            "name": artifact.name,
-            "sd_type": artifact.sd_type,
-            "file_path": artifact.file_path,
-        },
-        "path": path,
-        "constraints": [
-            {
-                "path": r.path,
-                "key": r.key,
-                "severity": r.severity,
-                "human": r.human,
-                "expression": r.expression,
-                "source": r.source_choice,
-            }
-            for r in rows
-        ],
-        "generated_at": generated_at,
-    }
 
 
 @app.get("/gq/value-set/where-used")
@@ -184,260 +234,205 @@ def gq_value_set_where_used(
     value_set: str = Query(..., description="ValueSet canonical URL"),
     ig: str = Query("ps-ca", description="IG code"),
     ig_version: str = Query("2.1.1", description="IG version"),
-    session: Session = Depends(get_session),
+    transitive: bool = Query(False, description="Also list profiles inheriting these bindings"),
+    facts=Depends(get_facts),
 ):
-    pkg = session.execute(
-        select(Package).where(Package.ig == ig, Package.ig_version == ig_version)
-    ).scalar_one_or_none()
-    if not pkg:
-        raise HTTPException(status_code=404, detail="Package not found")
-
-    rows = (
-        session.execute(
-            select(
-                Artifact.canonical_url,
-                Artifact.version,
-                Artifact.name,
-                Artifact.sd_type,
-                Artifact.file_path,
-                SDBinding.path,
-                SDBinding.strength,
-                SDBinding.source_choice,
-            )
-            .join(SDBinding, SDBinding.artifact_id == Artifact.id)
-            .where(Artifact.package_id == pkg.id, SDBinding.value_set == value_set)
-            .order_by(Artifact.sd_type, Artifact.canonical_url, SDBinding.path)
-        )
-        .all()
+    return gq.value_set_where_used(
+        facts, value_set=value_set, ig=ig, ig_version=ig_version, transitive=transitive
     )
-    if not rows:
-        raise HTTPException(status_code=404, detail="ValueSet not used in this IG/version")
-
-    generated_at = datetime.now(timezone.utc).isoformat()
-    return {
-        "query_id": "PSCA-GQ-VS-WHEREUSED-01",
-        "question": "Where is this ValueSet used?",
-        "scope": {"ig": ig, "ig_version": ig_version},
-        "value_set": value_set,
-        "usages": [
-            {
-                "profile": {
-                    "canonical_url": r.canonical_url,
-                    "version": r.version,
-                    "name": r.name,
-                    "sd_type": r.sd_type,
-                    "file_path": r.file_path,
-                },
-                "path": r.path,
-                "strength": r.strength,
-                "source": r.source_choice,
-            }
-            for r in rows
-        ],
-        "generated_at": generated_at,
-    }
 
 
-@app.get("/gq/profile-summary")
-def gq_profile_summary(
-    canonical: str = Query(..., description="StructureDefinition canonical URL"),
+class ValueSetBulkRequest(BaseModel):
+    value_sets: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=gq.BULK_MAX_VALUE_SETS,
+        description="ValueSet canonicals, optionally url|version",
+    )
+    ig: str = Field("ps-ca", description="IG code")
+    ig_version: str = Field("2.1.1", description="IG version")
+
+
+@app.post("/gq/value-set/where-used/bulk")
+def gq_value_set_where_used_bulk(body: ValueSetBulkRequest, facts=Depends(get_facts)):
+    return gq.value_set_where_used_bulk(
+        facts, body.value_sets, ig=body.ig, ig_version=body.ig_version
+    )
+
+
+@app.get("/gq/profiles/resolve")
+def gq_profiles_resolve(
+    q: str = Query(..., min_length=1, description="Profile name, title, id or canonical"),
+    ig: Optional[str] = Query(None, description="Restrict to an IG code"),
+    ig_version: Optional[str] = Query(None, description="Restrict to an IG version"),
+    limit: int = Query(10, ge=1, le=gq.RESOLVE_MAX_LIMIT),
+    aliases: ProfileAliasStore = Depends(get_profile_aliases),
+):
+    return gq.profiles_resolve(aliases, q=q, ig=ig, ig_version=ig_version, limit=limit)
+
+
+@app.get("/gq/slot-terms")
+def gq_slot_terms(store: SlotTermsStore = Depends(get_slot_terms)):
+    return gq.slot_terms(store)
+
+
+@app.get("/gq/lineage")
+def gq_lineage(
+    canonical: str = Depends(profile_canonical),
     version: Optional[str] = Query(None, description="Optional version"),
-    include_all: bool = Query(False, description="Include all rows instead of top 10"),
-    session: Session = Depends(get_session),
+    facts=Depends(get_facts),
 ):
-    artifact, pkg = _resolve_artifact(session, canonical, version)
+    return gq.lineage(facts, canonical=canonical, version=version)
 
-    # Counts
-    ms_count = session.execute(
-        select(func.count()).select_from(SDElement).where(
-            SDElement.artifact_id == artifact.id, SDElement.must_support.is_(True)
-        )
-    ).scalar_one()
-
-    bind_count = session.execute(
-        select(func.count()).select_from(SDBinding).where(SDBinding.artifact_id == artifact.id)
-    ).scalar_one()
-
-    constr_count = session.execute(
-        select(func.count()).select_from(SDConstraint).where(SDConstraint.artifact_id == artifact.id)
-    ).scalar_one()
-
-    # Tops (deterministic)
-    limit_val = None if include_all else 10
-    ms_top = (
-        session.execute(
-            select(SDElement.path, SDElement.min, SDElement.max)
-            .where(SDElement.artifact_id == artifact.id, SDElement.must_support.is_(True))
-            .order_by(SDElement.path)
-            .limit(limit_val)
-        )
-        .all()
+
+@app.get("/gq/descendants")
+def gq_descendants(
+    canonical: str = Depends(profile_canonical),
+    version: Optional[str] = Query(None, description="Optional version"),
+    facts=Depends(get_facts),
+):
+    return gq.descendants(facts, canonical=canonical, version=version)
+
+
+@app.get("/gq/diff/profile")
+def gq_diff_profile(
+    canonical: str = Depends(profile_canonical),
+    from_version: str = Query(..., description="Older profile version"),
+    to_version: Optional[str] = Query(None, description="Newer profile version (default: latest)"),
+    facts=Depends(get_facts),
+):
+    return gq.diff_profile(
+        facts, canonical=canonical, from_version=from_version, to_version=to_version
     )
 
-    bind_top = (
-        session.execute(
-            select(SDBinding.path, SDBinding.strength, SDBinding.value_set, SDBinding.source_choice)
-            .where(SDBinding.artifact_id == artifact.id)
-            .order_by(SDBinding.path, SDBinding.strength, SDBinding.value_set)
-            .limit(limit_val)
-        )
-        .all()
+
+@app.get("/gq/diff/package")
+def gq_diff_package(
+    ig: str = Query("ps-ca", description="IG code"),
+    from_version: str = Query(..., description="Older IG version"),
+    to_version: str = Query(..., description="Newer IG version"),
+    include_changes: bool = Query(True, description="List changed facts (otherwise counts only)"),
+    facts=Depends(get_facts),
+):
+    return gq.diff_package(
+        facts,
+        ig=ig,
+        from_version=from_version,
+        to_version=to_version,
+        include_changes=include_changes,
     )
 
-    constr_top = (
-        session.execute(
-            select(
-                SDConstraint.path,
-                SDConstraint.key,
-                SDConstraint.severity,
-                SDConstraint.human,
-                SDConstraint.expression,
-                SDConstraint.source_choice,
-            )
-            .where(SDConstraint.artifact_id == artifact.id)
-            .order_by(SDConstraint.path, SDConstraint.key)
-            .limit(limit_val)
-        )
-        .all()
+
+@app.get("/gq/profile/where-used")
+def gq_profile_where_used(
+    canonical: str = Depends(profile_canonical),
+    ig: str = Query("ps-ca", description="IG code"),
+    ig_version: str = Query("2.1.1", description="IG version"),
+    transitive: bool = Query(False, description="Also list profiles inheriting these elements"),
+    facts=Depends(get_facts),
+):
+    return gq.profile_where_used(
+        facts, canonical=canonical, ig=ig, ig_version=ig_version, transitive=transitive
+    )
+
+
+@app.get("/gq/extension/where-used")
+def gq_extension_where_used(
+    canonical: str = Depends(profile_canonical),
+    ig: str = Query("ps-ca", description="IG code"),
+    ig_version: str = Query("2.1.1", description="IG version"),
+    transitive: bool = Query(False, description="Also list profiles inheriting these elements"),
+    facts=Depends(get_facts),
+):
+    return gq.extension_where_used(
+        facts, canonical=canonical, ig=ig, ig_version=ig_version, transitive=transitive
     )
 
-    has_more_ms = False if include_all else ms_count > len(ms_top)
-    has_more_bind = False if include_all else bind_count > len(bind_top)
-    has_more_constr = False if include_all else constr_count > len(constr_top)
-
-    generated_at = datetime.now(timezone.utc).isoformat()
-    return {
-        "query_id": "PSCA-MCP-PROFILE-SUMMARY-01",
-        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
-        "profile": {
-            "canonical_url": artifact.canonical_url,
-            "version": artifact.version,
-            "name": artifact.name,
-            "sd_type": artifact.sd_type,
-            "title": artifact.title,
-            "base_definition": artifact.base_definition,
-            "file_path": artifact.file_path,
-        },
-        "counts": {
-            "must_support_paths": ms_count,
-            "bindings": bind_count,
-            "constraints": constr_count,
-        },
-        "top_limit": None if include_all else 10,
-        "top": {
-            "must_support_paths": [
-                {"path": r.path, "min": r.min, "max": r.max} for r in ms_top
-            ],
-            "must_support_paths_paths": [r.path for r in ms_top],
-            "bindings": [
-                {
-                    "path": r.path,
-                    "strength": r.strength,
-                    "value_set": r.value_set,
-                    "source": r.source_choice,
-                }
-                for r in bind_top
-            ],
-            "constraints": [
-                {
-                    "path": r.path,
-                    "key": r.key,
-                    "severity": r.severity,
-                    "human": r.human,
-                    "expression": r.expression,
-                    "source": r.source_choice,
-                }
-                for r in constr_top
-            ],
-        },
-        "has_more": {
-            "must_support_paths": has_more_ms,
-            "bindings": has_more_bind,
-            "constraints": has_more_constr,
-        },
-        "generated_at": generated_at,
-    }
+
+@app.get("/gq/value-set/usage-matrix")
+def gq_value_set_usage_matrix(
+    ig: str = Query("ps-ca", description="IG code"),
+    ig_version: str = Query("2.1.1", description="IG version"),
+    facts=Depends(get_facts),
+):
+    return gq.value_set_usage_matrix(facts, ig=ig, ig_version=ig_version)
+
+
+@app.get("/gq/profile-summary")
+def gq_profile_summary(
+    canonical: str = Depends(profile_canonical),
+    version: Optional[str] = Query(None, description="Optional version"),
+    include_all: bool = Query(False, description="Include all rows instead of top 10"),
+    facts=Depends(get_facts),
+):
+    return gq.profile_summary(facts, canonical=canonical, version=version, include_all=include_all)
 
 
 @app.get("/gq/element-details")
 def gq_element_details(
-    canonical: str = Query(..., description="StructureDefinition canonical URL"),
+    canonical: str = Depends(profile_canonical),
     path: str = Query(..., description="Element path"),
     version: Optional[str] = Query(None, description="Optional version"),
     include_profile_summary: bool = Query(True, description="Include profile metadata"),
-    session: Session = Depends(get_session),
+    include_raw: bool = Query(False, description="Include the raw ElementDefinition JSON"),
+    facts=Depends(get_facts),
 ):
-    artifact, pkg = _resolve_artifact(session, canonical, version)
-
-    element_row = session.execute(
-        select(SDElement)
-        .where(SDElement.artifact_id == artifact.id, SDElement.path == path)
-        .limit(1)
-    ).scalar_one_or_none()
-    if not element_row:
-        raise HTTPException(status_code=404, detail="Element not found for this profile")
-
-    bindings = session.execute(
-        select(SDBinding.strength, SDBinding.value_set, SDBinding.source_choice)
-        .where(SDBinding.artifact_id == artifact.id, SDBinding.path == path)
-        .order_by(SDBinding.strength, SDBinding.value_set)
-    ).all()
-
-    constraints = session.execute(
-        select(
-            SDConstraint.key,
-            SDConstraint.severity,
-            SDConstraint.human,
-            SDConstraint.expression,
-            SDConstraint.source_choice,
-        )
-        .where(SDConstraint.artifact_id == artifact.id, SDConstraint.path == path)
-        .order_by(SDConstraint.key)
-    ).all()
-
-    generated_at = datetime.now(timezone.utc).isoformat()
-
-    profile_block = (
-        {
-            "canonical_url": artifact.canonical_url,
-            "version": artifact.version,
-            "name": artifact.name,
-            "sd_type": artifact.sd_type,
-            "title": artifact.title,
-            "base_definition": artifact.base_definition,
-        }
-        if include_profile_summary
-        else None
+    return gq.element_details(
+        facts,
+        canonical=canonical,
+        path=path,
+        version=version,
+        include_profile_summary=include_profile_summary,
+        include_raw=include_raw,
+    )
+
+
+@app.get("/gq/evidence")
+def gq_evidence(
+    canonical: Optional[str] = Depends(optional_profile_canonical),
+    q: Optional[str] = Query(None, description="Question the facts are ranked for"),
+    path: Optional[str] = Query(None, description="Focus element path (e.g. Patient.name)"),
+    version: Optional[str] = Query(None, description="Optional version"),
+    ig: Optional[str] = Query(None, description="IG code to search when no profile is given"),
+    ig_version: Optional[str] = Query(None, description="IG version to search"),
+    budget: int = Query(
+        1500,
+        ge=gq.EVIDENCE_MIN_BUDGET,
+        le=gq.EVIDENCE_MAX_BUDGET,
+        description="Token budget for the packed facts (and the legend, when included)",
+    ),
+    include_legend: bool = Query(True, description="Include the legend of record keys"),
+    facts=Depends(get_facts),
+):
+    return gq.evidence(
+        facts,
+        canonical=canonical,
+        q=q,
+        path=path,
+        version=version,
+        ig=ig,
+        ig_version=ig_version,
+        budget=budget,
+        include_legend=include_legend,
     )
 
-    return {
-        "query_id": "PSCA-MCP-ELEMENT-DETAILS-01",
-        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
-        "profile": profile_block,
-        "element": {
-            "path": element_row.path,
-            "must_support": element_row.must_support,
-            "min": element_row.min,
-            "max": element_row.max,
-            "json": getattr(element_row, "raw_json", None),
-        },
-        "bindings": [
-            {"strength": b.strength, "value_set": b.value_set, "source": b.source_choice}
-            for b in bindings
-        ],
-        "constraints": [
-            {
-                "key": c.key,
-                "severity": c.severity,
-                "human": c.human,
-                "expression": c.expression,
-                "source": c.source_choice,
-            }
-            for c in constraints
-        ],
-        "counts": {
-            "bindings": len(bindings),
-            "constraints": len(constraints),
-        },
-        "generated_at": generated_at,
-    }
+
+@app.get("/gq/element-details/batch")
+def gq_element_details_batch(
+    canonical: str = Depends(profile_canonical),
+    path: Optional[List[str]] = Query(
+        None, description="Element paths (repeat the parameter); omit for the whole profile"
+    ),
+    version: Optional[str] = Query(None, description="Optional version"),
+    must_support_only: bool = Query(False, description="Only mustSupport elements"),
+    include_profile_summary: bool = Query(True, description="Include profile metadata"),
+    facts=Depends(get_facts),
+):
+    return gq.element_details_batch(
+        facts,
+        canonical=canonical,
+        path=path,
+        version=version,
+        must_support_only=must_support_only,
+        include_profile_summary=include_profile_summary,
+    )
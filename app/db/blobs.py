@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Optional
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .models import SDJsonBlob
+
+
+def content_hash(body: Any) -> str:
+    """sha256 of canonical JSON (sorted keys, no whitespace), used as the blob key."""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def store_blob(session: Session, body: Any, seen: Optional[set[str]] = None) -> Optional[str]:
+    """Insert a JSON blob once (deduplicated by content hash) and return its hash.
+
+    ``seen`` is an optional per-run set of hashes already written, to skip the round trip
+    for the many byte-identical elements/constraints shared across profiles.
+    """
+    if body is None:
+        return None
+    digest = content_hash(body)
+    if seen is not None and digest in seen:
+        return digest
+    session.execute(
+        pg_insert(SDJsonBlob.__table__)
+        .values(content_hash=digest, body=body)
+        .on_conflict_do_nothing(index_elements=["content_hash"])
+    )
+    if seen is not None:
+        seen.add(digest)
+    return digest
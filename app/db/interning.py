@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import Table, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .models import Canonical, ElementPath
+
+
+def _intern(session: Session, table: Table, column: str, value: str, cache: Optional[dict]) -> int:
+    if cache is not None and value in cache:
+        return cache[value]
+    row_id = session.execute(
+        pg_insert(table)
+        .values({column: value})
+        .on_conflict_do_nothing(index_elements=[column])
+        .returning(table.c.id)
+    ).scalar_one_or_none()
+    if row_id is None:
+        # Already interned (by this run or an earlier one).
+        row_id = session.execute(select(table.c.id).where(table.c[column] == value)).scalar_one()
+    if cache is not None:
+        cache[value] = row_id
+    return row_id
+
+
+def intern_path(session: Session, path: str, cache: Optional[dict] = None) -> int:
+    """Return the element_paths id for a path, inserting it on first use."""
+    return _intern(session, ElementPath.__table__, "path", path, cache)
+
+
+def intern_canonical(session: Session, url: str, cache: Optional[dict] = None) -> int:
+    """Return the canonicals id for a canonical URL, inserting it on first use."""
+    return _intern(session, Canonical.__table__, "url", url, cache)
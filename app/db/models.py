@@ -3,18 +3,23 @@ from __future__ import annotations
 from datetime import datetime
 
 from sqlalchemy import (
+    BigInteger,
     Column,
+    Computed,
     DateTime,
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
+    MetaData,
+    Table,
     Text,
     UniqueConstraint,
     Boolean,
     func,
     text,
 )
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -31,6 +36,7 @@ class Package(Base):
         DateTime(timezone=True), nullable=False, server_default=func.now()
     )
     source_path: Mapped[str] = mapped_column(Text, nullable=False)
+    generation: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
 
     artifacts: Mapped[list["Artifact"]] = relationship(
         "Artifact", back_populates="package", cascade="all, delete-orphan"
@@ -78,30 +84,128 @@ class Artifact(Base):
     )
 
 
+class ProfileClosure(Base):
+    """Transitive baseDefinition closure: one row per (ancestor, descendant), self rows at depth 0.
+
+    Maintained by app.ingest.lineage whenever import-structuredefs changes artifacts.
+    """
+
+    __tablename__ = "profile_closure"
+    __table_args__ = (
+        Index(
+            "ix_profile_closure_descendant",
+            "descendant_id",
+            "depth",
+            postgresql_include=["ancestor_id"],
+        ),
+    )
+
+    ancestor_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("artifacts.id", ondelete="CASCADE"), primary_key=True
+    )
+    descendant_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("artifacts.id", ondelete="CASCADE"), primary_key=True
+    )
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class ElementPath(Base):
+    """Interned element paths; fact tables reference them by integer id."""
+
+    __tablename__ = "element_paths"
+    __table_args__ = (
+        # Prefix LIKE / subtree range scans regardless of the database collation.
+        Index(
+            "ix_element_paths_path_pattern", "path", postgresql_ops={"path": "text_pattern_ops"}
+        ),
+        # Wildcard (LIKE '%.identifier') and fuzzy (%) element search; needs pg_trgm.
+        Index(
+            "ix_element_paths_path_trgm",
+            "path",
+            postgresql_using="gin",
+            postgresql_ops={"path": "gin_trgm_ops"},
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    path: Mapped[str] = mapped_column(Text, nullable=False, unique=True)
+
+
+class Canonical(Base):
+    """Interned canonical URLs; fact tables reference them by integer id."""
+
+    __tablename__ = "canonicals"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    url: Mapped[str] = mapped_column(Text, nullable=False, unique=True)
+
+
+class SDJsonBlob(Base):
+    """Deduplicated raw JSON (element/binding/constraint), keyed by content hash.
+
+    The body column uses lz4 TOAST compression (set by migration).
+    """
+
+    __tablename__ = "sd_json_blobs"
+
+    content_hash: Mapped[str] = mapped_column(Text, primary_key=True)
+    body: Mapped[dict | list] = mapped_column(JSONB, nullable=False)
+
+
+def fact_hash(*columns: str) -> str:
+    """SQL for a row's normalized content hash: md5 over the fact columns (NULL-safe).
+
+    Used as a generated column so the database fills it at write time; version diffs
+    compare these hashes instead of the facts themselves.
+    """
+    parts = " || E'\\x1f' || ".join(f"coalesce('v' || {column}::text, 'n')" for column in columns)
+    return f"decode(md5({parts}), 'hex')"
+
+
+ELEMENT_FACT_COLUMNS = ("min", "max", "must_support", "is_modifier", "is_summary")
+# raw_json_hash stands in for everything else in the element JSON (short, definition, type
+# codes, fixed/pattern values, slicing), so those changes show up in the diffs too.
+ELEMENT_HASH_COLUMNS = ELEMENT_FACT_COLUMNS + ("raw_json_hash",)
+BINDING_FACT_COLUMNS = ("strength", "value_set")
+CONSTRAINT_FACT_COLUMNS = ("severity", "human", "expression")
+
+
 class SDElement(Base):
     __tablename__ = "sd_elements"
     __table_args__ = (
-        UniqueConstraint("artifact_id", "path", name="uq_sd_element_artifact_path"),
-        Index("ix_sd_element_sd_canonical_path", "sd_canonical_url", "path"),
+        UniqueConstraint("artifact_id", "path_id", name="uq_sd_element_artifact_path"),
+        Index("ix_sd_element_canonical_path", "canonical_id", "path_id"),
         Index("ix_sd_element_artifact_id", "artifact_id"),
+        Index(
+            "ix_sd_element_must_support",
+            "artifact_id",
+            "path_id",
+            postgresql_include=["min", "max"],
+            postgresql_where=text("must_support IS TRUE"),
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     artifact_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("artifacts.id", ondelete="CASCADE"), nullable=False
     )
-    sd_canonical_url: Mapped[str] = mapped_column(Text, nullable=False)
+    canonical_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("canonicals.id"), nullable=False
+    )
     sd_version: Mapped[str | None] = mapped_column(Text, nullable=True)
     element_id: Mapped[str | None] = mapped_column(Text, nullable=True)
-    path: Mapped[str] = mapped_column(Text, nullable=False)
+    path_id: Mapped[int] = mapped_column(Integer, ForeignKey("element_paths.id"), nullable=False)
     min: Mapped[int | None] = mapped_column(Integer, nullable=True)
     max: Mapped[str | None] = mapped_column(Text, nullable=True)
     must_support: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
     is_modifier: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
     is_summary: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
-    types_json: Mapped[dict | list | None] = mapped_column(JSONB, nullable=True)
-    slicing_json: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
-    raw_json: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    raw_json_hash: Mapped[str | None] = mapped_column(
+        Text, ForeignKey("sd_json_blobs.content_hash"), nullable=True
+    )
+    content_hash: Mapped[bytes] = mapped_column(
+        LargeBinary, Computed(fact_hash(*ELEMENT_HASH_COLUMNS), persisted=True)
+    )
     source_choice: Mapped[str] = mapped_column(Text, nullable=False)
     loaded_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=func.now()
@@ -113,21 +217,43 @@ class SDElement(Base):
 class SDBinding(Base):
     __tablename__ = "sd_bindings"
     __table_args__ = (
-        UniqueConstraint("artifact_id", "path", "value_set", name="uq_sd_bindings_artifact_path_valueset"),
-        Index("ix_sd_binding_sd_canonical_path", "sd_canonical_url", "path"),
+        UniqueConstraint(
+            "artifact_id", "path_id", "value_set", name="uq_sd_bindings_artifact_path_valueset"
+        ),
+        Index("ix_sd_binding_canonical_path", "canonical_id", "path_id"),
         Index("ix_sd_binding_artifact_id", "artifact_id"),
+        Index(
+            "ix_sd_binding_value_set_covering",
+            "value_set",
+            postgresql_include=["artifact_id", "path_id", "strength", "source_choice"],
+        ),
+        Index(
+            "ix_sd_binding_listing_covering",
+            "artifact_id",
+            "path_id",
+            "strength",
+            "value_set",
+            postgresql_include=["source_choice"],
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     artifact_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("artifacts.id", ondelete="CASCADE"), nullable=False
     )
-    sd_canonical_url: Mapped[str] = mapped_column(Text, nullable=False)
+    canonical_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("canonicals.id"), nullable=False
+    )
     sd_version: Mapped[str | None] = mapped_column(Text, nullable=True)
-    path: Mapped[str] = mapped_column(Text, nullable=False)
+    path_id: Mapped[int] = mapped_column(Integer, ForeignKey("element_paths.id"), nullable=False)
     strength: Mapped[str | None] = mapped_column(Text, nullable=True)
     value_set: Mapped[str] = mapped_column(Text, nullable=False, server_default="")
-    binding_json: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    binding_json_hash: Mapped[str | None] = mapped_column(
+        Text, ForeignKey("sd_json_blobs.content_hash"), nullable=True
+    )
+    content_hash: Mapped[bytes] = mapped_column(
+        LargeBinary, Computed(fact_hash(*BINDING_FACT_COLUMNS), persisted=True)
+    )
     source_choice: Mapped[str] = mapped_column(Text, nullable=False)
     loaded_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=func.now()
@@ -136,30 +262,163 @@ class SDBinding(Base):
     artifact: Mapped[Artifact] = relationship("Artifact", back_populates="sd_bindings")
 
 
+class SDElementTypeRef(Base):
+    """Profiles referenced by an element's type: type[].profile and type[].targetProfile.
+
+    Extensions are type code "Extension" with the extension's canonical as profile.
+    ref_canonical has any "|version" suffix removed.
+    """
+
+    __tablename__ = "sd_element_type_refs"
+    __table_args__ = (
+        UniqueConstraint(
+            "artifact_id", "path_id", "kind", "code", "ref_canonical", name="uq_sd_element_type_ref"
+        ),
+        Index(
+            "ix_sd_element_type_ref_canonical",
+            "ref_canonical",
+            "kind",
+            postgresql_include=["artifact_id", "path_id", "code"],
+        ),
+        Index("ix_sd_element_type_ref_artifact_id", "artifact_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    artifact_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("artifacts.id", ondelete="CASCADE"), nullable=False
+    )
+    path_id: Mapped[int] = mapped_column(Integer, ForeignKey("element_paths.id"), nullable=False)
+    kind: Mapped[str] = mapped_column(Text, nullable=False)
+    code: Mapped[str] = mapped_column(Text, nullable=False)
+    ref_canonical: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+# Everything is stemmed as English; expressions are also indexed verbatim ('simple') so
+# FHIRPath functions that are English stop words (all(), not(), ...) stay searchable.
+CONSTRAINT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(key, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(human, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(expression, '')), 'C') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(expression, '')), 'C')"
+)
+
+
 class SDConstraint(Base):
     __tablename__ = "sd_constraints"
     __table_args__ = (
-        UniqueConstraint("artifact_id", "path", "key", name="uq_sd_constraint_artifact_path_key"),
-        Index("ix_sd_constraint_sd_canonical_path", "sd_canonical_url", "path"),
+        UniqueConstraint("artifact_id", "path_id", "key", name="uq_sd_constraint_artifact_path_key"),
+        Index("ix_sd_constraint_canonical_path", "canonical_id", "path_id"),
         Index("ix_sd_constraint_artifact_id", "artifact_id"),
+        Index(
+            "ix_sd_constraint_listing",
+            "artifact_id",
+            "path_id",
+            "key",
+            # human/expression stay in the heap: unbounded text would bloat the index and can
+            # exceed the btree row size limit.
+            postgresql_include=["severity", "source_choice"],
+        ),
+        Index("ix_sd_constraint_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_sd_constraint_expression_trgm",
+            "expression",
+            postgresql_using="gin",
+            postgresql_ops={"expression": "gin_trgm_ops"},
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     artifact_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("artifacts.id", ondelete="CASCADE"), nullable=False
     )
-    sd_canonical_url: Mapped[str] = mapped_column(Text, nullable=False)
+    canonical_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("canonicals.id"), nullable=False
+    )
     sd_version: Mapped[str | None] = mapped_column(Text, nullable=True)
-    path: Mapped[str] = mapped_column(Text, nullable=False)
+    path_id: Mapped[int] = mapped_column(Integer, ForeignKey("element_paths.id"), nullable=False)
     key: Mapped[str] = mapped_column(Text, nullable=False)
     severity: Mapped[str | None] = mapped_column(Text, nullable=True)
     human: Mapped[str | None] = mapped_column(Text, nullable=True)
     expression: Mapped[str | None] = mapped_column(Text, nullable=True)
     xpath: Mapped[str | None] = mapped_column(Text, nullable=True)
-    constraint_json: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR, Computed(CONSTRAINT_SEARCH_VECTOR, persisted=True)
+    )
+    constraint_json_hash: Mapped[str | None] = mapped_column(
+        Text, ForeignKey("sd_json_blobs.content_hash"), nullable=True
+    )
+    content_hash: Mapped[bytes] = mapped_column(
+        LargeBinary, Computed(fact_hash(*CONSTRAINT_FACT_COLUMNS), persisted=True)
+    )
     source_choice: Mapped[str] = mapped_column(Text, nullable=False)
     loaded_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=func.now()
     )
 
     artifact: Mapped[Artifact] = relationship("Artifact", back_populates="sd_constraints")
+
+
+class SearchDoc(Base):
+    """A document of the BM25 search index: one element's text fields or one constraint.
+
+    doc_id is dense per package; the postings in search_postings refer to it.
+    """
+
+    __tablename__ = "search_docs"
+
+    package_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("packages.id", ondelete="CASCADE"), primary_key=True
+    )
+    doc_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    artifact_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("artifacts.id", ondelete="CASCADE"), nullable=False
+    )
+    path_id: Mapped[int] = mapped_column(Integer, ForeignKey("element_paths.id"), nullable=False)
+    kind: Mapped[str] = mapped_column(Text, nullable=False)
+    key: Mapped[str | None] = mapped_column(Text, nullable=True)
+    snippet: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class SearchPosting(Base):
+    """Postings of one term in one package's BM25 index.
+
+    doc_ids is a packed uint32 array (ascending) and weights the matching float32 BM25 term
+    weights, precomputed at build time (see app.facts.search_index).
+    """
+
+    __tablename__ = "search_postings"
+
+    package_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("packages.id", ondelete="CASCADE"), primary_key=True
+    )
+    term: Mapped[str] = mapped_column(Text, primary_key=True)
+    doc_ids: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    weights: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
+# Materialized views (created by migrations, refreshed by ingest; not part of Base.metadata).
+views_metadata = MetaData()
+
+artifact_fact_counts = Table(
+    "artifact_fact_counts",
+    views_metadata,
+    Column("artifact_id", Integer, primary_key=True),
+    Column("package_id", Integer),
+    Column("must_support_count", BigInteger),
+    Column("binding_count", BigInteger),
+    Column("constraint_count", BigInteger),
+)
+
+value_set_usage_matrix = Table(
+    "value_set_usage_matrix",
+    views_metadata,
+    Column("package_id", Integer, primary_key=True),
+    Column("value_set", Text, primary_key=True),
+    Column("required_count", BigInteger),
+    Column("extensible_count", BigInteger),
+    Column("preferred_count", BigInteger),
+    Column("example_count", BigInteger),
+    Column("other_count", BigInteger),
+    Column("total_count", BigInteger),
+    Column("profile_count", BigInteger),
+)
@@ -0,0 +1 @@
+# Facts access package
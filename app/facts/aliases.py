@@ -0,0 +1,159 @@
+"""Profile alias resolution: a name, title, id or canonical tail to a canonical URL.
+
+Agents rarely know canonical URLs; they say "PatientPSCA" or "Observation Alcohol Use".
+The index maps normalized aliases (lower-case alphanumerics, with and without the IG code)
+to profiles. An exact alias is one dict lookup, a prefix is a bisect over the sorted keys
+(a flat trie) and anything else falls back to trigram similarity over an inverted index.
+It is rebuilt when the ingest generation changes.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import Artifact, Package
+from app.facts.db import ingest_generation
+from app.facts.memory import TRIGRAM_THRESHOLD, trigram_similarity, trigrams
+from app.facts.store import GenerationCachedStore
+
+
+class ProfileAlias(NamedTuple):
+    artifact_id: int
+    canonical_url: str
+    version: Optional[str]
+    name: Optional[str]
+    title: Optional[str]
+    ig: str
+    ig_version: str
+
+
+class AliasMatch(NamedTuple):
+    score: float
+    match: str  # exact | prefix | fuzzy
+    alias: str  # the normalized key that matched
+    profile: ProfileAlias
+
+
+def normalize_alias(text: str) -> str:
+    """Lower-case alphanumerics only: "Observation Alcohol Use" -> "observationalcoholuse"."""
+    return re.sub(r"[^0-9a-z]", "", text.lower())
+
+
+def alias_keys(profile: ProfileAlias) -> set[str]:
+    """Normalized aliases of a profile: name, title, canonical tail (the SD id) and URL."""
+    tail = profile.canonical_url.rstrip("/").rsplit("/", 1)[-1]
+    raw = [profile.name, profile.title, tail, profile.canonical_url]
+    keys = {normalize_alias(r) for r in raw if r}
+    # "PatientPSCA" / "psca-patient" are also reachable as just "patient".
+    ig = normalize_alias(profile.ig)
+    for key in list(keys):
+        if ig and key != ig:
+            if key.endswith(ig):
+                keys.add(key[: -len(ig)])
+            if key.startswith(ig):
+                keys.add(key[len(ig) :])
+    keys.discard("")
+    return keys
+
+
+class AliasIndex:
+    """Immutable alias lookup over every loaded profile."""
+
+    def __init__(self, generation: tuple, profiles: Iterable[ProfileAlias]):
+        self.generation = generation
+        exact: dict[str, list[ProfileAlias]] = {}
+        for profile in profiles:
+            for key in alias_keys(profile):
+                exact.setdefault(key, []).append(profile)
+        self._exact = {k: tuple(v) for k, v in exact.items()}
+        self._keys = tuple(sorted(self._exact))
+        grams: dict[str, set[str]] = {}
+        for key in self._keys:
+            for gram in trigrams(key):
+                grams.setdefault(gram, set()).add(key)
+        self._grams = grams
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _candidates(self, key: str) -> Iterable[tuple[float, str, str]]:
+        if key in self._exact:
+            yield 1.0, "exact", key
+            return
+        keys = self._keys
+        i = bisect_left(keys, key)
+        prefixed = []
+        while i < len(keys) and keys[i].startswith(key):
+            prefixed.append(keys[i])
+            i += 1
+        if prefixed:
+            # Below any exact hit; shorter completions rank first.
+            for candidate in prefixed:
+                yield 0.5 + 0.5 * len(key) / len(candidate), "prefix", candidate
+            return
+        shared = set()
+        for gram in trigrams(key):
+            shared |= self._grams.get(gram, set())
+        for candidate in shared:
+            score = trigram_similarity(key, candidate)
+            if score >= TRIGRAM_THRESHOLD:
+                yield score * 0.5, "fuzzy", candidate
+
+    def resolve(
+        self,
+        text: str,
+        ig: Optional[str] = None,
+        ig_version: Optional[str] = None,
+        limit: int = 10,
+    ) -> list[AliasMatch]:
+        """Best matches first, one per artifact."""
+        key = normalize_alias(text)
+        if not key:
+            return []
+        best: dict[int, AliasMatch] = {}
+        for score, match, alias in self._candidates(key):
+            for profile in self._exact[alias]:
+                if ig is not None and profile.ig != ig:
+                    continue
+                if ig_version is not None and profile.ig_version != ig_version:
+                    continue
+                current = best.get(profile.artifact_id)
+                if current is None or score > current.score:
+                    best[profile.artifact_id] = AliasMatch(round(score, 4), match, alias, profile)
+        ordered = sorted(best.values(), key=lambda m: m.profile.artifact_id, reverse=True)
+        ordered.sort(key=lambda m: (-m.score, m.profile.canonical_url))
+        return ordered[:limit]
+
+
+def load_profile_aliases(session: Session) -> AliasIndex:
+    generation = ingest_generation(session)
+    rows = session.execute(
+        select(
+            Artifact.id,
+            Artifact.canonical_url,
+            Artifact.version,
+            Artifact.name,
+            Artifact.title,
+            Package.ig,
+            Package.ig_version,
+        ).join(Package)
+    ).all()
+    return AliasIndex(generation, (ProfileAlias(*r) for r in rows))
+
+
+class ProfileAliasStore(GenerationCachedStore):
+    """Holds the current AliasIndex; rebuilt lazily when the ingest generation changes.
+
+    The generation is checked at most every refresh_seconds (0 = build once).
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], refresh_seconds: float = 30.0):
+        super().__init__(session_factory, load_profile_aliases, refresh_seconds)
+
+    def index(self) -> AliasIndex:
+        return self.get()
@@ -0,0 +1,581 @@
+from __future__ import annotations
+
+from itertools import groupby
+from typing import Optional
+
+from sqlalchemy import Text, any_, desc, func, literal, null, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, websearch_to_tsquery
+from sqlalchemy.orm import Session
+
+from app.db.models import (
+    Artifact,
+    ElementPath,
+    Package,
+    ProfileClosure,
+    SDBinding,
+    SDConstraint,
+    SDElement,
+    SDElementTypeRef,
+    SDJsonBlob,
+    SearchDoc,
+    SearchPosting,
+    artifact_fact_counts,
+    value_set_usage_matrix,
+)
+from app.facts.diff import FactChange, PackageDiff, diff_artifacts, diff_packages
+from app.facts.search_index import SearchHit, top_k
+
+
+def path_id_of(path: str):
+    """Scalar subquery resolving an interned element path to its id."""
+    return select(ElementPath.id).where(ElementPath.path == path).scalar_subquery()
+
+
+def like_prefix(value: str) -> str:
+    """LIKE pattern matching strings that start with value (default backslash escape)."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def in_subtree(path_prefix: str):
+    """Element path equal to path_prefix or below it; a range scan on ix_element_paths_path_pattern."""
+    return or_(ElementPath.path == path_prefix, ElementPath.path.like(like_prefix(path_prefix + ".")))
+
+
+def match_path(path: str, match: str):
+    """Element path condition for search: exact (``*`` wildcards), prefix (subtree) or fuzzy.
+
+    Wildcard and fuzzy matches are served by the pg_trgm index ix_element_paths_path_trgm.
+    """
+    if match == "fuzzy":
+        return ElementPath.path.op("%")(path)
+    if "*" not in path:
+        return ElementPath.path == path if match == "exact" else in_subtree(path)
+    pattern = "%".join(like_prefix(part)[:-1] for part in path.split("*"))
+    if match == "exact":
+        return ElementPath.path.like(pattern)
+    return or_(ElementPath.path.like(pattern), ElementPath.path.like(pattern + ".%"))
+
+
+def path_in(paths: list[str]):
+    """Element path is one of paths, as a single ``path = ANY(:paths)`` array parameter."""
+    return ElementPath.path == any_(literal(list(paths), ARRAY(Text)))
+
+
+def ingest_generation(session: Session) -> tuple:
+    """Fingerprint of every package's ingest counter; changes whenever ingest writes facts."""
+    rows = session.execute(select(Package.id, Package.generation).order_by(Package.id)).all()
+    return tuple((r.id, r.generation) for r in rows)
+
+
+class DbFacts:
+    """Facts answered by querying Postgres through a request-scoped session."""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def resolve_artifact(
+        self, canonical: str, version: Optional[str]
+    ) -> Optional[tuple[Artifact, Package]]:
+        stmt = select(Artifact, Package).join(Package).where(Artifact.canonical_url == canonical)
+        if version is not None:
+            stmt = stmt.where(Artifact.version == version)
+        else:
+            stmt = stmt.order_by(
+                desc(Artifact.version.is_(None)),
+                desc(Artifact.version),
+                desc(Artifact.indexed_at),
+                desc(Artifact.id),
+            )
+        result = self.session.execute(stmt).first()
+        if not result:
+            return None
+        artifact, pkg = result
+        return artifact, pkg
+
+    def lineage(self, artifact_id: int) -> list:
+        """Ancestors along baseDefinition as (depth, Artifact), nearest first."""
+        return self.session.execute(
+            select(ProfileClosure.depth, Artifact)
+            .join(Artifact, Artifact.id == ProfileClosure.ancestor_id)
+            .where(ProfileClosure.descendant_id == artifact_id, ProfileClosure.depth > 0)
+            .order_by(ProfileClosure.depth)
+        ).all()
+
+    def descendants(self, artifact_id: int) -> list:
+        """Profiles inheriting from an artifact as (depth, Artifact), by depth then canonical."""
+        return self.session.execute(
+            select(ProfileClosure.depth, Artifact)
+            .join(Artifact, Artifact.id == ProfileClosure.descendant_id)
+            .where(ProfileClosure.ancestor_id == artifact_id, ProfileClosure.depth > 0)
+            .order_by(
+                ProfileClosure.depth,
+                Artifact.canonical_url,
+                func.coalesce(Artifact.version, ""),
+                Artifact.id,
+            )
+        ).all()
+
+    def find_package(self, ig: str, ig_version: str) -> Optional[Package]:
+        return self.session.execute(
+            select(Package).where(Package.ig == ig, Package.ig_version == ig_version)
+        ).scalar_one_or_none()
+
+    def must_support(
+        self, artifact_id: int, limit: Optional[int] = None, path_prefix: Optional[str] = None
+    ) -> list:
+        stmt = (
+            select(ElementPath.path, SDElement.min, SDElement.max)
+            .join(ElementPath, ElementPath.id == SDElement.path_id)
+            .where(SDElement.artifact_id == artifact_id, SDElement.must_support.is_(True))
+            .order_by(ElementPath.path)
+            .limit(limit)
+        )
+        if path_prefix is not None:
+            stmt = stmt.where(in_subtree(path_prefix))
+        return self.session.execute(stmt).all()
+
+    def must_support_count(self, artifact_id: int) -> int:
+        return self.session.execute(
+            select(func.count()).select_from(SDElement).where(
+                SDElement.artifact_id == artifact_id, SDElement.must_support.is_(True)
+            )
+        ).scalar_one()
+
+    def fact_counts(self, artifact_id: int) -> tuple[int, int, int]:
+        """(must_support, bindings, constraints) counts from the artifact_fact_counts rollup."""
+        row = self.session.execute(
+            select(
+                artifact_fact_counts.c.must_support_count,
+                artifact_fact_counts.c.binding_count,
+                artifact_fact_counts.c.constraint_count,
+            ).where(artifact_fact_counts.c.artifact_id == artifact_id)
+        ).first()
+        if row is None:
+            # Rollup not refreshed since this artifact was imported; count directly.
+            return (
+                self.must_support_count(artifact_id),
+                self.binding_count(artifact_id),
+                self.constraint_count(artifact_id),
+            )
+        return tuple(row)
+
+    def elements(
+        self,
+        artifact_id: int,
+        path_prefix: Optional[str] = None,
+        must_support_only: bool = False,
+        limit: Optional[int] = None,
+        paths: Optional[list[str]] = None,
+    ) -> list:
+        """Elements ordered by path, optionally restricted to a subtree, paths and/or mustSupport."""
+        stmt = (
+            select(ElementPath.path, SDElement.min, SDElement.max, SDElement.must_support)
+            .join(ElementPath, ElementPath.id == SDElement.path_id)
+            .where(SDElement.artifact_id == artifact_id)
+            .order_by(ElementPath.path)
+            .limit(limit)
+        )
+        if path_prefix is not None:
+            stmt = stmt.where(in_subtree(path_prefix))
+        if paths is not None:
+            stmt = stmt.where(path_in(paths))
+        if must_support_only:
+            stmt = stmt.where(SDElement.must_support.is_(True))
+        return self.session.execute(stmt).all()
+
+    def search_elements(
+        self,
+        path: str,
+        match: str = "exact",
+        must_support: Optional[bool] = None,
+        card_min: Optional[int] = None,
+        card_max: Optional[str] = None,
+        ig: Optional[str] = None,
+        ig_version: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> tuple[int, list]:
+        """Matching elements across profiles, paged by profile.
+
+        Returns the number of matching profiles and the page's rows ordered by
+        (canonical_url, version, artifact id, path).
+        """
+        conditions = [match_path(path, match)]
+        if must_support is not None:
+            conditions.append(SDElement.must_support.is_(must_support))
+        if card_min is not None:
+            conditions.append(SDElement.min == card_min)
+        if card_max is not None:
+            conditions.append(SDElement.max == card_max)
+        if ig is not None:
+            conditions.append(Package.ig == ig)
+        if ig_version is not None:
+            conditions.append(Package.ig_version == ig_version)
+
+        matching = (
+            select(SDElement.artifact_id)
+            .join(ElementPath, ElementPath.id == SDElement.path_id)
+            .join(Artifact, Artifact.id == SDElement.artifact_id)
+            .join(Package, Package.id == Artifact.package_id)
+            .where(*conditions)
+            .distinct()
+            .subquery()
+        )
+        total = self.session.execute(select(func.count()).select_from(matching)).scalar_one()
+        profile_order = (Artifact.canonical_url, func.coalesce(Artifact.version, ""), Artifact.id)
+        page_ids = self.session.execute(
+            select(Artifact.id)
+            .where(Artifact.id.in_(select(matching.c.artifact_id)))
+            .order_by(*profile_order)
+            .limit(limit)
+            .offset(offset)
+        ).scalars().all()
+        if not page_ids:
+            return total, []
+
+        rows = self.session.execute(
+            select(
+                Artifact.id.label("artifact_id"),
+                Artifact.canonical_url,
+                Artifact.version,
+                Artifact.name,
+                Artifact.sd_type,
+                Package.ig,
+                Package.ig_version,
+                ElementPath.path,
+                SDElement.min,
+                SDElement.max,
+                SDElement.must_support,
+            )
+            .join(ElementPath, ElementPath.id == SDElement.path_id)
+            .join(Artifact, Artifact.id == SDElement.artifact_id)
+            .join(Package, Package.id == Artifact.package_id)
+            .where(SDElement.artifact_id.in_(page_ids), *conditions)
+            .order_by(*profile_order, ElementPath.path)
+        ).all()
+        return total, rows
+
+    def element(self, artifact_id: int, path: str):
+        return self.session.execute(
+            select(
+                ElementPath.path,
+                SDElement.must_support,
+                SDElement.min,
+                SDElement.max,
+            )
+            .join(ElementPath, ElementPath.id == SDElement.path_id)
+            .where(SDElement.artifact_id == artifact_id, SDElement.path_id == path_id_of(path))
+            .limit(1)
+        ).first()
+
+    def element_json(self, artifact_id: int, path: str) -> Optional[dict]:
+        """Raw ElementDefinition JSON from the deduplicated blob table."""
+        return self.session.execute(
+            select(SDJsonBlob.body)
+            .join(SDElement, SDElement.raw_json_hash == SDJsonBlob.content_hash)
+            .where(SDElement.artifact_id == artifact_id, SDElement.path_id == path_id_of(path))
+        ).scalar_one_or_none()
+
+    def element_texts(self, artifact_id: int) -> list:
+        """(path, short, definition) of each element, read from the raw JSON, ordered by path."""
+        return self.session.execute(
+            select(
+                ElementPath.path,
+                SDJsonBlob.body["short"].astext.label("short"),
+                SDJsonBlob.body["definition"].astext.label("definition"),
+            )
+            .join(SDElement, SDElement.raw_json_hash == SDJsonBlob.content_hash)
+            .join(ElementPath, ElementPath.id == SDElement.path_id)
+            .where(SDElement.artifact_id == artifact_id)
+            .order_by(ElementPath.path)
+        ).all()
+
+    def bindings(
+        self,
+        artifact_id: int,
+        path: Optional[str] = None,
+        limit: Optional[int] = None,
+        paths: Optional[list[str]] = None,
+    ) -> list:
+        """Bindings ordered by (path, strength, value_set)."""
+        stmt = (
+            select(ElementPath.path, SDBinding.strength, SDBinding.value_set, SDBinding.source_choice)
+            .join(ElementPath, ElementPath.id == SDBinding.path_id)
+            .where(SDBinding.artifact_id == artifact_id)
+            .order_by(ElementPath.path, SDBinding.strength, SDBinding.value_set)
+            .limit(limit)
+        )
+        if path is not None:
+            stmt = stmt.where(SDBinding.path_id == path_id_of(path))
+        if paths is not None:
+            stmt = stmt.where(path_in(paths))
+        return self.session.execute(stmt).all()
+
+    def binding_count(self, artifact_id: int) -> int:
+        return self.session.execute(
+            select(func.count()).select_from(SDBinding).where(SDBinding.artifact_id == artifact_id)
+        ).scalar_one()
+
+    def constraints(
+        self,
+        artifact_id: int,
+        path: Optional[str] = None,
+        limit: Optional[int] = None,
+        path_prefix: Optional[str] = None,
+        paths: Optional[list[str]] = None,
+    ) -> list:
+        """Constraints ordered by (path, key)."""
+        stmt = (
+            select(
+                ElementPath.path,
+                SDConstraint.key,
+                SDConstraint.severity,
+                SDConstraint.human,
+                SDConstraint.expression,
+                SDConstraint.source_choice,
+            )
+            .join(ElementPath, ElementPath.id == SDConstraint.path_id)
+            .where(SDConstraint.artifact_id == artifact_id)
+            .order_by(ElementPath.path, SDConstraint.key)
+            .limit(limit)
+        )
+        if path is not None:
+            stmt = stmt.where(SDConstraint.path_id == path_id_of(path))
+        if path_prefix is not None:
+            stmt = stmt.where(in_subtree(path_prefix))
+        if paths is not None:
+            stmt = stmt.where(path_in(paths))
+        return self.session.execute(stmt).all()
+
+    def search_constraints(
+        self,
+        q: Optional[str] = None,
+        expression: Optional[str] = None,
+        ig: Optional[str] = None,
+        ig_version: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> tuple[int, list]:
+        """Constraints matching full-text q and/or an expression substring, best match first.
+
+        q is a web-search query over key, human text and expression (search_vector GIN index);
+        expression is a case-insensitive substring of the FHIRPath (trigram GIN index).
+        Returns the total number of matches and one page of rows.
+        """
+        conditions = []
+        rank = null()
+        if q:
+            # English matches stemmed text; 'simple' matches verbatim FHIRPath tokens (all, not).
+            query = websearch_to_tsquery("english", q).op("||")(websearch_to_tsquery("simple", q))
+            conditions.append(SDConstraint.search_vector.op("@@")(query))
+            rank = func.ts_rank_cd(SDConstraint.search_vector, query)
+        if expression:
+            conditions.append(SDConstraint.expression.ilike("%" + like_prefix(expression)))
+        if ig is not None:
+            conditions.append(Package.ig == ig)
+        if ig_version is not None:
+            conditions.append(Package.ig_version == ig_version)
+
+        base = (
+            select(SDConstraint.id)
+            .join(Artifact, Artifact.id == SDConstraint.artifact_id)
+            .join(Package, Package.id == Artifact.package_id)
+            .where(*conditions)
+        )
+        total = self.session.execute(
+            select(func.count()).select_from(base.subquery())
+        ).scalar_one()
+
+        order = [
+            Artifact.canonical_url,
+            func.coalesce(Artifact.version, ""),
+            ElementPath.path,
+            SDConstraint.key,
+        ]
+        if q:
+            order.insert(0, desc(rank))
+        rows = self.session.execute(
+            select(
+                Artifact.canonical_url,
+                Artifact.version,
+                Artifact.name,
+                Artifact.sd_type,
+                Package.ig,
+                Package.ig_version,
+                ElementPath.path,
+                SDConstraint.key,
+                SDConstraint.severity,
+                SDConstraint.human,
+                SDConstraint.expression,
+                SDConstraint.source_choice,
+                rank.label("rank"),
+            )
+            .join(Artifact, Artifact.id == SDConstraint.artifact_id)
+            .join(Package, Package.id == Artifact.package_id)
+            .join(ElementPath, ElementPath.id == SDConstraint.path_id)
+            .where(*conditions)
+            .order_by(*order)
+            .limit(limit)
+            .offset(offset)
+        ).all()
+        return total, rows
+
+    def search_text(
+        self,
+        terms: list[str],
+        ig: Optional[str] = None,
+        ig_version: Optional[str] = None,
+        limit: int = 10,
+    ) -> list:
+        """Top BM25 matches of index terms over element and constraint text, best first.
+
+        Reads only the postings of the given terms (primary-key lookups on search_postings),
+        scores in Python, then fetches the winning documents. Rows carry a score column.
+        """
+        conditions = [SearchPosting.term == any_(literal(list(terms), ARRAY(Text)))]
+        if ig is not None:
+            conditions.append(Package.ig == ig)
+        if ig_version is not None:
+            conditions.append(Package.ig_version == ig_version)
+        postings = self.session.execute(
+            select(SearchPosting.package_id, SearchPosting.doc_ids, SearchPosting.weights)
+            .join(Package, Package.id == SearchPosting.package_id)
+            .where(*conditions)
+        ).all()
+        best = top_k(postings, limit)
+        if not best:
+            return []
+        docs = self.session.execute(
+            select(
+                SearchDoc.package_id,
+                SearchDoc.doc_id,
+                Artifact.canonical_url,
+                Artifact.version,
+                Artifact.name,
+                Artifact.sd_type,
+                Package.ig,
+                Package.ig_version,
+                ElementPath.path,
+                SearchDoc.kind,
+                SearchDoc.key,
+                SearchDoc.snippet,
+            )
+            .join(Artifact, Artifact.id == SearchDoc.artifact_id)
+            .join(Package, Package.id == SearchDoc.package_id)
+            .join(ElementPath, ElementPath.id == SearchDoc.path_id)
+            .where(tuple_(SearchDoc.package_id, SearchDoc.doc_id).in_([b[1:] for b in best]))
+        ).all()
+        by_key = {(d.package_id, d.doc_id): d for d in docs}
+        return [
+            SearchHit(score, *by_key[(package_id, doc_id)][2:])
+            for score, package_id, doc_id in best
+            if (package_id, doc_id) in by_key
+        ]
+
+    def constraint_count(self, artifact_id: int) -> int:
+        return self.session.execute(
+            select(func.count()).select_from(SDConstraint).where(SDConstraint.artifact_id == artifact_id)
+        ).scalar_one()
+
+    @staticmethod
+    def _value_set_usage_select(*leading):
+        return (
+            select(
+                *leading,
+                Artifact.canonical_url,
+                Artifact.version,
+                Artifact.name,
+                Artifact.sd_type,
+                Artifact.file_path,
+                ElementPath.path,
+                SDBinding.strength,
+                SDBinding.source_choice,
+                Artifact.id.label("artifact_id"),
+            )
+            .join(SDBinding, SDBinding.artifact_id == Artifact.id)
+            .join(ElementPath, ElementPath.id == SDBinding.path_id)
+        )
+
+    def value_set_usages(self, package_id: int, value_set: str) -> list:
+        """Bindings of a ValueSet across a package, ordered by (sd_type, canonical_url, path)."""
+        return self.session.execute(
+            self._value_set_usage_select()
+            .where(Artifact.package_id == package_id, SDBinding.value_set == value_set)
+            .order_by(Artifact.sd_type, Artifact.canonical_url, ElementPath.path)
+        ).all()
+
+    def value_set_usages_many(
+        self, package_id: int, value_sets: list[str], any_version: list[str] = ()
+    ) -> dict[str, list]:
+        """value_set_usages for several ValueSets in one ``value_set = ANY(:value_sets)`` query,
+        keyed by binding value; a bare URL in any_version also matches every url|version."""
+        matches = SDBinding.value_set == any_(literal(list(value_sets), ARRAY(Text)))
+        if any_version:
+            urls = literal(list(any_version), ARRAY(Text))
+            matches = or_(matches, func.split_part(SDBinding.value_set, "|", 1) == any_(urls))
+        rows = self.session.execute(
+            self._value_set_usage_select(SDBinding.value_set)
+            .where(Artifact.package_id == package_id, matches)
+            .order_by(SDBinding.value_set, Artifact.sd_type, Artifact.canonical_url, ElementPath.path)
+        ).all()
+        return {vs: list(usages) for vs, usages in groupby(rows, key=lambda r: r.value_set)}
+
+    def type_ref_usages(self, package_id: int, ref_canonical: str, extension: bool) -> list:
+        """Elements whose type references a canonical, ordered by (sd_type, canonical_url, path).
+
+        extension=True finds Extension type profiles (extension where-used); otherwise every
+        other type profile / targetProfile reference (profile where-used).
+        """
+        stmt = (
+            select(
+                Artifact.canonical_url,
+                Artifact.version,
+                Artifact.name,
+                Artifact.sd_type,
+                Artifact.file_path,
+                ElementPath.path,
+                SDElementTypeRef.code,
+                SDElementTypeRef.kind,
+                Artifact.id.label("artifact_id"),
+            )
+            .join(SDElementTypeRef, SDElementTypeRef.artifact_id == Artifact.id)
+            .join(ElementPath, ElementPath.id == SDElementTypeRef.path_id)
+            .where(Artifact.package_id == package_id, SDElementTypeRef.ref_canonical == ref_canonical)
+            .order_by(
+                Artifact.sd_type,
+                Artifact.canonical_url,
+                ElementPath.path,
+                SDElementTypeRef.kind,
+                SDElementTypeRef.code,
+            )
+        )
+        if extension:
+            stmt = stmt.where(SDElementTypeRef.kind == "profile", SDElementTypeRef.code == "Extension")
+        else:
+            stmt = stmt.where(SDElementTypeRef.code != "Extension")
+        return self.session.execute(stmt).all()
+
+    def value_set_usage_matrix(self, package_id: int) -> list:
+        """Per-ValueSet usage counts by binding strength, from the value_set_usage_matrix rollup."""
+        m = value_set_usage_matrix.c
+        return self.session.execute(
+            select(
+                m.value_set,
+                m.required_count,
+                m.extensible_count,
+                m.preferred_count,
+                m.example_count,
+                m.other_count,
+                m.total_count,
+                m.profile_count,
+            )
+            .where(m.package_id == package_id)
+            .order_by(m.value_set)
+        ).all()
+
+    def diff_profiles(self, old_id: int, new_id: int) -> tuple[FactChange, ...]:
+        return diff_artifacts(self.session, old_id, new_id)
+
+    def diff_packages(self, old_package_id: int, new_package_id: int) -> PackageDiff:
+        return diff_packages(self.session, old_package_id, new_package_id)
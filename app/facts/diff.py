@@ -0,0 +1,275 @@
+"""Version-over-version diffs of profile facts.
+
+Every element, binding and constraint row carries a content_hash over its normalized facts
+(a generated column, see app.db.models.fact_hash). A diff full-joins the two sides on
+identity (profile pair, path and the row key) and keeps rows whose hashes differ, so
+unchanged facts are never shipped out of Postgres. The element hash also covers the element's
+raw JSON; when that changed, the differing top-level ElementDefinition keys (short,
+definition, type, fixed[x], slicing, ...) are reported alongside the column facts. Results are cached per version pair;
+the cache key includes both packages' ingest generations, so re-ingesting either side
+invalidates it.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import Table, and_, func, literal, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app.db.models import (
+    BINDING_FACT_COLUMNS,
+    CONSTRAINT_FACT_COLUMNS,
+    ELEMENT_FACT_COLUMNS,
+    Artifact,
+    ElementPath,
+    Package,
+    SDBinding,
+    SDConstraint,
+    SDElement,
+    SDElementTypeRef,
+    SDJsonBlob,
+)
+
+DIFF_CACHE_SIZE = int(os.getenv("DIFF_CACHE_SIZE", "64"))
+
+
+class FactSpec(NamedTuple):
+    kind: str
+    table: Table
+    key: tuple[str, ...]  # identity columns besides path
+    facts: tuple[str, ...]  # reported as before/after
+    hashed: bool
+    content: Optional[str] = None  # raw JSON blob hash column; changed JSON keys are reported
+
+
+FACT_SPECS = (
+    FactSpec("elements", SDElement.__table__, (), ELEMENT_FACT_COLUMNS, True, "raw_json_hash"),
+    FactSpec(
+        "bindings",
+        SDBinding.__table__,
+        ("value_set",),
+        tuple(c for c in BINDING_FACT_COLUMNS if c != "value_set"),
+        True,
+    ),
+    FactSpec("constraints", SDConstraint.__table__, ("key",), CONSTRAINT_FACT_COLUMNS, True),
+    # Type references are pure identity rows: they can only be added or removed.
+    FactSpec("type_refs", SDElementTypeRef.__table__, ("kind", "code", "ref_canonical"), (), False),
+)
+FACT_KINDS = tuple(spec.kind for spec in FACT_SPECS)
+# ElementDefinition keys already reported through the element columns.
+COLUMN_JSON_KEYS = frozenset({"min", "max", "mustSupport", "isModifier", "isSummary"})
+
+
+class FactChange(NamedTuple):
+    kind: str
+    pair_id: int  # artifact id of the "to" profile
+    path: str
+    key: dict
+    before: Optional[dict]  # None when added
+    after: Optional[dict]  # None when removed
+
+
+class ProfilePair(NamedTuple):
+    canonical_url: str
+    from_version: Optional[str]
+    to_version: Optional[str]
+    pair_id: int
+
+
+class PackageDiff(NamedTuple):
+    profiles_added: tuple  # (canonical_url, version)
+    profiles_removed: tuple  # (canonical_url, version)
+    pairs: tuple[ProfilePair, ...]
+    changes: tuple[FactChange, ...]
+
+
+class DiffCache:
+    """Small thread-safe LRU; diffs are expensive and version pairs are few."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute: Callable):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+DIFF_CACHE = DiffCache(DIFF_CACHE_SIZE)
+
+
+def _json_changes(session: Session, rows) -> dict:
+    """(old blob hash, new blob hash) -> (before, after) for the top-level JSON keys that differ."""
+    wanted = {(r.old_content, r.new_content) for r in rows}
+    wanted = {p for p in wanted if p[0] != p[1]}
+    hashes = {h for p in wanted for h in p if h is not None}
+    bodies = {}
+    if hashes:
+        blobs = select(SDJsonBlob.content_hash, SDJsonBlob.body)
+        bodies = dict(session.execute(blobs.where(SDJsonBlob.content_hash.in_(hashes))).all())
+    out = {}
+    for old_hash, new_hash in wanted:
+        old, new = bodies.get(old_hash) or {}, bodies.get(new_hash) or {}
+        keys = sorted((old.keys() | new.keys()) - COLUMN_JSON_KEYS)
+        changed = [k for k in keys if old.get(k) != new.get(k)]
+        out[old_hash, new_hash] = (
+            {k: old.get(k) for k in changed},
+            {k: new.get(k) for k in changed},
+        )
+    return out
+
+
+def _fact_changes(session: Session, pairs, spec: FactSpec) -> list[FactChange]:
+    table = spec.table
+
+    def side(artifact_id):
+        columns = [pairs.c.pair_id, table.c.path_id]
+        columns += [table.c[c] for c in spec.key + spec.facts]
+        if spec.hashed:
+            columns.append(table.c.content_hash)
+        if spec.content:
+            columns.append(table.c[spec.content].label("content"))
+        return select(*columns).join(pairs, table.c.artifact_id == artifact_id).subquery()
+
+    old, new = side(pairs.c.old_id), side(pairs.c.new_id)
+    on = and_(
+        old.c.pair_id == new.c.pair_id,
+        old.c.path_id == new.c.path_id,
+        *[old.c[c] == new.c[c] for c in spec.key],
+    )
+    if spec.hashed:
+        differs = old.c.content_hash.is_distinct_from(new.c.content_hash)
+    else:
+        differs = or_(old.c.path_id.is_(None), new.c.path_id.is_(None))
+    path_id = func.coalesce(old.c.path_id, new.c.path_id)
+    keys = [func.coalesce(old.c[c], new.c[c]).label(c) for c in spec.key]
+    content = []
+    if spec.content:
+        content = [old.c.content.label("old_content"), new.c.content.label("new_content")]
+    stmt = (
+        select(
+            func.coalesce(new.c.pair_id, old.c.pair_id).label("pair_id"),
+            ElementPath.path,
+            *keys,
+            old.c.path_id.is_not(None).label("in_old"),
+            new.c.path_id.is_not(None).label("in_new"),
+            *[old.c[c].label(f"old_{c}") for c in spec.facts],
+            *[new.c[c].label(f"new_{c}") for c in spec.facts],
+            *content,
+        )
+        .select_from(old.join(new, on, full=True))
+        .join(ElementPath, ElementPath.id == path_id)
+        .where(differs)
+        .order_by("pair_id", ElementPath.path, *keys)
+    )
+    rows = session.execute(stmt).all()
+    json_changes = {}
+    if spec.content:
+        json_changes = _json_changes(session, [r for r in rows if r.in_old and r.in_new])
+
+    changes = []
+    for r in rows:
+        before = {c: getattr(r, f"old_{c}") for c in spec.facts} if r.in_old else None
+        after = {c: getattr(r, f"new_{c}") for c in spec.facts} if r.in_new else None
+        if before is not None and after is not None and spec.content:
+            old_json, new_json = json_changes.get((r.old_content, r.new_content), ({}, {}))
+            before, after = {**before, **old_json}, {**after, **new_json}
+        key = {c: getattr(r, c) for c in spec.key}
+        changes.append(FactChange(spec.kind, r.pair_id, r.path, key, before, after))
+    return changes
+
+
+def _all_changes(session: Session, pairs) -> tuple[FactChange, ...]:
+    changes: list[FactChange] = []
+    for spec in FACT_SPECS:
+        changes.extend(_fact_changes(session, pairs, spec))
+    return tuple(changes)
+
+
+def _generations(session: Session, package_ids) -> tuple:
+    rows = session.execute(
+        select(Package.id, Package.generation).where(Package.id.in_(set(package_ids)))
+    ).all()
+    return tuple(sorted((r.id, r.generation) for r in rows))
+
+
+def diff_artifacts(session: Session, old_id: int, new_id: int) -> tuple[FactChange, ...]:
+    """Fact changes going from one StructureDefinition to another (pair_id is new_id)."""
+    package_ids = session.execute(
+        select(Artifact.package_id).where(Artifact.id.in_((old_id, new_id)))
+    ).scalars()
+    key = ("profile", old_id, new_id, _generations(session, package_ids))
+
+    def compute():
+        pairs = select(
+            literal(old_id).label("old_id"),
+            literal(new_id).label("new_id"),
+            literal(new_id).label("pair_id"),
+        ).subquery()
+        return _all_changes(session, pairs)
+
+    return DIFF_CACHE.get_or_compute(key, compute)
+
+
+def diff_packages(session: Session, old_package_id: int, new_package_id: int) -> PackageDiff:
+    """Profiles added/removed by canonical URL, plus fact changes of profiles in both."""
+    key = (
+        "package",
+        old_package_id,
+        new_package_id,
+        _generations(session, (old_package_id, new_package_id)),
+    )
+
+    def compute():
+        o, n = aliased(Artifact), aliased(Artifact)
+        pairs = (
+            select(o.id.label("old_id"), n.id.label("new_id"), n.id.label("pair_id"))
+            .join(n, and_(n.canonical_url == o.canonical_url, n.package_id == new_package_id))
+            .where(o.package_id == old_package_id)
+            .subquery()
+        )
+        pair_rows = session.execute(
+            select(n.canonical_url, o.version, n.version, n.id)
+            .join(o, and_(o.canonical_url == n.canonical_url, o.package_id == old_package_id))
+            .where(n.package_id == new_package_id)
+            .order_by(n.canonical_url, n.version, n.id)
+        ).all()
+
+        def only_in(package_id: int, other_id: int) -> tuple:
+            a, b = aliased(Artifact), aliased(Artifact)
+            other = select(b.id).where(b.package_id == other_id, b.canonical_url == a.canonical_url)
+            return tuple(
+                (r.canonical_url, r.version)
+                for r in session.execute(
+                    select(a.canonical_url, a.version)
+                    .where(a.package_id == package_id, ~other.exists())
+                    .order_by(a.canonical_url, a.version)
+                )
+            )
+
+        return PackageDiff(
+            only_in(new_package_id, old_package_id),
+            only_in(old_package_id, new_package_id),
+            tuple(ProfilePair(*r) for r in pair_rows),
+            _all_changes(session, pairs),
+        )
+
+    return DIFF_CACHE.get_or_compute(key, compute)
@@ -0,0 +1,792 @@
+from __future__ import annotations
+
+import logging
+import re
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import groupby
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import (
+    Artifact,
+    ElementPath,
+    Package,
+    ProfileClosure,
+    SDBinding,
+    SDConstraint,
+    SDElement,
+    SDElementTypeRef,
+)
+from app.facts.db import DbFacts, ingest_generation
+
+log = logging.getLogger(__name__)
+
+_intern = sys.intern
+
+
+def _intern_opt(value: Optional[str]) -> Optional[str]:
+    return _intern(value) if value is not None else None
+
+
+class ElementRow(NamedTuple):
+    path: str
+    min: Optional[int]
+    max: Optional[str]
+    must_support: Optional[bool]
+
+
+class BindingRow(NamedTuple):
+    path: str
+    strength: Optional[str]
+    value_set: str
+    source_choice: str
+
+
+class ConstraintRow(NamedTuple):
+    path: str
+    key: str
+    severity: Optional[str]
+    human: Optional[str]
+    expression: Optional[str]
+    source_choice: str
+
+
+class TypeRefRow(NamedTuple):
+    path: str
+    kind: str
+    code: str
+    ref_canonical: str
+
+
+class TypeRefUsage(NamedTuple):
+    canonical_url: str
+    version: Optional[str]
+    name: Optional[str]
+    sd_type: Optional[str]
+    file_path: str
+    path: str
+    code: str
+    kind: str
+    artifact_id: int
+
+
+def type_ref_filter(extension: bool) -> Callable[[TypeRefUsage], bool]:
+    """Extension where-used keeps Extension type profiles; profile where-used keeps the rest."""
+    if extension:
+        return lambda u: u.kind == "profile" and u.code == "Extension"
+    return lambda u: u.code != "Extension"
+
+
+def type_ref_order(u) -> tuple:
+    """Sort key matching DbFacts.type_ref_usages."""
+    return (u.sd_type is None, u.sd_type or "", u.canonical_url, u.path, u.kind, u.code)
+
+
+class ValueSetUsage(NamedTuple):
+    canonical_url: str
+    version: Optional[str]
+    name: Optional[str]
+    sd_type: Optional[str]
+    file_path: str
+    path: str
+    strength: Optional[str]
+    source_choice: str
+    artifact_id: int
+
+
+class ValueSetUsageCounts(NamedTuple):
+    value_set: str
+    required_count: int
+    extensible_count: int
+    preferred_count: int
+    example_count: int
+    other_count: int
+    total_count: int
+    profile_count: int
+
+
+class ElementMatch(NamedTuple):
+    artifact_id: int
+    canonical_url: str
+    version: Optional[str]
+    name: Optional[str]
+    sd_type: Optional[str]
+    ig: str
+    ig_version: str
+    path: str
+    min: Optional[int]
+    max: Optional[str]
+    must_support: Optional[bool]
+
+
+BINDING_STRENGTHS = ("required", "extensible", "preferred", "example")
+
+# Element search: exact (``*`` wildcards allowed), prefix (path or any descendant), fuzzy.
+PATH_MATCH_MODES = ("exact", "prefix", "fuzzy")
+# pg_trgm's default similarity_threshold, used by the ``%`` operator.
+TRIGRAM_THRESHOLD = 0.3
+
+
+def summarize_usages(value_set: str, usages) -> ValueSetUsageCounts:
+    """Per-strength counts for one ValueSet, matching the value_set_usage_matrix view."""
+    by_strength = dict.fromkeys(BINDING_STRENGTHS, 0)
+    other = 0
+    profiles = set()
+    for u in usages:
+        if u.strength in by_strength:
+            by_strength[u.strength] += 1
+        else:
+            other += 1
+        profiles.add((u.canonical_url, u.version))
+    return ValueSetUsageCounts(
+        value_set, *by_strength.values(), other, len(usages), len(profiles)
+    )
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigrams as pg_trgm extracts them: lower-cased alphanumeric words padded "  word "."""
+    grams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """pg_trgm similarity(): shared trigrams over the union of both trigram sets."""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def path_matcher(path: str, match: str) -> Callable[[str], bool]:
+    """Predicate mirroring DbFacts path matching for the in-process engines."""
+    if match == "fuzzy":
+        return lambda candidate: trigram_similarity(path, candidate) >= TRIGRAM_THRESHOLD
+    pattern = ".*".join(re.escape(part) for part in path.split("*"))
+    if match == "prefix":
+        pattern += r"(?:\..*)?"
+    compiled = re.compile(pattern, re.DOTALL)
+    return lambda candidate: compiled.fullmatch(candidate) is not None
+
+
+def element_filter(
+    path: str,
+    match: str,
+    must_support: Optional[bool],
+    card_min: Optional[int],
+    card_max: Optional[str],
+) -> Callable[[ElementRow], bool]:
+    matches_path = path_matcher(path, match)
+
+    def keep(row: ElementRow) -> bool:
+        return (
+            (must_support is None or row.must_support is must_support)
+            and (card_min is None or row.min == card_min)
+            and (card_max is None or row.max == card_max)
+            and matches_path(row.path)
+        )
+
+    return keep
+
+
+def page_element_matches(
+    candidates: Iterable[tuple], keep: Callable[[ElementRow], bool], limit: int, offset: int
+) -> tuple[int, list[ElementMatch]]:
+    """Page over profiles with at least one kept element.
+
+    ``candidates`` yields (artifact, package, element rows) in search order; returns the number
+    of matching profiles and the page's matches, grouped by profile and ordered by path.
+    """
+    total = 0
+    matches: list[ElementMatch] = []
+    for artifact, package, rows in candidates:
+        kept = [r for r in rows if keep(r)]
+        if not kept:
+            continue
+        if offset <= total < offset + limit:
+            matches.extend(
+                ElementMatch(
+                    artifact.id,
+                    artifact.canonical_url,
+                    artifact.version,
+                    artifact.name,
+                    artifact.sd_type,
+                    package.ig,
+                    package.ig_version,
+                    r.path,
+                    r.min,
+                    r.max,
+                    r.must_support,
+                )
+                for r in kept
+            )
+        total += 1
+    return total, matches
+
+
+def search_order(artifact) -> tuple:
+    """Profile order of element search results (matches DbFacts.search_elements)."""
+    return artifact.canonical_url, artifact.version or "", artifact.id
+
+
+class PackageFacts:
+    __slots__ = ("id", "ig", "ig_version", "generation")
+
+    def __init__(self, id: int, ig: str, ig_version: str, generation: int):
+        self.id = id
+        self.ig = ig
+        self.ig_version = ig_version
+        self.generation = generation
+
+
+class ArtifactFacts:
+    """One StructureDefinition with its facts as tuples sorted by path (for bisect lookups)."""
+
+    __slots__ = (
+        "id",
+        "package_id",
+        "canonical_url",
+        "version",
+        "name",
+        "title",
+        "sd_type",
+        "base_definition",
+        "file_path",
+        "indexed_at",
+        "elements",
+        "element_paths",
+        "must_support",
+        "bindings",
+        "binding_paths",
+        "constraints",
+        "constraint_paths",
+        "type_refs",
+        "ancestors",
+    )
+
+    def __init__(self, row):
+        self.id = row.id
+        self.package_id = row.package_id
+        self.canonical_url = _intern(row.canonical_url)
+        self.version = _intern_opt(row.version)
+        self.name = row.name
+        self.title = row.title
+        self.sd_type = _intern_opt(row.sd_type)
+        self.base_definition = _intern_opt(row.base_definition)
+        self.file_path = row.file_path
+        self.indexed_at = row.indexed_at
+        self.set_elements(())
+        self.set_bindings(())
+        self.set_constraints(())
+        self.type_refs: tuple[TypeRefRow, ...] = ()
+        # (depth, ancestor id) along baseDefinition, nearest first; from profile_closure.
+        self.ancestors: tuple[tuple[int, int], ...] = ()
+
+    def set_elements(self, rows: list[ElementRow]) -> None:
+        self.elements = tuple(sorted(rows, key=lambda r: r.path))
+        self.element_paths = tuple(r.path for r in self.elements)
+        self.must_support = tuple(r for r in self.elements if r.must_support is True)
+
+    def set_bindings(self, rows: list[BindingRow]) -> None:
+        self.bindings = tuple(
+            sorted(rows, key=lambda r: (r.path, r.strength is None, r.strength or "", r.value_set))
+        )
+        self.binding_paths = tuple(r.path for r in self.bindings)
+
+    def set_constraints(self, rows: list[ConstraintRow]) -> None:
+        self.constraints = tuple(sorted(rows, key=lambda r: (r.path, r.key)))
+        self.constraint_paths = tuple(r.path for r in self.constraints)
+
+
+def _path_slice(rows: tuple, paths: tuple, path: Optional[str]) -> tuple:
+    if path is None:
+        return rows
+    return rows[bisect_left(paths, path) : bisect_right(paths, path)]
+
+
+def _paths_slice(rows: tuple, paths: tuple, wanted: Optional[Iterable[str]]) -> tuple:
+    """Rows at any of the wanted paths, still in path order."""
+    if wanted is None:
+        return rows
+    return tuple(r for path in sorted(set(wanted)) for r in _path_slice(rows, paths, path))
+
+
+def _subtree_slice(rows: tuple, paths: tuple, path_prefix: Optional[str]) -> tuple:
+    """Rows at path_prefix plus every row below it (paths starting with path_prefix + ".")."""
+    if path_prefix is None:
+        return rows
+    exact = _path_slice(rows, paths, path_prefix)
+    # "/" sorts right after ".", so [prefix + ".", prefix + "/") is exactly the descendants.
+    lo = bisect_left(paths, path_prefix + ".")
+    return exact + rows[lo : bisect_left(paths, path_prefix + "/", lo)]
+
+
+def _resolve_order(artifacts: list[ArtifactFacts]) -> tuple[ArtifactFacts, ...]:
+    # Mirrors DbFacts.resolve_artifact: unversioned first, then version/indexed_at/id descending.
+    ordered = sorted(artifacts, key=lambda a: a.id, reverse=True)
+    ordered.sort(key=lambda a: a.indexed_at, reverse=True)
+    ordered.sort(key=lambda a: a.version or "", reverse=True)
+    ordered.sort(key=lambda a: a.version is not None)
+    return tuple(ordered)
+
+
+class MemoryFacts:
+    """Read-only facts held in process memory; same query surface as DbFacts."""
+
+    def __init__(
+        self,
+        generation: tuple,
+        packages: list[PackageFacts],
+        artifacts: list[ArtifactFacts],
+        session_factory: Callable[[], Session],
+    ):
+        self.generation = generation
+        self._session_factory = session_factory
+        self._packages_by_id = {p.id: p for p in packages}
+        self._packages_by_key = {(p.ig, p.ig_version): p for p in packages}
+        self.packages = tuple(packages)
+        self.artifacts = tuple(artifacts)
+        self._artifacts_by_id = {a.id: a for a in artifacts}
+        self._search_order = tuple(sorted(artifacts, key=search_order))
+        descendants: dict[int, list[tuple[int, ArtifactFacts]]] = {}
+        for artifact in artifacts:
+            for depth, ancestor_id in artifact.ancestors:
+                descendants.setdefault(ancestor_id, []).append((depth, artifact))
+        self._descendants = {
+            k: tuple(sorted(v, key=lambda d: (d[0], search_order(d[1])))) for k, v in descendants.items()
+        }
+
+        by_canonical: dict[str, list[ArtifactFacts]] = {}
+        for artifact in artifacts:
+            by_canonical.setdefault(artifact.canonical_url, []).append(artifact)
+        self._by_canonical = {k: _resolve_order(v) for k, v in by_canonical.items()}
+
+        usages: dict[tuple[int, str], list[ValueSetUsage]] = {}
+        for artifact in artifacts:
+            for b in artifact.bindings:
+                usages.setdefault((artifact.package_id, b.value_set), []).append(
+                    ValueSetUsage(
+                        artifact.canonical_url,
+                        artifact.version,
+                        artifact.name,
+                        artifact.sd_type,
+                        artifact.file_path,
+                        b.path,
+                        b.strength,
+                        b.source_choice,
+                        artifact.id,
+                    )
+                )
+        self._value_set_usages = {
+            k: tuple(
+                sorted(v, key=lambda u: (u.sd_type is None, u.sd_type or "", u.canonical_url, u.path))
+            )
+            for k, v in usages.items()
+        }
+        by_url: dict[tuple[int, str], list[str]] = {}
+        for package_id, value_set in self._value_set_usages:
+            by_url.setdefault((package_id, value_set.partition("|")[0]), []).append(value_set)
+        self._value_sets_by_url = {k: tuple(sorted(v)) for k, v in by_url.items()}
+        type_refs: dict[tuple[int, str], list[TypeRefUsage]] = {}
+        for artifact in artifacts:
+            for r in artifact.type_refs:
+                type_refs.setdefault((artifact.package_id, r.ref_canonical), []).append(
+                    TypeRefUsage(
+                        artifact.canonical_url,
+                        artifact.version,
+                        artifact.name,
+                        artifact.sd_type,
+                        artifact.file_path,
+                        r.path,
+                        r.code,
+                        r.kind,
+                        artifact.id,
+                    )
+                )
+        self._type_ref_usages = {k: tuple(sorted(v, key=type_ref_order)) for k, v in type_refs.items()}
+
+        matrix: dict[int, list[ValueSetUsageCounts]] = {p.id: [] for p in packages}
+        for (package_id, value_set), rows in sorted(self._value_set_usages.items()):
+            if value_set:
+                matrix[package_id].append(summarize_usages(value_set, rows))
+        self._usage_matrix = {k: tuple(v) for k, v in matrix.items()}
+
+    def resolve_artifact(
+        self, canonical: str, version: Optional[str]
+    ) -> Optional[tuple[ArtifactFacts, PackageFacts]]:
+        candidates = self._by_canonical.get(canonical, ())
+        for artifact in candidates:
+            if version is None or artifact.version == version:
+                return artifact, self._packages_by_id[artifact.package_id]
+        return None
+
+    def find_package(self, ig: str, ig_version: str) -> Optional[PackageFacts]:
+        return self._packages_by_key.get((ig, ig_version))
+
+    def lineage(self, artifact_id: int) -> list:
+        return [
+            (depth, self._artifacts_by_id[ancestor_id])
+            for depth, ancestor_id in self._artifacts_by_id[artifact_id].ancestors
+        ]
+
+    def descendants(self, artifact_id: int) -> tuple:
+        return self._descendants.get(artifact_id, ())
+
+    def artifacts_for_canonical(self, canonical: str) -> tuple[ArtifactFacts, ...]:
+        """All artifacts for a canonical, in resolve_artifact preference order."""
+        return self._by_canonical.get(canonical, ())
+
+    def must_support(
+        self, artifact_id: int, limit: Optional[int] = None, path_prefix: Optional[str] = None
+    ) -> tuple:
+        if path_prefix is None:
+            return self._artifacts_by_id[artifact_id].must_support[:limit]
+        return self.elements(artifact_id, path_prefix, must_support_only=True, limit=limit)
+
+    def must_support_count(self, artifact_id: int) -> int:
+        return len(self._artifacts_by_id[artifact_id].must_support)
+
+    def fact_counts(self, artifact_id: int) -> tuple[int, int, int]:
+        """(must_support, bindings, constraints) counts."""
+        artifact = self._artifacts_by_id[artifact_id]
+        return len(artifact.must_support), len(artifact.bindings), len(artifact.constraints)
+
+    def elements(
+        self,
+        artifact_id: int,
+        path_prefix: Optional[str] = None,
+        must_support_only: bool = False,
+        limit: Optional[int] = None,
+        paths: Optional[list[str]] = None,
+    ) -> tuple:
+        artifact = self._artifacts_by_id[artifact_id]
+        rows = _subtree_slice(artifact.elements, artifact.element_paths, path_prefix)
+        if paths is not None:
+            rows = _paths_slice(rows, tuple(r.path for r in rows), paths)
+        if must_support_only:
+            rows = tuple(r for r in rows if r.must_support is True)
+        return rows[:limit]
+
+    def search_elements(
+        self,
+        path: str,
+        match: str = "exact",
+        must_support: Optional[bool] = None,
+        card_min: Optional[int] = None,
+        card_max: Optional[str] = None,
+        ig: Optional[str] = None,
+        ig_version: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> tuple[int, list[ElementMatch]]:
+        keep = element_filter(path, match, must_support, card_min, card_max)
+        candidates = []
+        for artifact in self._search_order:
+            package = self._packages_by_id[artifact.package_id]
+            if (ig is None or package.ig == ig) and (
+                ig_version is None or package.ig_version == ig_version
+            ):
+                candidates.append((artifact, package, artifact.elements))
+        return page_element_matches(candidates, keep, limit, offset)
+
+    def element(self, artifact_id: int, path: str) -> Optional[ElementRow]:
+        artifact = self._artifacts_by_id[artifact_id]
+        idx = bisect_left(artifact.element_paths, path)
+        if idx < len(artifact.element_paths) and artifact.element_paths[idx] == path:
+            return artifact.elements[idx]
+        return None
+
+    def element_json(self, artifact_id: int, path: str) -> Optional[dict]:
+        # Raw element JSON is deliberately not held in memory; fetch it on demand.
+        with self._session_factory() as session:
+            return DbFacts(session).element_json(artifact_id, path)
+
+    def element_texts(self, artifact_id: int) -> list:
+        with self._session_factory() as session:
+            return DbFacts(session).element_texts(artifact_id)
+
+    def bindings(
+        self,
+        artifact_id: int,
+        path: Optional[str] = None,
+        limit: Optional[int] = None,
+        paths: Optional[list[str]] = None,
+    ) -> tuple:
+        artifact = self._artifacts_by_id[artifact_id]
+        rows = _path_slice(artifact.bindings, artifact.binding_paths, path)
+        if paths is not None:
+            rows = _paths_slice(rows, tuple(r.path for r in rows), paths)
+        return rows[:limit]
+
+    def binding_count(self, artifact_id: int) -> int:
+        return len(self._artifacts_by_id[artifact_id].bindings)
+
+    def constraints(
+        self,
+        artifact_id: int,
+        path: Optional[str] = None,
+        limit: Optional[int] = None,
+        path_prefix: Optional[str] = None,
+        paths: Optional[list[str]] = None,
+    ) -> tuple:
+        artifact = self._artifacts_by_id[artifact_id]
+        rows = _path_slice(artifact.constraints, artifact.constraint_paths, path)
+        if path_prefix is not None:
+            rows = _subtree_slice(rows, tuple(r.path for r in rows), path_prefix)
+        if paths is not None:
+            rows = _paths_slice(rows, tuple(r.path for r in rows), paths)
+        return rows[:limit]
+
+    def constraint_count(self, artifact_id: int) -> int:
+        return len(self._artifacts_by_id[artifact_id].constraints)
+
+    def search_constraints(
+        self,
+        q: Optional[str] = None,
+        expression: Optional[str] = None,
+        ig: Optional[str] = None,
+        ig_version: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> tuple[int, list]:
+        # Ranked full-text search needs Postgres' stemmer and GIN indexes; run it there.
+        with self._session_factory() as session:
+            return DbFacts(session).search_constraints(q, expression, ig, ig_version, limit, offset)
+
+    def search_text(
+        self,
+        terms: list[str],
+        ig: Optional[str] = None,
+        ig_version: Optional[str] = None,
+        limit: int = 10,
+    ) -> list:
+        # The BM25 postings live in Postgres and are read per query term; run it there.
+        with self._session_factory() as session:
+            return DbFacts(session).search_text(terms, ig, ig_version, limit)
+
+    def diff_profiles(self, old_id: int, new_id: int) -> tuple:
+        # Diffs are hash joins over every fact row of both sides; Postgres does them (cached).
+        with self._session_factory() as session:
+            return DbFacts(session).diff_profiles(old_id, new_id)
+
+    def diff_packages(self, old_package_id: int, new_package_id: int):
+        with self._session_factory() as session:
+            return DbFacts(session).diff_packages(old_package_id, new_package_id)
+
+    def value_set_usages(self, package_id: int, value_set: str) -> tuple:
+        return self._value_set_usages.get((package_id, value_set), ())
+
+    def value_set_usages_many(
+        self, package_id: int, value_sets: list[str], any_version: list[str] = ()
+    ) -> dict[str, tuple]:
+        wanted = set(value_sets)
+        for url in any_version:
+            wanted.update(self._value_sets_by_url.get((package_id, url), ()))
+        return {
+            vs: self._value_set_usages[(package_id, vs)]
+            for vs in sorted(wanted)
+            if (package_id, vs) in self._value_set_usages
+        }
+
+    def type_ref_usages(self, package_id: int, ref_canonical: str, extension: bool) -> tuple:
+        keep = type_ref_filter(extension)
+        return tuple(u for u in self._type_ref_usages.get((package_id, ref_canonical), ()) if keep(u))
+
+    def value_set_usage_matrix(self, package_id: int) -> tuple:
+        return self._usage_matrix.get(package_id, ())
+
+
+def load_memory_facts(
+    session: Session,
+    session_factory: Callable[[], Session],
+    package_id: Optional[int] = None,
+) -> MemoryFacts:
+    """Read package, artifact and fact rows (all packages unless package_id) into MemoryFacts."""
+    generation = ingest_generation(session)
+    package_stmt = select(Package.id, Package.ig, Package.ig_version, Package.generation)
+    if package_id is not None:
+        package_stmt = package_stmt.where(Package.id == package_id)
+    packages = [
+        PackageFacts(r.id, _intern(r.ig), _intern(r.ig_version), r.generation)
+        for r in session.execute(package_stmt)
+    ]
+    package_ids = [p.id for p in packages]
+    artifacts = {
+        r.id: ArtifactFacts(r)
+        for r in session.execute(
+            select(
+                Artifact.id,
+                Artifact.package_id,
+                Artifact.canonical_url,
+                Artifact.version,
+                Artifact.name,
+                Artifact.title,
+                Artifact.sd_type,
+                Artifact.base_definition,
+                Artifact.file_path,
+                Artifact.indexed_at,
+            ).where(Artifact.package_id.in_(package_ids))
+        )
+    }
+
+    element_rows = session.execute(
+        select(
+            SDElement.artifact_id,
+            ElementPath.path,
+            SDElement.min,
+            SDElement.max,
+            SDElement.must_support,
+        )
+        .join(Artifact, Artifact.id == SDElement.artifact_id)
+        .join(ElementPath, ElementPath.id == SDElement.path_id)
+        .where(Artifact.package_id.in_(package_ids))
+        .order_by(SDElement.artifact_id)
+    )
+    for artifact_id, rows in groupby(element_rows, key=lambda r: r.artifact_id):
+        artifacts[artifact_id].set_elements(
+            [ElementRow(_intern(r.path), r.min, _intern_opt(r.max), r.must_support) for r in rows]
+        )
+
+    binding_rows = session.execute(
+        select(
+            SDBinding.artifact_id,
+            ElementPath.path,
+            SDBinding.strength,
+            SDBinding.value_set,
+            SDBinding.source_choice,
+        )
+        .join(Artifact, Artifact.id == SDBinding.artifact_id)
+        .join(ElementPath, ElementPath.id == SDBinding.path_id)
+        .where(Artifact.package_id.in_(package_ids))
+        .order_by(SDBinding.artifact_id)
+    )
+    for artifact_id, rows in groupby(binding_rows, key=lambda r: r.artifact_id):
+        artifacts[artifact_id].set_bindings(
+            [
+                BindingRow(
+                    _intern(r.path),
+                    _intern_opt(r.strength),
+                    _intern(r.value_set),
+                    _intern(r.source_choice),
+                )
+                for r in rows
+            ]
+        )
+
+    constraint_rows = session.execute(
+        select(
+            SDConstraint.artifact_id,
+            ElementPath.path,
+            SDConstraint.key,
+            SDConstraint.severity,
+            SDConstraint.human,
+            SDConstraint.expression,
+            SDConstraint.source_choice,
+        )
+        .join(Artifact, Artifact.id == SDConstraint.artifact_id)
+        .join(ElementPath, ElementPath.id == SDConstraint.path_id)
+        .where(Artifact.package_id.in_(package_ids))
+        .order_by(SDConstraint.artifact_id)
+    )
+    for artifact_id, rows in groupby(constraint_rows, key=lambda r: r.artifact_id):
+        artifacts[artifact_id].set_constraints(
+            [
+                ConstraintRow(
+                    _intern(r.path),
+                    _intern(r.key),
+                    _intern_opt(r.severity),
+                    r.human,
+                    r.expression,
+                    _intern(r.source_choice),
+                )
+                for r in rows
+            ]
+        )
+
+    type_ref_rows = session.execute(
+        select(
+            SDElementTypeRef.artifact_id,
+            ElementPath.path,
+            SDElementTypeRef.kind,
+            SDElementTypeRef.code,
+            SDElementTypeRef.ref_canonical,
+        )
+        .join(Artifact, Artifact.id == SDElementTypeRef.artifact_id)
+        .join(ElementPath, ElementPath.id == SDElementTypeRef.path_id)
+        .where(Artifact.package_id.in_(package_ids))
+        .order_by(SDElementTypeRef.artifact_id)
+    )
+    for artifact_id, rows in groupby(type_ref_rows, key=lambda r: r.artifact_id):
+        artifacts[artifact_id].type_refs = tuple(
+            TypeRefRow(_intern(r.path), _intern(r.kind), _intern(r.code), _intern(r.ref_canonical))
+            for r in rows
+        )
+
+    loaded_ids = select(Artifact.id).where(Artifact.package_id.in_(package_ids))
+    closure_rows = session.execute(
+        select(ProfileClosure.descendant_id, ProfileClosure.depth, ProfileClosure.ancestor_id)
+        .where(
+            ProfileClosure.descendant_id.in_(loaded_ids),
+            ProfileClosure.ancestor_id.in_(loaded_ids),
+            ProfileClosure.depth > 0,
+        )
+        .order_by(ProfileClosure.descendant_id, ProfileClosure.depth)
+    )
+    for artifact_id, rows in groupby(closure_rows, key=lambda r: r.descendant_id):
+        artifacts[artifact_id].ancestors = tuple((r.depth, r.ancestor_id) for r in rows)
+
+    return MemoryFacts(generation, packages, list(artifacts.values()), session_factory)
+
+
+class MemoryFactsStore:
+    """Holds the current MemoryFacts and rebuilds it when the ingest generation changes."""
+
+    def __init__(self, session_factory: Callable[[], Session], refresh_seconds: float = 30.0):
+        self._session_factory = session_factory
+        self._refresh_seconds = refresh_seconds
+        self._facts: Optional[MemoryFacts] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def facts(self) -> Optional[MemoryFacts]:
+        return self._facts
+
+    def refresh(self) -> bool:
+        """Reload if the generation moved; returns True when a new snapshot was swapped in."""
+        with self._lock, self._session_factory() as session:
+            current = self._facts
+            if current is not None and ingest_generation(session) == current.generation:
+                return False
+            # Build fully before swapping so readers never see a partial snapshot.
+            self._facts = load_memory_facts(session, self._session_factory)
+            return True
+
+    def start(self) -> None:
+        self.refresh()
+        if self._refresh_seconds > 0 and self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="memory-facts-refresh", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._refresh_seconds):
+            try:
+                if self.refresh():
+                    log.info("memory facts reloaded (generation=%s)", self._facts.generation)
+            except Exception:  # noqa: BLE001
+                log.exception("memory facts refresh failed; keeping previous snapshot")
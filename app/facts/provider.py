@@ -0,0 +1,86 @@
+"""Engine selection and lifecycle for the facts surface.
+
+FACTS_ENGINE picks db (a DbFacts per session), memory (MemoryFactsStore, reloaded when the
+ingest generation changes) or snapshot (an mmap'd .facts file from FACTS_SNAPSHOT). The API
+lifespan and the in-process MCP server both hold one FactsProvider so they select, start and
+stop engines the same way.
+"""
+
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app.facts.aliases import ProfileAliasStore
+from app.facts.db import DbFacts
+from app.facts.memory import MemoryFactsStore
+from app.facts.slot_terms import SlotTermsStore
+from app.facts.snapshot import SnapshotFacts
+
+FACTS_ENGINE = os.getenv("FACTS_ENGINE", "db").lower()
+FACTS_REFRESH_SECONDS = float(os.getenv("FACTS_REFRESH_SECONDS", "30"))
+FACTS_SNAPSHOT = os.getenv("FACTS_SNAPSHOT")
+
+
+class FactsProvider:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        engine: str = FACTS_ENGINE,
+        refresh_seconds: float = FACTS_REFRESH_SECONDS,
+        snapshot_path: Optional[str] = FACTS_SNAPSHOT,
+    ):
+        if engine == "snapshot" and not snapshot_path:
+            raise RuntimeError(
+                "FACTS_ENGINE=snapshot requires FACTS_SNAPSHOT (path to a .facts file)"
+            )
+        self.session_factory = session_factory
+        self.engine = engine
+        self.refresh_seconds = refresh_seconds
+        self.snapshot_path = snapshot_path
+        self.store: Optional[MemoryFactsStore] = None
+        self.snapshot: Optional[SnapshotFacts] = None
+        self.aliases = ProfileAliasStore(session_factory, refresh_seconds=refresh_seconds)
+        self.slot_terms = SlotTermsStore(session_factory, refresh_seconds=refresh_seconds)
+
+    def start(self) -> None:
+        if self.engine == "memory":
+            self.store = MemoryFactsStore(
+                self.session_factory, refresh_seconds=self.refresh_seconds
+            )
+            self.store.start()
+        elif self.engine == "snapshot":
+            self.snapshot = SnapshotFacts(
+                Path(self.snapshot_path), session_factory=self.session_factory
+            )
+
+    def stop(self) -> None:
+        if self.store is not None:
+            self.store.stop()
+            self.store = None
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+
+    def shared(self):
+        """The process-wide facts (memory or snapshot), or None when queries go to Postgres.
+
+        A memory store that has not finished its first load also returns None.
+        """
+        if self.store is not None and self.store.facts is not None:
+            return self.store.facts
+        return self.snapshot
+
+    @contextmanager
+    def facts(self) -> Iterator:
+        """Facts for one unit of work; a DbFacts gets a pooled session closed on exit."""
+        shared = self.shared()
+        if shared is not None:
+            yield shared
+            return
+        with self.session_factory() as session:
+            yield DbFacts(session)
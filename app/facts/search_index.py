@@ -0,0 +1,130 @@
+"""BM25 lexical index over element text (short, definition, comment, requirements) and constraint
+human text.
+
+The index is built per package at ingest time (app.ingest.search_index) and stored in Postgres as
+one search_postings row per term: packed doc ids plus precomputed BM25 term weights, so a query
+is a primary-key fetch of its terms' postings and a sum of weights; no document statistics are
+read at query time. Scores from different packages use each package's own statistics.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import sys
+from array import array
+from collections import Counter
+from typing import Iterable, NamedTuple, Optional
+
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have if in into is it its of on or such that the"
+    " their then there these this to was which will with".split()
+)
+
+
+class SearchHit(NamedTuple):
+    score: float
+    canonical_url: str
+    version: Optional[str]
+    name: Optional[str]
+    sd_type: Optional[str]
+    ig: str
+    ig_version: str
+    path: str
+    kind: str  # "element" | "constraint"
+    key: Optional[str]
+    snippet: Optional[str]
+
+
+_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _stem(token: str) -> str:
+    """Plural folding only ("codes" -> "code", "allergies" -> "allergy")."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Index terms of text: camelCase and dotted paths split, lower-cased, stopwords dropped."""
+    if not text:
+        return []
+    return [
+        _stem(t)
+        for t in _TOKEN.findall(_CAMEL.sub(r"\1 \2", text).lower())
+        if len(t) > 1 and t not in STOPWORDS
+    ]
+
+
+def bm25_weights(docs: list[Counter]) -> dict[str, tuple[list[int], list[float]]]:
+    """term -> (doc ids, BM25 weights) over docs (term frequencies, indexed by doc id)."""
+    n = len(docs)
+    if not n:
+        return {}
+    avgdl = sum(sum(tf.values()) for tf in docs) / n or 1.0
+    postings: dict[str, tuple[list[int], list[int]]] = {}
+    for doc_id, tf in enumerate(docs):
+        for term, count in tf.items():
+            ids, counts = postings.setdefault(term, ([], []))
+            ids.append(doc_id)
+            counts.append(count)
+    lengths = [sum(tf.values()) for tf in docs]
+    out = {}
+    for term, (ids, counts) in postings.items():
+        df = len(ids)
+        idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        out[term] = (
+            ids,
+            [
+                idf * c * (K1 + 1) / (c + K1 * (1 - B + B * lengths[d] / avgdl))
+                for d, c in zip(ids, counts)
+            ],
+        )
+    return out
+
+
+def pack_postings(doc_ids: list[int], weights: list[float]) -> tuple[bytes, bytes]:
+    """Little-endian uint32 doc ids and float32 weights."""
+    ids, ws = array("I", doc_ids), array("f", weights)
+    if sys.byteorder == "big":
+        ids.byteswap()
+        ws.byteswap()
+    return ids.tobytes(), ws.tobytes()
+
+
+def unpack_postings(doc_ids: bytes, weights: bytes) -> tuple[array, array]:
+    ids, ws = array("I"), array("f")
+    ids.frombytes(doc_ids)
+    ws.frombytes(weights)
+    if sys.byteorder == "big":
+        ids.byteswap()
+        ws.byteswap()
+    return ids, ws
+
+
+def top_k(postings: Iterable[tuple[int, bytes, bytes]], limit: int) -> list[tuple[float, int, int]]:
+    """Best (score, package_id, doc_id) for postings rows of the query terms, highest first."""
+    by_package: dict[int, list[tuple[array, array]]] = {}
+    for package_id, doc_ids, weights in postings:
+        by_package.setdefault(package_id, []).append(unpack_postings(doc_ids, weights))
+    best: list[tuple[float, int, int]] = []
+    for package_id, lists in by_package.items():
+        # Seed from the longest list in one C-level pass; only the others are merged in Python.
+        lists.sort(key=lambda item: len(item[0]), reverse=True)
+        scores = dict(zip(*lists[0]))
+        get = scores.get
+        for ids, ws in lists[1:]:
+            for doc_id, w in zip(ids, ws):
+                scores[doc_id] = get(doc_id, 0.0) + w
+        top = heapq.nlargest(limit, scores, key=get)
+        best.extend((scores[doc_id], package_id, doc_id) for doc_id in top)
+    best.sort(key=lambda hit: (-hit[0], hit[1], hit[2]))
+    return best[:limit]
@@ -0,0 +1,64 @@
+"""Vocabulary the router's slot extractor matches questions against.
+
+Profiles (canonical, name, title, type), every interned element path and every bound ValueSet,
+exported by GET /gq/slot-terms and compiled by the MCP router into a single-pass matcher
+(app.mcp_server.slot_extractor). Reloaded when the ingest generation changes.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import Artifact, ElementPath, SDBinding
+from app.facts.db import ingest_generation
+from app.facts.store import GenerationCachedStore
+
+
+class SlotProfile(NamedTuple):
+    canonical_url: str
+    name: Optional[str]
+    title: Optional[str]
+    sd_type: Optional[str]
+
+
+class SlotTerms(NamedTuple):
+    generation: tuple
+    profiles: tuple[SlotProfile, ...]
+    paths: tuple[str, ...]
+    value_sets: tuple[str, ...]
+
+
+def load_slot_terms(session: Session) -> SlotTerms:
+    generation = ingest_generation(session)
+    profiles = session.execute(
+        select(Artifact.canonical_url, Artifact.name, Artifact.title, Artifact.sd_type)
+        .where(Artifact.resource_type == "StructureDefinition")
+        .distinct()
+        .order_by(Artifact.canonical_url, Artifact.name, Artifact.title, Artifact.sd_type)
+    ).all()
+    paths = session.execute(select(ElementPath.path).order_by(ElementPath.path)).scalars()
+    # From sd_bindings itself, not the value_set_usage_matrix rollup, which lags until refreshed.
+    vs = SDBinding.value_set
+    value_sets = session.execute(select(vs).where(vs != "").distinct().order_by(vs)).scalars()
+    return SlotTerms(
+        generation,
+        tuple(SlotProfile(*r) for r in profiles),
+        tuple(paths),
+        tuple(value_sets),
+    )
+
+
+class SlotTermsStore(GenerationCachedStore):
+    """Holds the current SlotTerms; reloaded lazily when the ingest generation changes.
+
+    The generation is checked at most every refresh_seconds (0 = load once).
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], refresh_seconds: float = 30.0):
+        super().__init__(session_factory, load_slot_terms, refresh_seconds)
+
+    def terms(self) -> SlotTerms:
+        return self.get()
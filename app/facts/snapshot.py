@@ -0,0 +1,850 @@
+"""Compiled, memory-mappable facts snapshot for one package.
+
+File layout (little-endian):
+
+    magic "IGFACTS\\0" | u32 format_version | u32 header_len | header JSON | pad to 8
+    data area: sections at 8-byte aligned offsets relative to the data area start
+
+The JSON header is self-describing: it names every section with its offset, record
+count, ``struct`` format and field names. Strings live once in a sorted string table
+(``string_offsets`` + ``string_blob``); records refer to them by index, and because the
+table is sorted in code-point order, comparing indexes is the same as comparing strings.
+Every index section is sorted so lookups are binary searches directly on the mapping.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.facts.db import DbFacts
+from app.facts.memory import (
+    BindingRow,
+    ConstraintRow,
+    ElementRow,
+    MemoryFacts,
+    PackageFacts,
+    TypeRefUsage,
+    ValueSetUsage,
+    element_filter,
+    page_element_matches,
+    search_order,
+    summarize_usages,
+    type_ref_filter,
+    type_ref_order,
+)
+
+MAGIC = b"IGFACTS\x00"
+FORMAT_VERSION = 3
+NULL = 0xFFFFFFFF
+
+_PREAMBLE = struct.Struct("<8sII")
+
+# name -> (struct format, field names)
+SECTIONS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "string_offsets": ("<I", ("offset",)),
+    "string_blob": ("<B", ("byte",)),
+    "artifacts": (
+        "<i15I",
+        (
+            "id",
+            "canonical_url",
+            "version",
+            "name",
+            "title",
+            "sd_type",
+            "base_definition",
+            "file_path",
+            "element_start",
+            "element_count",
+            "must_support_start",
+            "must_support_count",
+            "binding_start",
+            "binding_count",
+            "constraint_start",
+            "constraint_count",
+        ),
+    ),
+    "elements": ("<IIib3x", ("path", "max", "min", "must_support")),
+    "must_support": ("<I", ("element",)),
+    "bindings": ("<4I", ("path", "strength", "value_set", "source_choice")),
+    "constraints": (
+        "<6I",
+        ("path", "key", "severity", "human", "expression", "source_choice"),
+    ),
+    "canonical_index": ("<2I", ("canonical_url", "artifact")),
+    "value_set_index": ("<3I", ("value_set", "artifact", "binding")),
+    "type_ref_index": ("<5I", ("ref_canonical", "artifact", "path", "code", "kind")),
+    # baseDefinition closure within the package (depth >= 1), artifact indexes.
+    "lineage_index": ("<3I", ("descendant", "depth", "ancestor")),
+    "descendant_index": ("<3I", ("ancestor", "depth", "descendant")),
+}
+
+# ElementRow.min / must_support have no natural sentinel in the record, so encode them.
+_MIN_NULL = -1
+_TRISTATE = {None: 0, False: 1, True: 2}
+_TRISTATE_DECODE = (None, False, True)
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class SnapshotError(RuntimeError):
+    pass
+
+
+# Writer ----------------------------------------------------------------------
+
+
+def write_snapshot(facts: MemoryFacts, package: PackageFacts, out_path: Path) -> dict:
+    """Serialize one package from a MemoryFacts into a snapshot file (atomic replace)."""
+    artifacts = sorted(
+        (a for a in facts.artifacts if a.package_id == package.id), key=lambda a: a.id
+    )
+
+    strings: set[str] = set()
+    for a in artifacts:
+        strings.update(
+            v
+            for v in (
+                a.canonical_url,
+                a.version,
+                a.name,
+                a.title,
+                a.sd_type,
+                a.base_definition,
+                a.file_path,
+            )
+            if v is not None
+        )
+        for e in a.elements:
+            strings.add(e.path)
+            if e.max is not None:
+                strings.add(e.max)
+        for b in a.bindings:
+            strings.update(v for v in b[:4] if v is not None)
+        for c in a.constraints:
+            strings.update(v for v in c if v is not None)
+        for r in a.type_refs:
+            strings.update(r)
+    table = sorted(strings)
+    sid = {s: i for i, s in enumerate(table)}
+
+    def ref(value: Optional[str]) -> int:
+        return NULL if value is None else sid[value]
+
+    blob = bytearray()
+    string_offsets = []
+    for s in table:
+        string_offsets.append((len(blob),))
+        blob.extend(s.encode("utf-8"))
+    string_offsets.append((len(blob),))
+
+    artifact_recs, element_recs, ms_recs, binding_recs, constraint_recs = [], [], [], [], []
+    for a in artifacts:
+        element_start = len(element_recs)
+        ms_start = len(ms_recs)
+        for e in a.elements:
+            if e.must_support is True:
+                ms_recs.append((len(element_recs),))
+            element_recs.append(
+                (
+                    sid[e.path],
+                    ref(e.max),
+                    _MIN_NULL if e.min is None else e.min,
+                    _TRISTATE[e.must_support],
+                )
+            )
+        binding_start = len(binding_recs)
+        binding_recs.extend(
+            (sid[b.path], ref(b.strength), sid[b.value_set], sid[b.source_choice])
+            for b in a.bindings
+        )
+        constraint_start = len(constraint_recs)
+        constraint_recs.extend(
+            (
+                sid[c.path],
+                sid[c.key],
+                ref(c.severity),
+                ref(c.human),
+                ref(c.expression),
+                sid[c.source_choice],
+            )
+            for c in a.constraints
+        )
+        artifact_recs.append(
+            (
+                a.id,
+                sid[a.canonical_url],
+                ref(a.version),
+                ref(a.name),
+                ref(a.title),
+                ref(a.sd_type),
+                ref(a.base_definition),
+                sid[a.file_path],
+                element_start,
+                len(a.elements),
+                ms_start,
+                len(ms_recs) - ms_start,
+                binding_start,
+                len(a.bindings),
+                constraint_start,
+                len(a.constraints),
+            )
+        )
+
+    artifact_idx = {a.id: i for i, a in enumerate(artifacts)}
+    canonical_recs = []
+    for canonical in sorted({a.canonical_url for a in artifacts}):
+        # Each canonical's artifacts in resolve order, so the first match is the default version.
+        canonical_recs.extend(
+            (sid[canonical], artifact_idx[x.id])
+            for x in facts.artifacts_for_canonical(canonical)
+            if x.package_id == package.id
+        )
+
+    usage_recs = []
+    for i, a in enumerate(artifacts):
+        base = artifact_recs[i][12]
+        for j, b in enumerate(a.bindings):
+            usage_recs.append((b.value_set, a, base + j, b.path))
+    usage_recs.sort(
+        key=lambda u: (u[0], u[1].sd_type is None, u[1].sd_type or "", u[1].canonical_url, u[3])
+    )
+    value_set_recs = [(sid[u[0]], artifact_idx[u[1].id], u[2]) for u in usage_recs]
+
+    type_ref_usages = []
+    for i, a in enumerate(artifacts):
+        for r in a.type_refs:
+            usage = TypeRefUsage(
+                a.canonical_url,
+                a.version,
+                a.name,
+                a.sd_type,
+                a.file_path,
+                r.path,
+                r.code,
+                r.kind,
+                a.id,
+            )
+            type_ref_usages.append((r.ref_canonical, usage, i))
+    type_ref_usages.sort(key=lambda t: (t[0], type_ref_order(t[1])))
+    type_ref_recs = [
+        (sid[ref], i, sid[u.path], sid[u.code], sid[u.kind]) for ref, u, i in type_ref_usages
+    ]
+
+    lineage_recs = []
+    descendant_pairs = []
+    for i, a in enumerate(artifacts):
+        for depth, ancestor_id in a.ancestors:
+            if ancestor_id in artifact_idx:
+                lineage_recs.append((i, depth, artifact_idx[ancestor_id]))
+                descendant_pairs.append((artifact_idx[ancestor_id], depth, a))
+    lineage_recs.sort()
+    descendant_pairs.sort(key=lambda d: (d[0], d[1], search_order(d[2])))
+    descendant_recs = [(anc, depth, artifact_idx[a.id]) for anc, depth, a in descendant_pairs]
+
+    rows: dict[str, Iterable[tuple]] = {
+        "string_offsets": string_offsets,
+        "string_blob": None,
+        "artifacts": artifact_recs,
+        "elements": element_recs,
+        "must_support": ms_recs,
+        "bindings": binding_recs,
+        "constraints": constraint_recs,
+        "canonical_index": canonical_recs,
+        "value_set_index": value_set_recs,
+        "type_ref_index": type_ref_recs,
+        "lineage_index": lineage_recs,
+        "descendant_index": descendant_recs,
+    }
+
+    data = bytearray()
+    sections = {}
+    for name, (fmt, fields) in SECTIONS.items():
+        data.extend(b"\x00" * (_align(len(data)) - len(data)))
+        offset = len(data)
+        if name == "string_blob":
+            data.extend(blob)
+            count = len(blob)
+        else:
+            packer = struct.Struct(fmt)
+            recs = list(rows[name])
+            for rec in recs:
+                data.extend(packer.pack(*rec))
+            count = len(recs)
+        sections[name] = {"offset": offset, "count": count, "format": fmt, "fields": list(fields)}
+
+    header = {
+        "format": "fhir-ig-rag facts snapshot",
+        "format_version": FORMAT_VERSION,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "package": {
+            "id": package.id,
+            "ig": package.ig,
+            "ig_version": package.ig_version,
+            "generation": package.generation,
+        },
+        "null_ref": NULL,
+        "sections": sections,
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    preamble = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes))
+    head = preamble + header_bytes
+    head += b"\x00" * (_align(len(head)) - len(head))
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with tmp_path.open("wb") as handle:
+        handle.write(head)
+        handle.write(data)
+    os.replace(tmp_path, out_path)
+
+    return {
+        "path": str(out_path),
+        "bytes": len(head) + len(data),
+        "strings": len(table),
+        "artifacts": len(artifact_recs),
+        "elements": len(element_recs),
+        "bindings": len(binding_recs),
+        "constraints": len(constraint_recs),
+    }
+
+
+# Reader ----------------------------------------------------------------------
+
+
+class _Records:
+    """Fixed-width records read straight out of the mapping with struct.unpack_from."""
+
+    __slots__ = ("_buf", "_base", "_struct", "_size", "count")
+
+    def __init__(self, buf: memoryview, base: int, fmt: str, count: int):
+        self._buf = buf
+        self._base = base
+        self._struct = struct.Struct(fmt)
+        self._size = self._struct.size
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> tuple:
+        return self._struct.unpack_from(self._buf, self._base + i * self._size)
+
+    def field(self, i: int, pos: int):
+        return self[i][pos]
+
+    def lower_bound(self, lo: int, hi: int, pos: int, target: int) -> int:
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.field(mid, pos) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def upper_bound(self, lo: int, hi: int, pos: int, target: int) -> int:
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.field(mid, pos) <= target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class SnapshotArtifact:
+    __slots__ = (
+        "index",
+        "id",
+        "package_id",
+        "canonical_url",
+        "version",
+        "name",
+        "title",
+        "sd_type",
+        "base_definition",
+        "file_path",
+        "ranges",
+    )
+
+
+class SnapshotFacts:
+    """Read-only facts served from a memory-mapped snapshot; same query surface as DbFacts.
+
+    The mapping is shared through the OS page cache, so several worker processes that open
+    the same file do not each hold a private copy.
+    """
+
+    def __init__(self, path: Path, session_factory: Optional[Callable[[], Session]] = None):
+        self.path = Path(path)
+        self._session_factory = session_factory
+        self._file = self.path.open("rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+
+        magic, version, header_len = _PREAMBLE.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.path} is not a facts snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format_version={version}")
+        start = _PREAMBLE.size
+        self.header = json.loads(bytes(self._buf[start : start + header_len]).decode("utf-8"))
+        data_start = _align(start + header_len)
+
+        sections = self.header["sections"]
+        for name, (fmt, _fields) in SECTIONS.items():
+            if sections.get(name, {}).get("format") != fmt:
+                raise SnapshotError(f"Snapshot section {name!r} missing or has unexpected layout")
+
+        def records(name: str) -> _Records:
+            meta = sections[name]
+            return _Records(self._buf, data_start + meta["offset"], meta["format"], meta["count"])
+
+        self._string_offsets = records("string_offsets")
+        self._blob_base = data_start + sections["string_blob"]["offset"]
+        self._string_count = len(self._string_offsets) - 1
+        self._artifacts = records("artifacts")
+        self._elements = records("elements")
+        self._must_support = records("must_support")
+        self._bindings = records("bindings")
+        self._constraints = records("constraints")
+        self._canonical_index = records("canonical_index")
+        self._value_set_index = records("value_set_index")
+        self._type_ref_index = records("type_ref_index")
+        self._lineage_index = records("lineage_index")
+        self._descendant_index = records("descendant_index")
+
+        pkg = self.header["package"]
+        self.package = PackageFacts(pkg["id"], pkg["ig"], pkg["ig_version"], pkg["generation"])
+        self.generation = ((pkg["id"], pkg["generation"]),)
+        self._usage_matrix: Optional[tuple] = None
+        self._value_sets_by_url: Optional[dict[str, list[str]]] = None
+        self._artifact_index = {
+            self._artifacts.field(i, 0): i for i in range(len(self._artifacts))
+        }
+
+    def close(self) -> None:
+        self._buf.release()
+        self._mm.close()
+        self._file.close()
+
+    # strings
+
+    def _string_bytes(self, i: int) -> bytes:
+        start = self._string_offsets.field(i, 0)
+        end = self._string_offsets.field(i + 1, 0)
+        return bytes(self._buf[self._blob_base + start : self._blob_base + end])
+
+    def _str(self, i: int) -> Optional[str]:
+        if i == NULL:
+            return None
+        return self._string_bytes(i).decode("utf-8")
+
+    def _string_lower_bound(self, value: str) -> int:
+        # UTF-8 byte order equals code-point order, so compare raw bytes.
+        target = value.encode("utf-8")
+        lo, hi = 0, self._string_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string_bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find_string(self, value: str) -> Optional[int]:
+        lo = self._string_lower_bound(value)
+        if lo < self._string_count and self._string_bytes(lo) == value.encode("utf-8"):
+            return lo
+        return None
+
+    # records
+
+    def _artifact(self, index: int) -> SnapshotArtifact:
+        rec = self._artifacts[index]
+        a = SnapshotArtifact()
+        a.index = index
+        a.id = rec[0]
+        a.package_id = self.package.id
+        a.canonical_url = self._str(rec[1])
+        a.version = self._str(rec[2])
+        a.name = self._str(rec[3])
+        a.title = self._str(rec[4])
+        a.sd_type = self._str(rec[5])
+        a.base_definition = self._str(rec[6])
+        a.file_path = self._str(rec[7])
+        a.ranges = rec[8:]
+        return a
+
+    def _ranges(self, artifact_id: int) -> tuple:
+        return self._artifacts[self._artifact_index[artifact_id]][8:]
+
+    def _element_row(self, i: int) -> ElementRow:
+        path, max_, min_, ms = self._elements[i]
+        return ElementRow(
+            self._str(path), None if min_ == _MIN_NULL else min_, self._str(max_), _TRISTATE_DECODE[ms]
+        )
+
+    def _binding_row(self, i: int) -> BindingRow:
+        path, strength, value_set, source = self._bindings[i]
+        return BindingRow(self._str(path), self._str(strength), self._str(value_set), self._str(source))
+
+    def _constraint_row(self, i: int) -> ConstraintRow:
+        return ConstraintRow(*(self._str(v) for v in self._constraints[i]))
+
+    def _path_range(
+        self, records: _Records, start: int, count: int, path: Optional[str]
+    ) -> tuple[int, int]:
+        end = start + count
+        if path is None:
+            return start, end
+        sidx = self._find_string(path)
+        if sidx is None:
+            return start, start
+        lo = records.lower_bound(start, end, 0, sidx)
+        return lo, records.upper_bound(lo, end, 0, sidx)
+
+    def _subtree_ranges(
+        self, records: _Records, start: int, count: int, path_prefix: Optional[str]
+    ) -> list[tuple[int, int]]:
+        """Record ranges at path_prefix and below it, in path order."""
+        if path_prefix is None:
+            return [(start, start + count)]
+        end = start + count
+        exact = self._path_range(records, start, count, path_prefix)
+        # Strings in [prefix + ".", prefix + "/") are the descendants; their indexes are contiguous.
+        lo = records.lower_bound(start, end, 0, self._string_lower_bound(path_prefix + "."))
+        hi = records.lower_bound(lo, end, 0, self._string_lower_bound(path_prefix + "/"))
+        return [exact, (lo, hi)]
+
+    def _paths_ranges(
+        self,
+        records: _Records,
+        start: int,
+        count: int,
+        paths: Iterable[str],
+        path_prefix: Optional[str] = None,
+    ) -> list[tuple[int, int]]:
+        """Record ranges at each of paths (within path_prefix's subtree, if given), in path order."""
+        wanted = sorted(set(paths))
+        if path_prefix is not None:
+            wanted = [p for p in wanted if p == path_prefix or p.startswith(path_prefix + ".")]
+        return [self._path_range(records, start, count, p) for p in wanted]
+
+    @staticmethod
+    def _limited(lo: int, hi: int, limit: Optional[int]) -> range:
+        return range(lo, hi if limit is None else min(hi, lo + limit))
+
+    # query surface
+
+    def resolve_artifact(
+        self, canonical: str, version: Optional[str]
+    ) -> Optional[tuple[SnapshotArtifact, PackageFacts]]:
+        sidx = self._find_string(canonical)
+        if sidx is None:
+            return None
+        idx = self._canonical_index
+        lo = idx.lower_bound(0, len(idx), 0, sidx)
+        hi = idx.upper_bound(lo, len(idx), 0, sidx)
+        for i in range(lo, hi):
+            artifact = self._artifact(idx.field(i, 1))
+            if version is None or artifact.version == version:
+                return artifact, self.package
+        return None
+
+    def _closure(self, idx: _Records, artifact_id: int) -> list:
+        index = self._artifact_index[artifact_id]
+        lo = idx.lower_bound(0, len(idx), 0, index)
+        return [
+            (idx.field(i, 1), self._artifact(idx.field(i, 2)))
+            for i in range(lo, idx.upper_bound(lo, len(idx), 0, index))
+        ]
+
+    def lineage(self, artifact_id: int) -> list:
+        return self._closure(self._lineage_index, artifact_id)
+
+    def descendants(self, artifact_id: int) -> list:
+        return self._closure(self._descendant_index, artifact_id)
+
+    def find_package(self, ig: str, ig_version: str) -> Optional[PackageFacts]:
+        if (ig, ig_version) == (self.package.ig, self.package.ig_version):
+            return self.package
+        return None
+
+    def must_support(
+        self, artifact_id: int, limit: Optional[int] = None, path_prefix: Optional[str] = None
+    ) -> list:
+        if path_prefix is not None:
+            return self.elements(artifact_id, path_prefix, must_support_only=True, limit=limit)
+        r = self._ranges(artifact_id)
+        return [
+            self._element_row(self._must_support.field(i, 0))
+            for i in self._limited(r[2], r[2] + r[3], limit)
+        ]
+
+    def must_support_count(self, artifact_id: int) -> int:
+        return self._ranges(artifact_id)[3]
+
+    def fact_counts(self, artifact_id: int) -> tuple[int, int, int]:
+        r = self._ranges(artifact_id)
+        return r[3], r[5], r[7]
+
+    def elements(
+        self,
+        artifact_id: int,
+        path_prefix: Optional[str] = None,
+        must_support_only: bool = False,
+        limit: Optional[int] = None,
+        paths: Optional[list[str]] = None,
+    ) -> list:
+        r = self._ranges(artifact_id)
+        if paths is None:
+            ranges = self._subtree_ranges(self._elements, r[0], r[1], path_prefix)
+        else:
+            ranges = self._paths_ranges(self._elements, r[0], r[1], paths, path_prefix)
+        rows = []
+        for lo, hi in ranges:
+            for i in range(lo, hi):
+                if limit is not None and len(rows) >= limit:
+                    return rows
+                if must_support_only and self._elements.field(i, 3) != _TRISTATE[True]:
+                    continue
+                rows.append(self._element_row(i))
+        return rows
+
+    def search_elements(
+        self,
+        path: str,
+        match: str = "exact",
+        must_support: Optional[bool] = None,
+        card_min: Optional[int] = None,
+        card_max: Optional[str] = None,
+        ig: Optional[str] = None,
+        ig_version: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> tuple[int, list]:
+        if (ig is not None and ig != self.package.ig) or (
+            ig_version is not None and ig_version != self.package.ig_version
+        ):
+            return 0, []
+        keep = element_filter(path, match, must_support, card_min, card_max)
+        artifacts = sorted((self._artifact(i) for i in range(len(self._artifacts))), key=search_order)
+        candidates = (
+            (
+                a,
+                self.package,
+                (self._element_row(i) for i in range(a.ranges[0], a.ranges[0] + a.ranges[1])),
+            )
+            for a in artifacts
+        )
+        return page_element_matches(candidates, keep, limit, offset)
+
+    def element(self, artifact_id: int, path: str) -> Optional[ElementRow]:
+        r = self._ranges(artifact_id)
+        lo, hi = self._path_range(self._elements, r[0], r[1], path)
+        return self._element_row(lo) if lo < hi else None
+
+    def element_json(self, artifact_id: int, path: str) -> Optional[dict]:
+        # Raw JSON is not part of the snapshot; use the database when one is configured.
+        if self._session_factory is None:
+            return None
+        with self._session_factory() as session:
+            return DbFacts(session).element_json(artifact_id, path)
+
+    def element_texts(self, artifact_id: int) -> list:
+        if self._session_factory is None:
+            return []
+        with self._session_factory() as session:
+            return DbFacts(session).element_texts(artifact_id)
+
+    def bindings(
+        self,
+        artifact_id: int,
+        path: Optional[str] = None,
+        limit: Optional[int] = None,
+        paths: Optional[list[str]] = None,
+    ) -> list:
+        r = self._ranges(artifact_id)
+        lo, hi = self._path_range(self._bindings, r[4], r[5], path)
+        if paths is None:
+            return [self._binding_row(i) for i in self._limited(lo, hi, limit)]
+        rows = [
+            self._binding_row(i)
+            for lo, hi in self._paths_ranges(self._bindings, lo, hi - lo, paths)
+            for i in range(lo, hi)
+        ]
+        return rows[:limit]
+
+    def binding_count(self, artifact_id: int) -> int:
+        return self._ranges(artifact_id)[5]
+
+    def constraints(
+        self,
+        artifact_id: int,
+        path: Optional[str] = None,
+        limit: Optional[int] = None,
+        path_prefix: Optional[str] = None,
+        paths: Optional[list[str]] = None,
+    ) -> list:
+        r = self._ranges(artifact_id)
+        lo, hi = self._path_range(self._constraints, r[6], r[7], path)
+        if paths is None:
+            ranges = self._subtree_ranges(self._constraints, lo, hi - lo, path_prefix)
+        else:
+            ranges = self._paths_ranges(self._constraints, lo, hi - lo, paths, path_prefix)
+        rows = []
+        for lo, hi in ranges:
+            rows.extend(self._constraint_row(i) for i in range(lo, hi))
+        return rows[:limit]
+
+    def constraint_count(self, artifact_id: int) -> int:
+        return self._ranges(artifact_id)[7]
+
+    def search_constraints(
+        self,
+        q: Optional[str] = None,
+        expression: Optional[str] = None,
+        ig: Optional[str] = None,
+        ig_version: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> tuple[int, list]:
+        # Full-text search is not part of the snapshot; use the database when one is configured.
+        if self._session_factory is None:
+            return 0, []
+        with self._session_factory() as session:
+            return DbFacts(session).search_constraints(q, expression, ig, ig_version, limit, offset)
+
+    def search_text(
+        self,
+        terms: list[str],
+        ig: Optional[str] = None,
+        ig_version: Optional[str] = None,
+        limit: int = 10,
+    ) -> list:
+        # The BM25 index lives in Postgres.
+        if self._session_factory is None:
+            return []
+        with self._session_factory() as session:
+            return DbFacts(session).search_text(terms, ig, ig_version, limit)
+
+    def diff_profiles(self, old_id: int, new_id: int):
+        # A snapshot holds one package and no content hashes; None means "needs the database".
+        if self._session_factory is None:
+            return None
+        with self._session_factory() as session:
+            return DbFacts(session).diff_profiles(old_id, new_id)
+
+    def diff_packages(self, old_package_id: int, new_package_id: int):
+        if self._session_factory is None:
+            return None
+        with self._session_factory() as session:
+            return DbFacts(session).diff_packages(old_package_id, new_package_id)
+
+    def _usages(self, lo: int, hi: int) -> list:
+        usages = []
+        for i in range(lo, hi):
+            _vs, artifact_index, binding_index = self._value_set_index[i]
+            a = self._artifact(artifact_index)
+            b = self._binding_row(binding_index)
+            usages.append(
+                ValueSetUsage(
+                    a.canonical_url,
+                    a.version,
+                    a.name,
+                    a.sd_type,
+                    a.file_path,
+                    b.path,
+                    b.strength,
+                    b.source_choice,
+                    a.id,
+                )
+            )
+        return usages
+
+    def value_set_usages(self, package_id: int, value_set: str) -> list:
+        if package_id != self.package.id:
+            return []
+        sidx = self._find_string(value_set)
+        if sidx is None:
+            return []
+        idx = self._value_set_index
+        lo = idx.lower_bound(0, len(idx), 0, sidx)
+        return self._usages(lo, idx.upper_bound(lo, len(idx), 0, sidx))
+
+    def value_set_usages_many(
+        self, package_id: int, value_sets: list[str], any_version: list[str] = ()
+    ) -> dict[str, list]:
+        wanted = set(value_sets)
+        if any_version:
+            if self._value_sets_by_url is None:
+                by_url: dict[str, list[str]] = {}
+                idx = self._value_set_index
+                lo = 0
+                while lo < len(idx):
+                    sidx = idx.field(lo, 0)
+                    value_set = self._str(sidx) or ""
+                    by_url.setdefault(value_set.partition("|")[0], []).append(value_set)
+                    lo = idx.upper_bound(lo, len(idx), 0, sidx)
+                self._value_sets_by_url = by_url
+            for url in any_version:
+                wanted.update(self._value_sets_by_url.get(url, ()))
+        found = {vs: self.value_set_usages(package_id, vs) for vs in sorted(wanted)}
+        return {vs: usages for vs, usages in found.items() if usages}
+
+    def type_ref_usages(self, package_id: int, ref_canonical: str, extension: bool) -> list:
+        if package_id != self.package.id:
+            return []
+        sidx = self._find_string(ref_canonical)
+        if sidx is None:
+            return []
+        idx = self._type_ref_index
+        lo = idx.lower_bound(0, len(idx), 0, sidx)
+        keep = type_ref_filter(extension)
+        usages = []
+        for i in range(lo, idx.upper_bound(lo, len(idx), 0, sidx)):
+            _ref, artifact_index, path, code, kind = idx[i]
+            a = self._artifact(artifact_index)
+            usage = TypeRefUsage(
+                a.canonical_url,
+                a.version,
+                a.name,
+                a.sd_type,
+                a.file_path,
+                self._str(path),
+                self._str(code),
+                self._str(kind),
+                a.id,
+            )
+            if keep(usage):
+                usages.append(usage)
+        return usages
+
+    def value_set_usage_matrix(self, package_id: int) -> tuple:
+        if package_id != self.package.id:
+            return ()
+        if self._usage_matrix is None:
+            # The file is immutable, so summarize once per process.
+            idx = self._value_set_index
+            matrix = []
+            lo = 0
+            while lo < len(idx):
+                sidx = idx.field(lo, 0)
+                hi = idx.upper_bound(lo, len(idx), 0, sidx)
+                value_set = self._str(sidx)
+                if value_set:
+                    matrix.append(summarize_usages(value_set, self._usages(lo, hi)))
+                lo = hi
+            self._usage_matrix = tuple(matrix)
+        return self._usage_matrix
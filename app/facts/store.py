@@ -0,0 +1,48 @@
+"""A value loaded from the database and reloaded lazily when the ingest generation changes."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app.facts.db import ingest_generation
+
+
+class GenerationCachedStore:
+    """Holds loader(session)'s result (anything with a .generation), reloaded lazily when the
+    ingest generation no longer matches.
+
+    The generation is checked at most every refresh_seconds (0 = load once).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        loader: Callable[[Session], Any],
+        refresh_seconds: float = 30.0,
+    ):
+        self._session_factory = session_factory
+        self._loader = loader
+        self._refresh_seconds = refresh_seconds
+        self._value: Any = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        value = self._value
+        now = time.monotonic()
+        if value is not None and (
+            self._refresh_seconds <= 0 or now - self._checked_at < self._refresh_seconds
+        ):
+            return value
+        with self._lock:
+            if self._value is not None and now - self._checked_at < self._refresh_seconds:
+                return self._value
+            with self._session_factory() as session:
+                if self._value is None or ingest_generation(session) != self._value.generation:
+                    self._value = self._loader(session)
+            self._checked_at = time.monotonic()
+            return self._value
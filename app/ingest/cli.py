@@ -12,6 +12,12 @@ from sqlalchemy.orm import Session
 from app.db.config import PROJECT_ROOT
 from app.db.engine import SessionLocal
 from app.db.models import Artifact, Package
+from app.facts.memory import load_memory_facts
+from app.facts.snapshot import write_snapshot
+from app.ingest.generation import bump_generation
+from app.ingest.lineage import refresh_profile_closure
+from app.ingest.rollups import refresh_rollups
+from app.ingest.search_index import rebuild_search_index
 from app.ingest.loaders.sd_elements_loader import load_sd_elements
 from app.ingest.loaders.sd_bindings_loader import load_sd_bindings
 from app.ingest.loaders.sd_constraints_loader import load_sd_constraints
@@ -65,6 +71,7 @@ def import_structuredefs(
     inserted = 0
     updated = 0
     skipped = 0
+    changed: list[Artifact] = []
 
     with SessionLocal() as session:
         package = get_or_create_package(session, ig, ig_version, str(dir))
@@ -110,6 +117,7 @@ def import_structuredefs(
                 artifact.sha256 = checksum
                 artifact.resource_type = "StructureDefinition"
                 updated += 1
+                changed.append(artifact)
             else:
                 artifact = Artifact(
                     package_id=package.id,
@@ -125,7 +133,13 @@ def import_structuredefs(
                 )
                 session.add(artifact)
                 inserted += 1
+                changed.append(artifact)
 
+        if inserted or updated:
+            session.flush()
+            refresh_profile_closure(session, [a.id for a in changed])
+            refresh_rollups(session)
+            bump_generation(session, package.id)
         session.commit()
 
     typer.echo(
@@ -233,5 +247,48 @@ def load_sd_constraints_cmd(
     typer.echo(json.dumps(summary, indent=2))
 
 
+@app.command("build-search-index")
+def build_search_index_cmd(
+    ig: str = typer.Option(..., "--ig", help="IG code, e.g., ps-ca"),
+    ig_version: str = typer.Option(..., "--ig-version", help="IG version, e.g., 2.1.1"),
+) -> None:
+    """Rebuild the BM25 search index (GET /gq/search) for the given IG and version."""
+    with SessionLocal() as session:
+        pkg = session.execute(
+            select(Package).where(Package.ig == ig, Package.ig_version == ig_version)
+        ).scalar_one_or_none()
+        if not pkg:
+            typer.echo(json.dumps({"error": "package not found"}, indent=2))
+            raise typer.Exit(code=1)
+        summary = rebuild_search_index(session, pkg.id)
+        session.commit()
+    typer.echo(json.dumps(summary, indent=2))
+
+
+@app.command("export-snapshot")
+def export_snapshot_cmd(
+    ig: str = typer.Option(..., "--ig", help="IG code, e.g., ps-ca"),
+    ig_version: str = typer.Option(..., "--ig-version", help="IG version, e.g., 2.1.1"),
+    out: Optional[Path] = typer.Option(
+        None,
+        "--out",
+        help="Output file (default: data/snapshots/<ig>-<ig_version>.facts).",
+    ),
+) -> None:
+    """Write a memory-mappable facts snapshot (FACTS_ENGINE=snapshot) for the given IG and version."""
+    out_path = out or PROJECT_ROOT / "data" / "snapshots" / f"{ig}-{ig_version}.facts"
+    with SessionLocal() as session:
+        pkg = session.execute(
+            select(Package).where(Package.ig == ig, Package.ig_version == ig_version)
+        ).scalar_one_or_none()
+        if not pkg:
+            typer.echo(json.dumps({"error": "package not found"}, indent=2))
+            raise typer.Exit(code=1)
+        facts = load_memory_facts(session, SessionLocal, package_id=pkg.id)
+
+    summary = write_snapshot(facts, facts.packages[0], out_path)
+    typer.echo(json.dumps(summary, indent=2))
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.db.models import Package
+
+
+def bump_generation(session: Session, package_id: int) -> None:
+    """Mark a package's facts as changed so in-process caches rebuild."""
+    session.execute(
+        update(Package)
+        .where(Package.id == package_id)
+        .values(generation=Package.generation + 1)
+    )
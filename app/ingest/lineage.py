@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models import Artifact, ProfileClosure
+
+
+def _parent_map(rows) -> dict[int, int]:
+    """artifact id -> id of the artifact its baseDefinition resolves to.
+
+    A base in the same package wins; otherwise the usual resolve order (unversioned first,
+    then highest version, then newest id). Bases outside the database have no parent.
+    """
+    by_canonical: dict[str, list] = {}
+    for r in rows:
+        by_canonical.setdefault(r.canonical_url, []).append(r)
+    for candidates in by_canonical.values():
+        candidates.sort(key=lambda r: r.id, reverse=True)
+        candidates.sort(key=lambda r: r.version or "", reverse=True)
+        candidates.sort(key=lambda r: r.version is not None)
+
+    parents = {}
+    for r in rows:
+        candidates = [c for c in by_canonical.get(r.base_definition or "", ()) if c.id != r.id]
+        if not candidates:
+            continue
+        same_package = [c for c in candidates if c.package_id == r.package_id]
+        parents[r.id] = (same_package or candidates)[0].id
+    return parents
+
+
+def refresh_profile_closure(session: Session, artifact_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute closure rows for changed artifacts and everything below them.
+
+    With artifact_ids=None the whole table is rebuilt. Returns the number of rows written.
+    """
+    session.flush()
+    rows = session.execute(
+        select(
+            Artifact.id,
+            Artifact.package_id,
+            Artifact.canonical_url,
+            Artifact.version,
+            Artifact.base_definition,
+        )
+    ).all()
+    parents = _parent_map(rows)
+
+    if artifact_ids is None:
+        affected = {r.id for r in rows}
+        session.execute(delete(ProfileClosure))
+    else:
+        children: dict[int, list[int]] = {}
+        for child, parent in parents.items():
+            children.setdefault(parent, []).append(child)
+        changed = set(artifact_ids)
+        # Old descendants too: an edited baseDefinition can detach a whole subtree.
+        affected = changed | set(
+            session.execute(
+                select(ProfileClosure.descendant_id).where(ProfileClosure.ancestor_id.in_(changed))
+            ).scalars()
+        )
+        seen = set(changed)
+        stack = list(changed)
+        while stack:
+            for child in children.get(stack.pop(), ()):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        affected |= seen
+        session.execute(delete(ProfileClosure).where(ProfileClosure.descendant_id.in_(affected)))
+
+    values = []
+    for descendant in sorted(affected):
+        node, depth, seen = descendant, 0, set()
+        while node is not None and node not in seen:  # guard against baseDefinition cycles
+            seen.add(node)
+            values.append({"ancestor_id": node, "descendant_id": descendant, "depth": depth})
+            node, depth = parents.get(node), depth + 1
+    for start in range(0, len(values), 1000):
+        session.execute(pg_insert(ProfileClosure.__table__).values(values[start : start + 1000]))
+    return len(values)
@@ -7,9 +7,13 @@ from typing import Dict, List
 from sqlalchemy import delete, select
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
+from app.db.blobs import store_blob
 from app.db.config import PROJECT_ROOT
 from app.db.engine import SessionLocal
+from app.db.interning import intern_canonical, intern_path
 from app.db.models import Artifact, Package, SDBinding
+from app.ingest.generation import bump_generation
+from app.ingest.rollups import refresh_rollups
 
 
 def _select_elements(structure_def: dict) -> tuple[list[dict], str]:
@@ -60,6 +64,8 @@ def load_sd_bindings(ig: str, ig_version: str, truncate: bool = False) -> Dict[s
             session.execute(delete(SDBinding).where(SDBinding.artifact_id.in_(ids)))
             session.commit()
 
+        seen_blobs: set[str] = set()
+        path_ids: dict[str, int] = {}
         for artifact in artifacts:
             summary["artifacts_processed"] += 1
             resource_path = PROJECT_ROOT / artifact.file_path
@@ -72,6 +78,7 @@ def load_sd_bindings(ig: str, ig_version: str, truncate: bool = False) -> Dict[s
             if not elements:
                 summary["artifacts_skipped_no_elements"] += 1
                 continue
+            canonical_id = intern_canonical(session, artifact.canonical_url)
 
             for element in elements:
                 path_val = element.get("path")
@@ -86,29 +93,30 @@ def load_sd_bindings(ig: str, ig_version: str, truncate: bool = False) -> Dict[s
                 if not strength and not value_set:
                     continue
 
+                path_id = intern_path(session, path_val, path_ids)
                 exists = session.execute(
                     select(SDBinding.id).where(
                         SDBinding.artifact_id == artifact.id,
-                        SDBinding.path == path_val,
+                        SDBinding.path_id == path_id,
                         SDBinding.value_set == value_set,
                     )
                 ).scalar_one_or_none()
 
                 payload = {
                     "artifact_id": artifact.id,
-                    "sd_canonical_url": artifact.canonical_url,
+                    "canonical_id": canonical_id,
                     "sd_version": artifact.version,
-                    "path": path_val,
+                    "path_id": path_id,
                     "strength": strength,
                     "value_set": value_set,
-                    "binding_json": binding,
+                    "binding_json_hash": store_blob(session, binding, seen_blobs),
                     "source_choice": source_choice,
                 }
 
                 insert_stmt = pg_insert(SDBinding.__table__).values(**payload)
-                update_cols = {k: payload[k] for k in payload if k not in ("artifact_id", "path", "value_set")}
+                update_cols = {k: payload[k] for k in payload if k not in ("artifact_id", "path_id", "value_set")}
                 upsert_stmt = insert_stmt.on_conflict_do_update(
-                    index_elements=["artifact_id", "path", "value_set"],
+                    index_elements=["artifact_id", "path_id", "value_set"],
                     set_=update_cols,
                 )
                 session.execute(upsert_stmt)
@@ -118,6 +126,8 @@ def load_sd_bindings(ig: str, ig_version: str, truncate: bool = False) -> Dict[s
                 else:
                     summary["bindings_inserted"] += 1
 
+        refresh_rollups(session)
+        bump_generation(session, pkg.id)
         session.commit()
 
     return summary
@@ -7,9 +7,14 @@ from typing import Dict, List
 from sqlalchemy import delete, select
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
+from app.db.blobs import store_blob
 from app.db.config import PROJECT_ROOT
 from app.db.engine import SessionLocal
+from app.db.interning import intern_canonical, intern_path
 from app.db.models import Artifact, Package, SDConstraint
+from app.ingest.generation import bump_generation
+from app.ingest.rollups import refresh_rollups
+from app.ingest.search_index import rebuild_search_index
 
 
 def _select_elements(structure_def: dict) -> tuple[list[dict], str]:
@@ -60,6 +65,8 @@ def load_sd_constraints(ig: str, ig_version: str, truncate: bool = False) -> Dic
             session.execute(delete(SDConstraint).where(SDConstraint.artifact_id.in_(ids)))
             session.commit()
 
+        seen_blobs: set[str] = set()
+        path_ids: dict[str, int] = {}
         for artifact in artifacts:
             summary["artifacts_processed"] += 1
             resource_path = PROJECT_ROOT / artifact.file_path
@@ -72,6 +79,7 @@ def load_sd_constraints(ig: str, ig_version: str, truncate: bool = False) -> Dic
             if not elements:
                 summary["artifacts_skipped_no_elements"] += 1
                 continue
+            canonical_id = intern_canonical(session, artifact.canonical_url)
 
             for element in elements:
                 path_val = element.get("path")
@@ -87,32 +95,33 @@ def load_sd_constraints(ig: str, ig_version: str, truncate: bool = False) -> Dic
                         summary["constraints_skipped"] += 1
                         continue
 
+                    path_id = intern_path(session, path_val, path_ids)
                     exists = session.execute(
                         select(SDConstraint.id).where(
                             SDConstraint.artifact_id == artifact.id,
-                            SDConstraint.path == path_val,
+                            SDConstraint.path_id == path_id,
                             SDConstraint.key == key,
                         )
                     ).scalar_one_or_none()
 
                     payload = {
                         "artifact_id": artifact.id,
-                        "sd_canonical_url": artifact.canonical_url,
+                        "canonical_id": canonical_id,
                         "sd_version": artifact.version,
-                        "path": path_val,
+                        "path_id": path_id,
                         "key": key,
                         "severity": cons.get("severity"),
                         "human": cons.get("human"),
                         "expression": cons.get("expression"),
                         "xpath": cons.get("xpath"),
-                        "constraint_json": cons,
+                        "constraint_json_hash": store_blob(session, cons, seen_blobs),
                         "source_choice": source_choice,
                     }
 
                     insert_stmt = pg_insert(SDConstraint.__table__).values(**payload)
-                    update_cols = {k: payload[k] for k in payload if k not in ("artifact_id", "path", "key")}
+                    update_cols = {k: payload[k] for k in payload if k not in ("artifact_id", "path_id", "key")}
                     upsert_stmt = insert_stmt.on_conflict_do_update(
-                        index_elements=["artifact_id", "path", "key"],
+                        index_elements=["artifact_id", "path_id", "key"],
                         set_=update_cols,
                     )
                     session.execute(upsert_stmt)
@@ -122,6 +131,9 @@ def load_sd_constraints(ig: str, ig_version: str, truncate: bool = False) -> Dic
                     else:
                         summary["constraints_inserted"] += 1
 
+        refresh_rollups(session)
+        summary.update(rebuild_search_index(session, pkg.id))
+        bump_generation(session, pkg.id)
         session.commit()
 
     return summary
@@ -2,15 +2,20 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List
 
 from sqlalchemy import select, delete
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
+from app.db.blobs import store_blob
 from app.db.config import PROJECT_ROOT
 from app.db.engine import SessionLocal
-from app.db.models import Artifact, Package, SDElement
+from app.db.interning import intern_canonical, intern_path
+from app.db.models import Artifact, Package, SDElement, SDElementTypeRef
+from app.ingest.generation import bump_generation
+from app.ingest.rollups import refresh_rollups
+from app.ingest.search_index import rebuild_search_index
 
 
 def _select_elements(structure_def: dict) -> tuple[list[dict], str]:
@@ -25,6 +30,24 @@ def _select_elements(structure_def: dict) -> tuple[list[dict], str]:
     return [], ""
 
 
+def _type_refs(element: dict) -> Iterator[tuple[str, str, str]]:
+    """(kind, code, canonical) for each type[].profile / type[].targetProfile of an element."""
+    types = element.get("type")
+    if not isinstance(types, list):
+        return
+    for type_ in types:
+        code = type_.get("code") if isinstance(type_, dict) else None
+        if not code:
+            continue
+        for kind in ("profile", "targetProfile"):
+            refs = type_.get(kind)
+            if not isinstance(refs, list):
+                continue
+            for ref in refs:
+                if isinstance(ref, str) and ref:
+                    yield kind, code, ref.split("|", 1)[0]
+
+
 def _load_resource(path: Path) -> dict:
     with path.open() as handle:
         return json.load(handle)
@@ -37,6 +60,7 @@ def load_sd_elements(ig: str, ig_version: str, truncate: bool = False) -> Dict[s
         "elements_updated": 0,
         "elements_skipped": 0,
         "artifacts_skipped_no_elements": 0,
+        "type_refs": 0,
     }
 
     with SessionLocal() as session:
@@ -59,8 +83,13 @@ def load_sd_elements(ig: str, ig_version: str, truncate: bool = False) -> Dict[s
         if truncate and artifacts:
             artifact_ids = [a.id for a in artifacts]
             session.execute(delete(SDElement).where(SDElement.artifact_id.in_(artifact_ids)))
+            session.execute(
+                delete(SDElementTypeRef).where(SDElementTypeRef.artifact_id.in_(artifact_ids))
+            )
             session.commit()
 
+        seen_blobs: set[str] = set()
+        path_ids: dict[str, int] = {}
         for artifact in artifacts:
             summary["artifacts_processed"] += 1
             resource_path = PROJECT_ROOT / artifact.file_path
@@ -73,6 +102,9 @@ def load_sd_elements(ig: str, ig_version: str, truncate: bool = False) -> Dict[s
             if not elements:
                 summary["artifacts_skipped_no_elements"] += 1
                 continue
+            canonical_id = intern_canonical(session, artifact.canonical_url)
+            # Slices share a path, so collect refs across all of them before writing.
+            type_refs: set[tuple[int, str, str, str]] = set()
 
             for element in elements:
                 path_val = element.get("path")
@@ -80,33 +112,33 @@ def load_sd_elements(ig: str, ig_version: str, truncate: bool = False) -> Dict[s
                     summary["elements_skipped"] += 1
                     continue
 
+                path_id = intern_path(session, path_val, path_ids)
+                type_refs.update((path_id, *ref) for ref in _type_refs(element))
                 exists = session.execute(
                     select(SDElement.id).where(
-                        SDElement.artifact_id == artifact.id, SDElement.path == path_val
+                        SDElement.artifact_id == artifact.id, SDElement.path_id == path_id
                     )
                 ).scalar_one_or_none()
 
                 payload = {
                     "artifact_id": artifact.id,
-                    "sd_canonical_url": artifact.canonical_url,
+                    "canonical_id": canonical_id,
                     "sd_version": artifact.version,
                     "element_id": element.get("id"),
-                    "path": path_val,
+                    "path_id": path_id,
                     "min": element.get("min"),
                     "max": element.get("max"),
                     "must_support": element.get("mustSupport"),
                     "is_modifier": element.get("isModifier"),
                     "is_summary": element.get("isSummary"),
-                    "types_json": element.get("type"),
-                    "slicing_json": element.get("slicing"),
-                    "raw_json": element,
+                    "raw_json_hash": store_blob(session, element, seen_blobs),
                     "source_choice": source_choice,
                 }
 
                 insert_stmt = pg_insert(SDElement.__table__).values(**payload)
-                update_cols = {k: payload[k] for k in payload if k not in ("artifact_id", "path")}
+                update_cols = {k: payload[k] for k in payload if k not in ("artifact_id", "path_id")}
                 upsert_stmt = insert_stmt.on_conflict_do_update(
-                    index_elements=["artifact_id", "path"],
+                    index_elements=["artifact_id", "path_id"],
                     set_=update_cols,
                 )
                 session.execute(upsert_stmt)
@@ -116,6 +148,31 @@ def load_sd_elements(ig: str, ig_version: str, truncate: bool = False) -> Dict[s
                 else:
                     summary["elements_inserted"] += 1
 
+            session.execute(
+                delete(SDElementTypeRef).where(SDElementTypeRef.artifact_id == artifact.id)
+            )
+            if type_refs:
+                session.execute(
+                    pg_insert(SDElementTypeRef.__table__)
+                    .values(
+                        [
+                            {
+                                "artifact_id": artifact.id,
+                                "path_id": path_id,
+                                "kind": kind,
+                                "code": code,
+                                "ref_canonical": ref_canonical,
+                            }
+                            for path_id, kind, code, ref_canonical in sorted(type_refs)
+                        ]
+                    )
+                    .on_conflict_do_nothing()
+                )
+            summary["type_refs"] += len(type_refs)
+
+        refresh_rollups(session)
+        summary.update(rebuild_search_index(session, pkg.id))
+        bump_generation(session, pkg.id)
         session.commit()
 
     return summary
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+ROLLUP_VIEWS = ("artifact_fact_counts", "value_set_usage_matrix")
+
+
+def refresh_rollups(session: Session) -> None:
+    """Refresh the rollup materialized views without blocking readers."""
+    session.flush()
+    for view in ROLLUP_VIEWS:
+        session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from collections import Counter
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.models import (
+    Artifact,
+    ElementPath,
+    SDConstraint,
+    SDElement,
+    SDJsonBlob,
+    SearchDoc,
+    SearchPosting,
+)
+from app.facts.search_index import bm25_weights, pack_postings, tokenize
+
+ELEMENT_TEXT_FIELDS = ("short", "definition", "comment", "requirements")
+SNIPPET_LENGTH = 240
+BATCH_SIZE = 5000
+
+
+def _snippet(text: str | None) -> str | None:
+    if not text:
+        return None
+    text = " ".join(text.split())
+    return text if len(text) <= SNIPPET_LENGTH else text[: SNIPPET_LENGTH - 1] + "…"
+
+
+def rebuild_search_index(session: Session, package_id: int) -> dict[str, int]:
+    """Rebuild one package's BM25 index from its element and constraint text."""
+    fields = [SDJsonBlob.body[name].astext for name in ELEMENT_TEXT_FIELDS]
+    elements = session.execute(
+        select(SDElement.artifact_id, SDElement.path_id, ElementPath.path, *fields)
+        .join(Artifact, Artifact.id == SDElement.artifact_id)
+        .join(ElementPath, ElementPath.id == SDElement.path_id)
+        .outerjoin(SDJsonBlob, SDJsonBlob.content_hash == SDElement.raw_json_hash)
+        .where(Artifact.package_id == package_id)
+        .order_by(SDElement.artifact_id, ElementPath.path)
+    ).all()
+    constraints = session.execute(
+        select(
+            SDConstraint.artifact_id,
+            SDConstraint.path_id,
+            ElementPath.path,
+            SDConstraint.key,
+            SDConstraint.human,
+        )
+        .join(Artifact, Artifact.id == SDConstraint.artifact_id)
+        .join(ElementPath, ElementPath.id == SDConstraint.path_id)
+        .where(Artifact.package_id == package_id)
+        .order_by(SDConstraint.artifact_id, ElementPath.path, SDConstraint.key)
+    ).all()
+
+    docs: list[dict] = []
+    term_counts: list[Counter] = []
+    for artifact_id, path_id, path, *texts in elements:
+        if not any(texts):
+            continue  # nothing but the path to match on; the element search covers that
+        docs.append(
+            {
+                "artifact_id": artifact_id,
+                "path_id": path_id,
+                "kind": "element",
+                "key": None,
+                "snippet": _snippet(texts[0] or texts[1]),
+            }
+        )
+        term_counts.append(Counter(tokenize(" ".join([path, *(t for t in texts if t)]))))
+    for artifact_id, path_id, path, key, human in constraints:
+        docs.append(
+            {
+                "artifact_id": artifact_id,
+                "path_id": path_id,
+                "kind": "constraint",
+                "key": key,
+                "snippet": _snippet(human),
+            }
+        )
+        term_counts.append(Counter(tokenize(" ".join([key, human or "", path]))))
+
+    session.execute(delete(SearchPosting).where(SearchPosting.package_id == package_id))
+    session.execute(delete(SearchDoc).where(SearchDoc.package_id == package_id))
+    rows = [{"package_id": package_id, "doc_id": i, **doc} for i, doc in enumerate(docs)]
+    for start in range(0, len(rows), BATCH_SIZE):
+        session.execute(insert(SearchDoc), rows[start : start + BATCH_SIZE])
+    postings = []
+    for term, (doc_ids, weights) in sorted(bm25_weights(term_counts).items()):
+        packed_ids, packed_weights = pack_postings(doc_ids, weights)
+        postings.append(
+            {
+                "package_id": package_id,
+                "term": term,
+                "doc_ids": packed_ids,
+                "weights": packed_weights,
+            }
+        )
+    for start in range(0, len(postings), BATCH_SIZE):
+        session.execute(insert(SearchPosting), postings[start : start + BATCH_SIZE])
+    return {"search_docs": len(docs), "search_terms": len(postings)}
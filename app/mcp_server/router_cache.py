@@ -0,0 +1,130 @@
+"""Cache of LLM routing decisions, so a repeated question skips model inference.
+
+Keys are a normalized question plus the slot hints, scoped to the Ollama model and the router
+prompt version: changing either makes old entries unreachable, and they are purged when the
+cache is opened. Lookups hit an in-memory LRU first, then an optional SQLite file that
+survives restarts. Entries expire after ttl seconds.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive, ignoring trailing punctuation."""
+    return " ".join((question or "").lower().split()).rstrip("?!. ")
+
+
+class RouterCache:
+    def __init__(
+        self,
+        model: str,
+        prompt_version: str,
+        path: Optional[Path] = None,
+        maxsize: int = 1024,
+        ttl: float = 86400.0,
+    ):
+        self.model = model
+        self.prompt_version = prompt_version
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS router_cache ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, prompt_version TEXT NOT NULL,"
+                " decision TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "DELETE FROM router_cache"
+                " WHERE model != ? OR prompt_version != ? OR created_at < ?",
+                (model, prompt_version, time.time() - ttl),
+            )
+            self._db.commit()
+
+    def key(self, question: str, slots: dict) -> str:
+        raw = json.dumps(
+            [self.model, self.prompt_version, normalize_question(question), slots],
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question: str, slots: dict) -> tuple[Optional[dict], Optional[str]]:
+        """(decision, "memory" | "disk") on a hit, (None, None) on a miss."""
+        key = self.key(question, slots)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1]), "memory"
+            if entry is not None:
+                del self._entries[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created_at, decision FROM router_cache"
+                    " WHERE key = ? AND created_at >= ?",
+                    (key, now - self.ttl),
+                ).fetchone()
+                if row is not None:
+                    decision = json.loads(row[1])
+                    self._remember(key, row[0], decision)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return dict(decision), "disk"
+            self.misses += 1
+            return None, None
+
+    def put(self, question: str, slots: dict, decision: dict) -> None:
+        key = self.key(question, slots)
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, dict(decision))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO router_cache VALUES (?, ?, ?, ?, ?)",
+                    (key, self.model, self.prompt_version, json.dumps(decision), now),
+                )
+                # Same bound on disk as in memory: drop the oldest entries.
+                self._db.execute(
+                    "DELETE FROM router_cache WHERE key IN (SELECT key FROM router_cache"
+                    " ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.maxsize,),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, created_at: float, decision: dict) -> None:
+        self._entries[key] = (created_at, decision)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,84 +1,586 @@
 from __future__ import annotations
 
+import atexit
+import functools
+import hashlib
+import http.client
 import json
 import urllib.parse
 import urllib.request
 from typing import Optional
 import sys
 import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from datetime import datetime, timezone
+from pathlib import Path
 
+import anyio
 from mcp.server.fastmcp import FastMCP
 
-API_BASE = "http://localhost:8000"
+from app.mcp_server.router_cache import RouterCache
+from app.mcp_server.slot_extractor import SlotExtractor
 
-mcp = FastMCP("fhir-ig-rag")
+API_BASE = os.getenv("MCP_API_BASE", "http://localhost:8000").rstrip("/")
+# http: call the API at API_BASE. inprocess: run the same queries in this process on a pooled
+# database session (no API server needed; FACTS_ENGINE etc. apply here as they do to the API).
+MCP_BACKEND = os.getenv("MCP_BACKEND", "http").lower()
+# Keep-alive pool to the API, reused by every tool call for the life of the server.
+MCP_HTTP_POOL_SIZE = int(os.getenv("MCP_HTTP_POOL_SIZE", "10"))
+MCP_HTTP_TIMEOUT = float(os.getenv("MCP_HTTP_TIMEOUT", "10"))
+MCP_HTTP_SLOW_TIMEOUT = float(os.getenv("MCP_HTTP_SLOW_TIMEOUT", "60"))  # version diffs
+MCP_HTTP_CONNECT_TIMEOUT = float(os.getenv("MCP_HTTP_CONNECT_TIMEOUT", "2"))
+MCP_HTTP_RETRIES = int(os.getenv("MCP_HTTP_RETRIES", "2"))
+MCP_HTTP_BACKOFF = float(os.getenv("MCP_HTTP_BACKOFF", "0.1"))
+# Router plans run their tool calls concurrently on this many threads.
+ROUTER_MAX_WORKERS = int(os.getenv("ROUTER_MAX_WORKERS", "8"))
+ROUTER_CALL_TIMEOUT = float(os.getenv("ROUTER_CALL_TIMEOUT", "30"))
+# Ollama routing requests (up to 15 s each) run on their own threads, so they never hold the
+# workers that speculative plan calls need.
+ROUTER_LLM_WORKERS = int(os.getenv("ROUTER_LLM_WORKERS", "4"))
+# ROUTER_MODE=speculative: how long to wait for the LLM's verdict, and how sure it must be to
+# replace a deterministic plan that is already running.
+ROUTER_SPECULATIVE_WAIT = float(os.getenv("ROUTER_SPECULATIVE_WAIT", "2"))
+ROUTER_SPECULATIVE_CONFIDENCE = float(os.getenv("ROUTER_SPECULATIVE_CONFIDENCE", "0.8"))
+# Routing decisions from Ollama, cached in memory and (unless ROUTER_CACHE_PATH is empty) on disk.
+ROUTER_CACHE = os.getenv("ROUTER_CACHE", "1") != "0"
+ROUTER_CACHE_PATH = os.getenv(
+    "ROUTER_CACHE_PATH", str(Path(__file__).resolve().parents[2] / "data" / "router_cache.sqlite3")
+)
+ROUTER_CACHE_SIZE = int(os.getenv("ROUTER_CACHE_SIZE", "1024"))
+ROUTER_CACHE_TTL = float(os.getenv("ROUTER_CACHE_TTL", "86400"))
+# Seconds between reloads of the slot vocabulary (profiles, paths, ValueSets) from the API.
+ROUTER_SLOTS_REFRESH = float(os.getenv("ROUTER_SLOTS_REFRESH", "300"))
 
+# stdio serves the one client that spawned the process; sse and streamable-http serve every
+# agent session from one long-lived process (shared caches, API pool and DB pool).
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "stdio").lower()
+MCP_HOST = os.getenv("MCP_HOST", "127.0.0.1")
+MCP_PORT = int(os.getenv("MCP_PORT", "8100"))
+# Tool calls running at once across all sessions; further calls wait for a free slot.
+MCP_MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "10"))
 
-def _http_get(path: str, params: dict) -> dict:
-    query = urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
-    url = f"{API_BASE}{path}?{query}"
-    req = urllib.request.Request(url, headers={"Accept": "application/json"})
+mcp = FastMCP("fhir-ig-rag", host=MCP_HOST, port=MCP_PORT)
+
+_tool_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _tool():
+    """Register a synchronous function as an MCP tool run on a worker thread.
+
+    FastMCP calls synchronous tools on its event loop, so one slow call would stall every other
+    session. Calls go through one CapacityLimiter (MCP_MAX_CONCURRENCY). The module-level name
+    stays the plain function, which the router calls directly.
+    """
+
+    def register(fn):
+        @functools.wraps(fn)
+        async def run(**kwargs):
+            global _tool_limiter
+            if _tool_limiter is None:  # created on the server's event loop
+                _tool_limiter = anyio.CapacityLimiter(MCP_MAX_CONCURRENCY)
+            return await anyio.to_thread.run_sync(
+                functools.partial(fn, **kwargs), limiter=_tool_limiter
+            )
+
+        mcp.tool()(run)
+        return fn
+
+    return register
+
+
+def _api_get(path: str, params: dict, timeout: Optional[float] = None) -> dict:
+    # Tools take a profile name, title or id wherever a canonical goes; the API resolves it.
+    if params.get("canonical") and "://" not in params["canonical"]:
+        params = {**params, "canonical": None, "profile": params["canonical"]}
+    if MCP_BACKEND == "inprocess":
+        return _local_call(path, params)
+    return _http_get(path, params, timeout=timeout)
+
+
+def _api_post(path: str, body: dict, timeout: Optional[float] = None) -> dict:
+    if MCP_BACKEND == "inprocess":
+        return _local_call(path, body)
+    return _http_post(path, body, timeout=timeout)
+
+
+class _ApiPool:
+    """HTTP/1.1 keep-alive connections to the API, reused across tool calls.
+
+    At most size connections are open at once (callers beyond that wait). Connection failures
+    and malformed responses are retried with exponential backoff; every API call is a read, so
+    a retry is harmless.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        size: int,
+        timeout: float,
+        connect_timeout: float,
+        retries: int,
+        backoff: float,
+    ):
+        url = urllib.parse.urlsplit(base_url)
+        self._connection_class = (
+            http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        )
+        self._host = url.hostname
+        self._port = url.port
+        self._prefix = url.path.rstrip("/")
+        self._timeout = timeout
+        self._connect_timeout = connect_timeout
+        self._retries = retries
+        self._backoff = backoff
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> tuple[int, bytes]:
+        with self._slots:
+            attempt = 0
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                reused = conn is not None
+                try:
+                    if conn is None:
+                        conn = self._connection_class(
+                            self._host, self._port, timeout=self._connect_timeout
+                        )
+                        conn.connect()
+                    conn.sock.settimeout(timeout or self._timeout)
+                    conn.request(method, self._prefix + path, body=body, headers=headers or {})
+                    resp = conn.getresponse()
+                    data = resp.read()
+                except OSError as e:
+                    connected = conn.sock is not None
+                    conn.close()
+                    if reused and isinstance(e, ConnectionError):
+                        continue  # the API closed an idle keep-alive connection
+                    # Retry refused/reset connections and connect timeouts, not slow responses.
+                    if attempt >= self._retries or (
+                        connected and not isinstance(e, ConnectionError)
+                    ):
+                        raise
+                    time.sleep(self._backoff * 2**attempt)
+                    attempt += 1
+                    continue
+                except http.client.HTTPException:
+                    # A malformed or truncated response (BadStatusLine, IncompleteRead): the
+                    # connection is unusable, so drop it and ask again on a fresh one.
+                    conn.close()
+                    if reused:
+                        continue
+                    if attempt >= self._retries:
+                        raise
+                    time.sleep(self._backoff * 2**attempt)
+                    attempt += 1
+                    continue
+                if resp.will_close:
+                    conn.close()
+                else:
+                    with self._lock:
+                        self._idle.append(conn)
+                return resp.status, data
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pool: Optional[_ApiPool] = None
+_pool_lock = threading.Lock()
+
+
+def _api_pool() -> _ApiPool:
+    """The server's connection pool to API_BASE, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _ApiPool(
+                API_BASE,
+                size=MCP_HTTP_POOL_SIZE,
+                timeout=MCP_HTTP_TIMEOUT,
+                connect_timeout=MCP_HTTP_CONNECT_TIMEOUT,
+                retries=MCP_HTTP_RETRIES,
+                backoff=MCP_HTTP_BACKOFF,
+            )
+            atexit.register(_pool.close)
+    return _pool
+
+
+def _http_get(path: str, params: dict, timeout: Optional[float] = None) -> dict:
+    query = urllib.parse.urlencode({k: v for k, v in params.items() if v is not None}, doseq=True)
+    return _send("GET", f"{path}?{query}", None, timeout)
+
+
+def _http_post(path: str, body: dict, timeout: Optional[float] = None) -> dict:
+    return _send("POST", path, json.dumps(body).encode("utf-8"), timeout)
+
+
+def _send(method: str, path: str, body: Optional[bytes], timeout: Optional[float]) -> dict:
+    headers = {"Accept": "application/json"}
+    if body is not None:
+        headers["Content-Type"] = "application/json"
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    except urllib.error.HTTPError as e:
+        status, data = _api_pool().request(method, path, body, headers, timeout)
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}
+    if status >= 400:
         try:
-            detail = json.loads(e.read().decode("utf-8"))
+            detail = json.loads(data.decode("utf-8"))
         except Exception:
-            detail = {"error": str(e)}
-        return {"status": e.code, "detail": detail}
+            detail = {"error": f"HTTP Error {status}"}
+        return {"status": status, "detail": detail}
+    try:
+        return json.loads(data.decode("utf-8"))
     except Exception as e:  # noqa: BLE001
         return {"error": str(e)}
 
 
-@mcp.tool()
-def psca_must_support(canonical: str, version: Optional[str] = None):
-    """List mustSupport paths for a PS-CA profile."""
-    return _http_get("/gq/must-support", {"canonical": canonical, "version": version})
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def _local_provider():
+    """The in-process FactsProvider, started on first use."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            from app.api.db import SessionLocal
+            from app.facts.provider import FactsProvider
+
+            provider = FactsProvider(SessionLocal)
+            provider.start()
+            _provider = provider
+    return _provider
+
+
+def _local_call(path: str, params: dict) -> dict:
+    """Answer an API path with the service layer directly; errors mirror the HTTP shape."""
+    from app.service import gq
+
+    routes = {
+        "/gq/must-support": gq.must_support,
+        "/gq/bindings": gq.bindings,
+        "/gq/constraints": gq.constraints,
+        "/gq/constraints/search": gq.constraints_search,
+        "/gq/search": gq.search,
+        "/gq/elements": gq.elements,
+        "/gq/elements/search": gq.elements_search,
+        "/gq/value-set/where-used": gq.value_set_where_used,
+        "/gq/value-set/where-used/bulk": gq.value_set_where_used_bulk,
+        "/gq/lineage": gq.lineage,
+        "/gq/descendants": gq.descendants,
+        "/gq/diff/profile": gq.diff_profile,
+        "/gq/diff/package": gq.diff_package,
+        "/gq/profile/where-used": gq.profile_where_used,
+        "/gq/extension/where-used": gq.extension_where_used,
+        "/gq/value-set/usage-matrix": gq.value_set_usage_matrix,
+        "/gq/profile-summary": gq.profile_summary,
+        "/gq/element-details": gq.element_details,
+        "/gq/element-details/batch": gq.element_details_batch,
+        "/gq/evidence": gq.evidence,
+    }
+    kwargs = {k: v for k, v in params.items() if v is not None}
+    try:
+        provider = _local_provider()
+        if path == "/gq/profiles/resolve":
+            return gq.profiles_resolve(provider.aliases, **kwargs)
+        if path == "/gq/slot-terms":
+            return gq.slot_terms(provider.slot_terms)
+        if "canonical" in kwargs or "profile" in kwargs:
+            kwargs["canonical"] = gq.resolve_canonical(
+                provider.aliases, kwargs.pop("canonical", None), kwargs.pop("profile", None)
+            )
+        with provider.facts() as facts:
+            return routes[path](facts, **kwargs)
+    except gq.ServiceError as e:
+        return {"status": e.status_code, "detail": {"detail": e.detail}}
+    except Exception as e:  # noqa: BLE001
+        return {"status": 500, "detail": {"detail": str(e)}}
+
+
+@_tool()
+def psca_must_support(
+    canonical: str, version: Optional[str] = None, path_prefix: Optional[str] = None
+):
+    """List mustSupport paths for a PS-CA profile (optionally only under path_prefix)."""
+    return _api_get(
+        "/gq/must-support", {"canonical": canonical, "version": version, "path_prefix": path_prefix}
+    )
+
+
+@_tool()
+def psca_elements(
+    canonical: str,
+    path_prefix: Optional[str] = None,
+    must_support_only: bool = False,
+    version: Optional[str] = None,
+):
+    """List elements of a PS-CA profile at and below path_prefix (e.g. Composition.section)."""
+    return _api_get(
+        "/gq/elements",
+        {
+            "canonical": canonical,
+            "path_prefix": path_prefix,
+            "must_support_only": must_support_only,
+            "version": version,
+        },
+    )
 
 
-@mcp.tool()
+@_tool()
 def psca_bindings(canonical: str, path: str, version: Optional[str] = None):
     """List bindings for a PS-CA profile element path."""
-    return _http_get("/gq/bindings", {"canonical": canonical, "path": path, "version": version})
+    return _api_get("/gq/bindings", {"canonical": canonical, "path": path, "version": version})
 
 
-@mcp.tool()
-def psca_constraints(canonical: str, path: Optional[str] = None, version: Optional[str] = None):
-    """List constraints for a PS-CA profile (optionally filtered by path)."""
-    return _http_get("/gq/constraints", {"canonical": canonical, "path": path, "version": version})
+@_tool()
+def psca_search_elements(
+    path: str,
+    match: str = "exact",
+    must_support: Optional[bool] = None,
+    ig: Optional[str] = None,
+    ig_version: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+):
+    """Find which profiles constrain an element path (exact, prefix or fuzzy; '*' wildcards)."""
+    return _api_get(
+        "/gq/elements/search",
+        {
+            "path": path,
+            "match": match,
+            "must_support": must_support,
+            "ig": ig,
+            "ig_version": ig_version,
+            "limit": limit,
+            "offset": offset,
+        },
+    )
 
 
-@mcp.tool()
+@_tool()
+def psca_constraints(
+    canonical: str,
+    path: Optional[str] = None,
+    version: Optional[str] = None,
+    path_prefix: Optional[str] = None,
+):
+    """List constraints for a PS-CA profile (optionally filtered by path or subtree)."""
+    return _api_get(
+        "/gq/constraints",
+        {"canonical": canonical, "path": path, "version": version, "path_prefix": path_prefix},
+    )
+
+
+@_tool()
+def psca_search_constraints(
+    q: Optional[str] = None,
+    expression: Optional[str] = None,
+    ig: Optional[str] = None,
+    ig_version: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+):
+    """Full-text search over constraint text and FHIRPath expressions across profiles."""
+    return _api_get(
+        "/gq/constraints/search",
+        {
+            "q": q,
+            "expression": expression,
+            "ig": ig,
+            "ig_version": ig_version,
+            "limit": limit,
+            "offset": offset,
+        },
+    )
+
+
+@_tool()
+def psca_search(q: str, ig: Optional[str] = None, ig_version: Optional[str] = None, limit: int = 10):
+    """Ranked free-text search over element definitions, descriptions and constraint text."""
+    return _api_get("/gq/search", {"q": q, "ig": ig, "ig_version": ig_version, "limit": limit})
+
+
+@_tool()
 def psca_where_used_value_set(
-    value_set: str, ig: str = "ps-ca", ig_version: str = "2.1.1"
+    value_set: str, ig: str = "ps-ca", ig_version: str = "2.1.1", transitive: bool = False
 ):
-    """Find where a ValueSet is used across PS-CA profiles."""
-    return _http_get(
+    """Find where a ValueSet is used across PS-CA profiles (transitive adds inheriting profiles)."""
+    return _api_get(
         "/gq/value-set/where-used",
-        {"value_set": value_set, "ig": ig, "ig_version": ig_version},
+        {"value_set": value_set, "ig": ig, "ig_version": ig_version, "transitive": transitive},
+    )
+
+
+@_tool()
+def psca_where_used_value_sets(value_sets: list[str], ig: str = "ps-ca", ig_version: str = "2.1.1"):
+    """Find where each of several ValueSets (url or url|version) is used, with per-strength counts."""
+    return _api_post(
+        "/gq/value-set/where-used/bulk",
+        {"value_sets": value_sets, "ig": ig, "ig_version": ig_version},
+    )
+
+
+@_tool()
+def psca_where_used_profile(
+    canonical: str, ig: str = "ps-ca", ig_version: str = "2.1.1", transitive: bool = False
+):
+    """Find elements whose type profile or targetProfile references a PS-CA profile."""
+    return _api_get(
+        "/gq/profile/where-used",
+        {"canonical": canonical, "ig": ig, "ig_version": ig_version, "transitive": transitive},
     )
 
 
-@mcp.tool()
+@_tool()
+def psca_where_used_extension(
+    canonical: str, ig: str = "ps-ca", ig_version: str = "2.1.1", transitive: bool = False
+):
+    """Find where an extension is used across PS-CA profiles."""
+    return _api_get(
+        "/gq/extension/where-used",
+        {"canonical": canonical, "ig": ig, "ig_version": ig_version, "transitive": transitive},
+    )
+
+
+@_tool()
+def psca_resolve_profile(
+    q: str, ig: Optional[str] = None, ig_version: Optional[str] = None, limit: int = 10
+):
+    """Find profiles by name, title or id (e.g. "PatientPSCA"); returns canonical URLs."""
+    return _api_get(
+        "/gq/profiles/resolve", {"q": q, "ig": ig, "ig_version": ig_version, "limit": limit}
+    )
+
+
+@_tool()
+def psca_lineage(canonical: str, version: Optional[str] = None):
+    """Show the baseDefinition chain of a PS-CA profile, nearest ancestor first."""
+    return _api_get("/gq/lineage", {"canonical": canonical, "version": version})
+
+
+@_tool()
+def psca_descendants(canonical: str, version: Optional[str] = None):
+    """List the profiles that inherit (directly or transitively) from a PS-CA profile."""
+    return _api_get("/gq/descendants", {"canonical": canonical, "version": version})
+
+
+@_tool()
+def psca_diff_profile(canonical: str, from_version: str, to_version: Optional[str] = None):
+    """Show what changed in a PS-CA profile between two versions (elements, bindings, constraints)."""
+    return _api_get(
+        "/gq/diff/profile",
+        {"canonical": canonical, "from_version": from_version, "to_version": to_version},
+        timeout=MCP_HTTP_SLOW_TIMEOUT,
+    )
+
+
+@_tool()
+def psca_diff_package(
+    from_version: str, to_version: str, ig: str = "ps-ca", include_changes: bool = True
+):
+    """Show profiles added, removed and changed between two versions of an IG."""
+    return _api_get(
+        "/gq/diff/package",
+        {
+            "ig": ig,
+            "from_version": from_version,
+            "to_version": to_version,
+            "include_changes": include_changes,
+        },
+        timeout=MCP_HTTP_SLOW_TIMEOUT,
+    )
+
+
+@_tool()
+def psca_value_set_usage_matrix(ig: str = "ps-ca", ig_version: str = "2.1.1"):
+    """List every ValueSet in the IG with usage counts by binding strength."""
+    return _api_get("/gq/value-set/usage-matrix", {"ig": ig, "ig_version": ig_version})
+
+
+@_tool()
 def psca_profile_summary(canonical: str, version: Optional[str] = None):
     """Summarize mustSupport/bindings/constraints for a profile."""
-    return _http_get("/gq/profile-summary", {"canonical": canonical, "version": version, "include_all": False})
+    return _api_get("/gq/profile-summary", {"canonical": canonical, "version": version, "include_all": False})
 
 
-@mcp.tool()
+@_tool()
 def psca_profile_summary_all(canonical: str, version: Optional[str] = None):
     """Summarize a profile and include all rows (not just top 10)."""
-    return _http_get("/gq/profile-summary", {"canonical": canonical, "version": version, "include_all": True})
+    return _api_get("/gq/profile-summary", {"canonical": canonical, "version": version, "include_all": True})
 
 
-@mcp.tool()
-def psca_element_details(canonical: str, path: str, version: Optional[str] = None):
-    """Get detailed information for a specific element of a profile."""
-    return _http_get(
+@_tool()
+def psca_element_details(
+    canonical: str, path: str, version: Optional[str] = None, include_raw: bool = False
+):
+    """Get detailed information for a specific element of a profile (raw JSON on request)."""
+    return _api_get(
         "/gq/element-details",
-        {"canonical": canonical, "path": path, "version": version},
+        {"canonical": canonical, "path": path, "version": version, "include_raw": include_raw},
+    )
+
+
+@_tool()
+def psca_evidence(
+    q: Optional[str] = None,
+    canonical: Optional[str] = None,
+    path: Optional[str] = None,
+    version: Optional[str] = None,
+    budget: int = 1500,
+    include_legend: bool = True,
+):
+    """Facts of a profile ranked for a question, packed in compact records up to budget tokens.
+
+    The legend of record keys counts against the budget; set include_legend=False once known.
+    """
+    return _api_get(
+        "/gq/evidence",
+        {
+            "q": q,
+            "canonical": canonical,
+            "path": path,
+            "version": version,
+            "budget": budget,
+            "include_legend": include_legend,
+        },
+    )
+
+
+@_tool()
+def psca_element_details_batch(
+    canonical: str,
+    paths: Optional[list[str]] = None,
+    version: Optional[str] = None,
+    must_support_only: bool = False,
+):
+    """Get details (cardinality, bindings, constraints) for many elements at once, keyed by path.
+
+    Omit paths for every element of the profile.
+    """
+    return _api_get(
+        "/gq/element-details/batch",
+        {
+            "canonical": canonical,
+            "path": paths,
+            "version": version,
+            "must_support_only": must_support_only,
+        },
     )
 
 
@@ -95,10 +597,51 @@ INTENTS = {
 }
 
 
+_slots: Optional[SlotExtractor] = None
+_slots_next_load = 0.0
+_slots_loading = False
+_slots_lock = threading.Lock()
+
+
+def _load_slot_extractor() -> Optional[SlotExtractor]:
+    global _slots, _slots_next_load, _slots_loading
+    terms = _api_get("/gq/slot-terms", {})
+    extractor = None
+    if "paths" in terms:
+        extractor = SlotExtractor(terms["profiles"], terms["paths"], terms["value_sets"])
+    with _slots_lock:
+        # On failure keep any previous extractor and try again sooner.
+        _slots = extractor or _slots
+        delay = ROUTER_SLOTS_REFRESH if extractor else min(30.0, ROUTER_SLOTS_REFRESH)
+        _slots_next_load = time.monotonic() + delay
+        _slots_loading = False
+    return _slots
+
+
+def _slot_extractor() -> Optional[SlotExtractor]:
+    """The vocabulary matcher: loaded on first use, then rebuilt in the background when due."""
+    global _slots_loading
+    with _slots_lock:
+        extractor = _slots
+        due = time.monotonic() >= _slots_next_load and not _slots_loading
+        if due:
+            _slots_loading = True
+    if due and extractor is None:
+        return _load_slot_extractor()
+    if due:
+        _router_pool.submit(_load_slot_extractor)
+    return extractor
+
+
 def _extract_slots(question: str, canonical: Optional[str], path: Optional[str], value_set: Optional[str], version: Optional[str]):
     # Use hints if provided
     slots = {"canonical": canonical, "path": path, "value_set": value_set, "version": version}
     q = question or ""
+    # Known profiles, paths and ValueSets from the IG; the heuristics below fill what is left.
+    extractor = _slot_extractor()
+    if extractor is not None:
+        for k, v in extractor.extract(q).items():
+            slots[k] = slots[k] or v
     # Extract canonical
     if not slots["canonical"]:
         for token in q.split():
@@ -120,33 +663,50 @@ def _extract_slots(question: str, canonical: Optional[str], path: Optional[str],
     return slots
 
 
-def _deterministic_intent(question: str, slots: dict) -> str:
+def _deterministic_intents(question: str, slots: dict) -> list:
+    """Every intent the question mentions, most specific first ("unknown" if none)."""
     q = (question or "").lower()
+    intents = []
     if slots.get("path") or "element" in q or "." in q:
-        return "element_details"
+        intents.append("element_details")
     if "must support" in q:
-        return "must_support"
+        intents.append("must_support")
     if "where used" in q or "where-used" in q or "across" in q:
         if slots.get("value_set"):
-            return "where_used_value_set"
+            intents.append("where_used_value_set")
     if "binding" in q or "valueset" in q or "value set" in q:
-        return "bindings"
+        intents.append("bindings")
     if "constraint" in q or "invariant" in q:
-        return "constraints"
+        intents.append("constraints")
     if "summary" in q or "profile summary" in q:
-        return "profile_summary"
-    return "unknown"
+        intents.append("profile_summary")
+    return intents or ["unknown"]
 
 
-def _ollama_route(question: str, slots: dict) -> Optional[dict]:
-    url = os.getenv("OLLAMA_URL", "http://localhost:11434") + "/api/generate"
-    model = os.getenv("OLLAMA_MODEL", "qwen2.5:3b-instruct")
-    prompt = f"""
+def _deterministic_intent(question: str, slots: dict) -> str:
+    return _deterministic_intents(question, slots)[0]
+
+
+ROUTER_PROMPT = """
 You are a strict router for PS-CA IG facts. Decide the intent and slots.
-Return ONLY JSON with keys: intent (one of element_details, profile_summary, must_support, bindings, constraints, where_used_value_set, unknown), canonical, path, value_set, version, confidence (0..1), notes.
+Return ONLY JSON with keys: intent (one of element_details, profile_summary, must_support, bindings, constraints, where_used_value_set, unknown), intents (every intent the question asks about, primary first), canonical, path, value_set, version, confidence (0..1), notes.
 Input question: {question}
-Hints: canonical={slots.get('canonical')}, path={slots.get('path')}, value_set={slots.get('value_set')}, version={slots.get('version')}
+Hints: canonical={canonical}, path={path}, value_set={value_set}, version={version}
 """
+# Cached routing decisions are only reused under the prompt (and model) that produced them.
+ROUTER_PROMPT_VERSION = hashlib.sha256(ROUTER_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+
+def _ollama_route(question: str, slots: dict) -> Optional[dict]:
+    url = os.getenv("OLLAMA_URL", "http://localhost:11434") + "/api/generate"
+    model = os.getenv("OLLAMA_MODEL", "qwen2.5:3b-instruct")
+    prompt = ROUTER_PROMPT.format(
+        question=question,
+        canonical=slots.get("canonical"),
+        path=slots.get("path"),
+        value_set=slots.get("value_set"),
+        version=slots.get("version"),
+    )
     payload = {
         "model": model,
         "prompt": prompt,
@@ -165,6 +725,9 @@ Hints: canonical={slots.get('canonical')}, path={slots.get('path')}, value_set={
                 return None
             if parsed.get("intent") not in INTENTS:
                 return None
+            intents = parsed.get("intents")
+            if not isinstance(intents, list) or not all(i in INTENTS for i in intents):
+                parsed["intents"] = [parsed["intent"]]
             conf = parsed.get("confidence")
             if conf is None or not (0 <= conf <= 1):
                 return None
@@ -173,7 +736,69 @@ Hints: canonical={slots.get('canonical')}, path={slots.get('path')}, value_set={
         return None
 
 
-def _build_plan(intent: str, slots: dict) -> list:
+_router_cache_instance: Optional[RouterCache] = None
+_router_cache_lock = threading.Lock()
+
+
+def _router_cache() -> Optional[RouterCache]:
+    """The routing-decision cache for the current model, or None when ROUTER_CACHE=0."""
+    global _router_cache_instance
+    if not ROUTER_CACHE:
+        return None
+    model = os.getenv("OLLAMA_MODEL", "qwen2.5:3b-instruct")
+    with _router_cache_lock:
+        cache = _router_cache_instance
+        if cache is None or cache.model != model:
+            if cache is not None:
+                cache.close()
+            cache = _router_cache_instance = RouterCache(
+                model,
+                ROUTER_PROMPT_VERSION,
+                path=Path(ROUTER_CACHE_PATH) if ROUTER_CACHE_PATH else None,
+                maxsize=ROUTER_CACHE_SIZE,
+                ttl=ROUTER_CACHE_TTL,
+            )
+    return cache
+
+
+def _cached_ollama_route(question: str, slots: dict) -> tuple[Optional[dict], Optional[str]]:
+    """_ollama_route through the cache: (decision, "memory" | "disk" | None on a miss)."""
+    cache = _router_cache()
+    if cache is None:
+        return _ollama_route(question, slots), None
+    decision, hit = cache.get(question, slots)
+    if decision is not None:
+        return decision, hit
+    decision = _ollama_route(question, slots)
+    if decision is not None:
+        cache.put(question, slots, decision)
+    return decision, None
+
+
+def _cache_report(hit: Optional[str]) -> Optional[dict]:
+    cache = _router_cache()
+    return {"hit": hit, **cache.stats()} if cache is not None else None
+
+
+def _build_plan(intents, slots: dict) -> list:
+    """Tool calls for one intent or several (one plan, duplicate calls dropped)."""
+    if isinstance(intents, str):
+        intents = [intents]
+    plan = []
+    for intent in intents:
+        for call in _intent_calls(intent, slots):
+            if call not in plan:
+                plan.append(call)
+    # Element details already carry the bindings and constraints at that path.
+    details = [c["args"] for c in plan if c["tool"] == "psca_element_details"]
+    return [
+        c
+        for c in plan
+        if not (c["tool"] in ("psca_bindings", "psca_constraints") and c["args"] in details)
+    ]
+
+
+def _intent_calls(intent: str, slots: dict) -> list:
     plan = []
     if intent == "element_details":
         if slots.get("canonical") and slots.get("path"):
@@ -196,8 +821,23 @@ def _build_plan(intent: str, slots: dict) -> list:
     return plan
 
 
-def _execute_plan(plan: list) -> list:
-    results = []
+_router_pool = ThreadPoolExecutor(max_workers=ROUTER_MAX_WORKERS, thread_name_prefix="psca-router")
+_llm_pool = ThreadPoolExecutor(max_workers=ROUTER_LLM_WORKERS, thread_name_prefix="psca-router-llm")
+
+
+def _run_call(fn, args: dict) -> dict:
+    started = time.perf_counter()
+    try:
+        data = fn(**{k: v for k, v in args.items() if v is not None})
+        ok, error = True, None
+    except Exception as e:  # noqa: BLE001
+        data, ok, error = None, False, str(e)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    return {"ok": ok, "data": data, "error": error, "elapsed_ms": elapsed_ms}
+
+
+def _start_plan(plan: list, background: bool = False) -> list:
+    """Submit the plan's calls; a lone call runs inline unless background is set."""
     tool_map = {
         "psca_element_details": psca_element_details,
         "psca_profile_summary": psca_profile_summary,
@@ -206,22 +846,114 @@ def _execute_plan(plan: list) -> list:
         "psca_constraints": psca_constraints,
         "psca_where_used_value_set": psca_where_used_value_set,
     }
+    pending = []
     for call in plan:
-        tool = call["tool"]
+        fn = tool_map.get(call["tool"])
         args = call["args"] or {}
-        fn = tool_map.get(tool)
         if not fn:
-            results.append({"tool": tool, "args": args, "ok": False, "data": None, "error": "unknown tool"})
+            pending.append(None)
+        elif len(plan) == 1 and not background:
+            pending.append(_run_call(fn, args))
+        else:
+            pending.append(_router_pool.submit(_run_call, fn, args))
+    return pending
+
+
+def _collect_plan(plan: list, pending: list, timeout: float = ROUTER_CALL_TIMEOUT) -> list:
+    deadline = time.monotonic() + timeout
+    results = []
+    for call, item in zip(plan, pending):
+        base = {"tool": call["tool"], "args": call["args"] or {}}
+        if item is None:
+            results.append({**base, "ok": False, "data": None, "error": "unknown tool"})
             continue
-        try:
-            data = fn(**{k: v for k, v in args.items() if v is not None})
-            results.append({"tool": tool, "args": args, "ok": True, "data": data, "error": None})
-        except Exception as e:  # noqa: BLE001
-            results.append({"tool": tool, "args": args, "ok": False, "data": None, "error": str(e)})
+        if isinstance(item, Future):
+            try:
+                item = item.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                item.cancel()
+                item = {"ok": False, "data": None, "error": f"timed out after {timeout:g}s"}
+        results.append({**base, **item})
     return results
 
 
-@mcp.tool()
+def _cancel_plan(pending: list) -> None:
+    """Drop speculative calls: queued ones never start, running ones finish unobserved."""
+    for item in pending:
+        if isinstance(item, Future):
+            item.cancel()
+
+
+def _execute_plan(plan: list, timeout: float = ROUTER_CALL_TIMEOUT) -> list:
+    """Run the plan's calls concurrently; results come back in plan order.
+
+    The calls are independent reads, so the plan takes as long as its slowest call. A call
+    still running after timeout seconds is reported as failed (its thread finishes on its own).
+    """
+    return _collect_plan(plan, _start_plan(plan), timeout)
+
+
+def _merge_llm_slots(slots: dict, parsed: dict) -> dict:
+    """Slots from the question or hints win; the LLM only fills the gaps."""
+    return {k: slots.get(k) or parsed.get(k) for k in ("canonical", "path", "value_set", "version")}
+
+
+def _speculative_route(question: str, slots: dict, execute: bool) -> dict:
+    """Race the deterministic plan against the Ollama route.
+
+    The deterministic plan starts executing while the LLM is still routing. Its results are
+    kept when the LLM produces the same plan, gives no usable answer within
+    ROUTER_SPECULATIVE_WAIT seconds, or disagrees with confidence below
+    ROUTER_SPECULATIVE_CONFIDENCE. Otherwise the speculative calls are cancelled and the LLM's
+    plan runs instead (also when the deterministic router found nothing to run).
+    """
+    llm = _llm_pool.submit(_cached_ollama_route, question, dict(slots))
+    det_intents = _deterministic_intents(question, slots)
+    det_plan = _build_plan(det_intents, slots)
+    pending = _start_plan(det_plan, background=True) if execute and det_plan else []
+
+    cache_hit = None
+    try:
+        parsed, cache_hit = llm.result(timeout=ROUTER_SPECULATIVE_WAIT)
+    except FutureTimeout:
+        parsed = None
+        outcome = "llm_timeout"
+    else:
+        outcome = "llm_failed" if parsed is None else None
+
+    if parsed is not None:
+        llm_slots = _merge_llm_slots(slots, parsed)
+        llm_plan = _build_plan(parsed["intents"], llm_slots)
+        confidence = parsed.get("confidence")
+        if llm_plan == det_plan:
+            outcome = "agreed"
+        elif llm_plan and (not det_plan or confidence >= ROUTER_SPECULATIVE_CONFIDENCE):
+            _cancel_plan(pending)
+            return {
+                "outcome": "overridden",
+                "mode_used": "ollama",
+                "cache_hit": cache_hit,
+                "confidence": confidence,
+                "intents": parsed["intents"],
+                "slots": llm_slots,
+                "plan": llm_plan,
+                "results": _execute_plan(llm_plan) if execute else [],
+            }
+        else:
+            outcome = "kept"
+    return {
+        "outcome": outcome,
+        "mode_used": "deterministic",
+        "cache_hit": cache_hit,
+        "confidence": parsed.get("confidence") if parsed else None,
+        "intents": det_intents,
+        "slots": slots,
+        "plan": det_plan,
+        "results": _collect_plan(det_plan, pending) if pending else [],
+    }
+
+
+@_tool()
 def psca_router(
     question: str,
     canonical: Optional[str] = None,
@@ -236,26 +968,37 @@ def psca_router(
     used_mode = "deterministic"
     fallback_used = False
     confidence = None
+    speculation = None
+    cache = None
 
-    routing = None
-    if mode_requested == "ollama":
-        parsed = _ollama_route(question, slots)
-        if parsed:
-            used_mode = "ollama"
-            routing_intent = parsed.get("intent", "unknown")
-            slots["canonical"] = slots.get("canonical") or parsed.get("canonical")
-            slots["path"] = slots.get("path") or parsed.get("path")
-            slots["value_set"] = slots.get("value_set") or parsed.get("value_set")
-            slots["version"] = slots.get("version") or parsed.get("version")
-            confidence = parsed.get("confidence")
-        else:
-            fallback_used = True
-            routing_intent = _deterministic_intent(question, slots)
+    if mode_requested == "speculative":
+        raced = _speculative_route(question, slots, execute)
+        cache = _cache_report(raced["cache_hit"])
+        used_mode = raced["mode_used"]
+        speculation = raced["outcome"]
+        confidence = raced["confidence"]
+        fallback_used = speculation in ("llm_timeout", "llm_failed")
+        routing_intents = raced["intents"]
+        slots = raced["slots"]
+        plan = raced["plan"]
+        results = raced["results"]
     else:
-        routing_intent = _deterministic_intent(question, slots)
+        if mode_requested == "ollama":
+            parsed, cache_hit = _cached_ollama_route(question, slots)
+            cache = _cache_report(cache_hit)
+            if parsed:
+                used_mode = "ollama"
+                routing_intents = parsed["intents"]
+                slots = _merge_llm_slots(slots, parsed)
+                confidence = parsed.get("confidence")
+            else:
+                fallback_used = True
+                routing_intents = _deterministic_intents(question, slots)
+        else:
+            routing_intents = _deterministic_intents(question, slots)
 
-    plan = _build_plan(routing_intent, slots)
-    results = _execute_plan(plan) if execute and plan else []
+        plan = _build_plan(routing_intents, slots)
+        results = _execute_plan(plan) if execute and plan else []
 
     return {
         "query_id": "PSCA-MCP-ROUTER-01",
@@ -264,6 +1007,8 @@ def psca_router(
             "mode_used": used_mode,
             "fallback_used": fallback_used,
             "confidence": confidence,
+            "speculation": speculation,
+            "cache": cache,
         },
         "input": {
             "question": question,
@@ -274,7 +1019,8 @@ def psca_router(
             "execute": execute,
         },
         "routing": {
-            "intent": routing_intent,
+            "intent": routing_intents[0],
+            "intents": routing_intents,
             "extracted": slots,
             "tool_calls": plan,
         },
@@ -284,5 +1030,14 @@ def psca_router(
 
 
 if __name__ == "__main__":
-    print("MCP server started (stdio). Waiting for client...", file=sys.stderr, flush=True)
-    mcp.run(transport="stdio")
+    _slot_extractor()  # compile the slot vocabulary before the first question
+    if MCP_TRANSPORT == "stdio":
+        print("MCP server started (stdio). Waiting for client...", file=sys.stderr, flush=True)
+    else:
+        print(
+            f"MCP server started ({MCP_TRANSPORT}) on http://{MCP_HOST}:{MCP_PORT}"
+            f" (max {MCP_MAX_CONCURRENCY} concurrent tool calls)",
+            file=sys.stderr,
+            flush=True,
+        )
+    mcp.run(transport=MCP_TRANSPORT)
@@ -0,0 +1,155 @@
+"""Single-pass slot extraction for the router, compiled from the ingested IG vocabulary.
+
+Every known term (canonical URLs, profile names, titles and ids, element paths and their dotted
+suffixes, ValueSet URLs and their ids) goes into one Aho-Corasick automaton over lower-cased
+text, so a question is scanned once however large the vocabulary. Overlapping hits resolve
+leftmost-longest, and a hit only counts on word boundaries (so "name" never matches inside
+"names").
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+MIN_TERM_LENGTH = 4  # shorter names and ids match too much ordinary text
+
+# Term kinds, in the order a tie at the same span prefers them.
+CANONICAL, PROFILE, PATH, PATH_SUFFIX, VALUE_SET = range(5)
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch in "-_"
+
+
+class _Automaton:
+    def __init__(self, keys: Iterable[str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.out: list[tuple[int, ...]] = [()]
+        self.keys: list[str] = []
+        for key in keys:
+            state = 0
+            for ch in key:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.out.append(())
+                state = nxt
+            self.out[state] += (len(self.keys),)
+            self.keys.append(key)
+        # Breadth-first failure links; outputs are merged along them.
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def search(self, text: str) -> Iterable[tuple[int, int, int]]:
+        """(start, end, key index) for every occurrence of every key."""
+        goto, fail, out, keys = self.goto, self.fail, self.out, self.keys
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for k in out[state]:
+                yield i + 1 - len(keys[k]), i + 1, k
+
+
+class SlotExtractor:
+    def __init__(self, profiles: Iterable[dict], paths: Iterable[str], value_sets: Iterable[str]):
+        # lower-cased term -> (kind, values); values are canonicals, paths or ValueSet URLs.
+        terms: dict[str, tuple[int, set[str]]] = {}
+
+        def add(term: Optional[str], kind: int, value: str) -> None:
+            if not term or len(term) < MIN_TERM_LENGTH:
+                return
+            key = term.lower()
+            current = terms.get(key)
+            if current is None or kind < current[0]:
+                terms[key] = (kind, {value})
+            elif kind == current[0]:
+                current[1].add(value)
+
+        self._sd_types: dict[str, str] = {}
+        for p in profiles:
+            canonical = p["canonical_url"]
+            add(canonical, CANONICAL, canonical)
+            add(p.get("name"), PROFILE, canonical)
+            add(p.get("title"), PROFILE, canonical)
+            add(canonical.rstrip("/").rsplit("/", 1)[-1], PROFILE, canonical)
+            if p.get("sd_type"):
+                self._sd_types[canonical] = p["sd_type"]
+        for path in paths:
+            parts = path.split(".")
+            if len(parts) < 2:
+                continue  # a bare resource type ("Patient") is not a path slot
+            add(path, PATH, path)
+            for i in range(1, len(parts) - 1):
+                add(".".join(parts[i:]), PATH_SUFFIX, path)
+        for url in value_sets:
+            add(url, VALUE_SET, url)
+            add(url.rstrip("/").rsplit("/", 1)[-1], VALUE_SET, url)
+
+        self._terms = terms
+        self._automaton = _Automaton(terms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def matches(self, question: str) -> list[tuple[int, int, int, set[str]]]:
+        """Non-overlapping word-bounded hits as (start, end, kind, values), leftmost-longest."""
+        text = question.lower()
+        hits = []
+        for start, end, k in self._automaton.search(text):
+            if start > 0 and _is_word(text[start - 1]):
+                continue
+            if end < len(text) and _is_word(text[end]):
+                continue
+            kind, values = self._terms[self._automaton.keys[k]]
+            hits.append((start, end, kind, values))
+        hits.sort(key=lambda h: (h[0], -h[1], h[2]))
+        chosen = []
+        covered = 0
+        for hit in hits:
+            if hit[0] >= covered:
+                chosen.append(hit)
+                covered = hit[1]
+        return chosen
+
+    def extract(self, question: str) -> dict:
+        """canonical, path and value_set found in the question (None where nothing matched).
+
+        A profile or path term that names several things is ambiguous and skipped, except a
+        path suffix ("name.given"), which resolves against the profile's type when the
+        question also names a profile.
+        """
+        slots = {"canonical": None, "path": None, "value_set": None}
+        suffixes = []
+        for _start, _end, kind, values in self.matches(question or ""):
+            if kind in (CANONICAL, PROFILE):
+                if slots["canonical"] is None and len(values) == 1:
+                    slots["canonical"] = next(iter(values))
+            elif kind == PATH:
+                if slots["path"] is None:
+                    slots["path"] = next(iter(values))
+            elif kind == PATH_SUFFIX:
+                suffixes.append(values)
+            elif kind == VALUE_SET:
+                if slots["value_set"] is None and len(values) == 1:
+                    slots["value_set"] = next(iter(values))
+        if slots["path"] is None:
+            sd_type = self._sd_types.get(slots["canonical"] or "")
+            for values in suffixes:
+                candidates = [v for v in values if sd_type and v.split(".", 1)[0] == sd_type]
+                if len(candidates) == 1 or len(values) == 1:
+                    slots["path"] = candidates[0] if len(candidates) == 1 else next(iter(values))
+                    break
+        return slots
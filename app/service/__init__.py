@@ -0,0 +1 @@
+# Query service package
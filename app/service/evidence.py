@@ -0,0 +1,143 @@
+"""Token-budgeted evidence bundles: a profile's facts ranked for one question, packed to a budget.
+
+Candidates are the profile's mustSupport elements, bindings, constraints and element
+definitions. Each is scored by a kind prior, closeness to the focus path and overlap with the
+question's index terms, then packed best-first as compact records until the token estimate
+(CHARS_PER_TOKEN characters per token of compact JSON) reaches the budget. Bundles are cached
+per (artifact, ingest generation, budget, focus path, question terms).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from collections import Counter
+from typing import Optional
+
+from app.facts.diff import DiffCache
+from app.facts.search_index import tokenize
+
+EVIDENCE_CACHE_SIZE = int(os.getenv("EVIDENCE_CACHE_SIZE", "256"))
+EVIDENCE_CACHE = DiffCache(EVIDENCE_CACHE_SIZE)
+
+CHARS_PER_TOKEN = 4
+TEXT_LENGTH = 160
+EXPRESSION_LENGTH = 200
+
+LEGEND = {
+    "k": "kind: ms=mustSupport element, b=binding, c=constraint, d=definition",
+    "p": "element path",
+    "n": "cardinality min..max",
+    "s": "binding strength",
+    "vs": "ValueSet",
+    "id": "constraint key",
+    "sev": "severity",
+    "h": "constraint text",
+    "x": "FHIRPath expression",
+    "t": "element short description or definition",
+}
+
+KIND_PRIOR = {"ms": 3.0, "b": 2.0, "c": 2.0, "d": 1.0}
+STRENGTH_PRIOR = {"required": 1.5, "extensible": 1.0, "preferred": 0.5}
+TERM_WEIGHT = 4.0
+# Core invariants repeated on every element (ele-1, dom-2, ext-1, ...) rarely answer anything.
+GENERIC_CONSTRAINT = re.compile(r"^(ele|dom|ext|txt|sdf)-\d+$")
+
+
+def estimate_tokens(value) -> int:
+    return len(json.dumps(value, separators=(",", ":"), ensure_ascii=False)) // CHARS_PER_TOKEN + 1
+
+
+LEGEND_TOKENS = estimate_tokens(LEGEND)
+
+
+def _clip(text: Optional[str], length: int) -> Optional[str]:
+    if not text:
+        return None
+    text = " ".join(text.split())
+    return text if len(text) <= length else text[: length - 1] + "…"
+
+
+def _focus(fact_path: str, path: Optional[str]) -> float:
+    """Bonus for the focus path itself, its subtree and (less) its ancestors."""
+    if path is None:
+        return 0.0
+    if fact_path == path:
+        return 10.0
+    if fact_path.startswith(path + "."):
+        return 6.0
+    if path.startswith(fact_path + "."):
+        return 3.0
+    return 0.0
+
+
+def _candidates(facts, artifact_id: int) -> list[tuple[float, dict, str]]:
+    """(prior, compact record, text matched against the question) for every fact."""
+    out = []
+    for r in facts.must_support(artifact_id):
+        n = f"{'' if r.min is None else r.min}..{r.max or ''}"
+        out.append((KIND_PRIOR["ms"], {"k": "ms", "p": r.path, "n": n}, r.path))
+    for r in facts.bindings(artifact_id):
+        prior = KIND_PRIOR["b"] + STRENGTH_PRIOR.get(r.strength or "", 0.0)
+        record = {"k": "b", "p": r.path, "s": r.strength, "vs": r.value_set}
+        out.append((prior, record, f"{r.path} {r.value_set or ''}"))
+    for r in facts.constraints(artifact_id):
+        prior = KIND_PRIOR["c"] + (0.5 if r.severity == "error" else 0.0)
+        if GENERIC_CONSTRAINT.match(r.key or ""):
+            prior -= 3.0
+        record = {
+            "k": "c",
+            "p": r.path,
+            "id": r.key,
+            "sev": r.severity,
+            "h": _clip(r.human, TEXT_LENGTH),
+            "x": _clip(r.expression, EXPRESSION_LENGTH),
+        }
+        out.append((prior, record, f"{r.path} {r.key} {r.human or ''}"))
+    for r in facts.element_texts(artifact_id):
+        text = r.short or r.definition
+        if not text:
+            continue
+        record = {"k": "d", "p": r.path, "t": _clip(text, TEXT_LENGTH)}
+        out.append((KIND_PRIOR["d"], record, f"{r.path} {r.short or ''} {r.definition or ''}"))
+    return out
+
+
+def assemble(
+    facts, artifact_id: int, terms: list[str], path: Optional[str], budget: int
+) -> tuple[list[dict], int, dict]:
+    """(packed records best first, their estimated tokens, omitted count per kind)."""
+    wanted = set(terms)
+    ranked = []
+    for order, (prior, record, text) in enumerate(_candidates(facts, artifact_id)):
+        score = prior + _focus(record["p"], path)
+        if wanted:
+            score += TERM_WEIGHT * len(wanted.intersection(tokenize(text)))
+        ranked.append((-score, record["p"].count("."), order, record))
+    ranked.sort(key=lambda c: c[:3])
+
+    packed, used, omitted = [], 0, Counter()
+    for *_, record in ranked:
+        record = {k: v for k, v in record.items() if v is not None}
+        cost = estimate_tokens(record)
+        if used + cost > budget:
+            omitted[record["k"]] += 1
+            continue  # a smaller record further down may still fit
+        packed.append(record)
+        used += cost
+    return packed, used, dict(omitted)
+
+
+def cached_assemble(
+    facts, artifact_id: int, generation, terms: list[str], path: Optional[str], budget: int
+) -> tuple[tuple[list[dict], int, dict], bool]:
+    """assemble() through EVIDENCE_CACHE; the flag is True on a cache hit."""
+    computed = []
+
+    def compute():
+        computed.append(True)
+        return assemble(facts, artifact_id, terms, path, budget)
+
+    key = ("evidence", artifact_id, generation, budget, path, tuple(sorted(set(terms))))
+    return EVIDENCE_CACHE.get_or_compute(key, compute), not computed
@@ -0,0 +1,1048 @@
+"""Graph queries behind the /gq/* endpoints, independent of any transport.
+
+Each function takes a facts engine (DbFacts, MemoryFacts or SnapshotFacts) plus plain
+arguments and returns the JSON-ready response. The FastAPI app wraps them in routes and the
+MCP server can call them in-process; failures raise ServiceError with an HTTP status code.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import Any, Optional
+
+from app.facts.aliases import ProfileAliasStore
+from app.facts.diff import FACT_KINDS
+from app.facts.memory import summarize_usages
+from app.facts.search_index import tokenize
+from app.facts.slot_terms import SlotTermsStore
+from app.service import evidence as evidence_bundle
+
+# Request bounds, shared with the FastAPI Query declarations so in-process callers (the MCP
+# server) are held to the same limits.
+ELEMENT_MATCHES = ("exact", "prefix", "fuzzy")
+CONSTRAINTS_SEARCH_MAX_LIMIT = 200
+SEARCH_MAX_LIMIT = 100
+ELEMENTS_SEARCH_MAX_LIMIT = 200
+RESOLVE_MAX_LIMIT = 50
+BULK_MAX_VALUE_SETS = 1000
+EVIDENCE_MIN_BUDGET = 100
+EVIDENCE_MAX_BUDGET = 20000
+
+
+class ServiceError(Exception):
+    """A query that cannot be answered; status_code follows HTTP (400, 404, 409, 503)."""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _check_range(name: str, value: int, low: int, high: Optional[int] = None) -> None:
+    if value < low or (high is not None and value > high):
+        bound = f"between {low} and {high}" if high is not None else f"at least {low}"
+        raise ServiceError(status_code=400, detail=f"{name} must be {bound}")
+
+
+def _alias_candidates(matches) -> list:
+    return [
+        {
+            "canonical_url": m.profile.canonical_url,
+            "version": m.profile.version,
+            "name": m.profile.name,
+            "title": m.profile.title,
+            "ig": m.profile.ig,
+            "ig_version": m.profile.ig_version,
+            "match": m.match,
+            "score": m.score,
+        }
+        for m in matches
+    ]
+
+
+def resolve_canonical(
+    aliases: ProfileAliasStore, canonical: Optional[str], profile: Optional[str]
+) -> str:
+    """canonical itself, or the canonical profile (a name, title or id) resolves to."""
+    if canonical:
+        return canonical
+    if not profile:
+        raise ServiceError(status_code=400, detail="Provide canonical or profile")
+    matches = aliases.index().resolve(profile, limit=5)
+    if not matches:
+        raise ServiceError(status_code=404, detail=f"No profile matches {profile!r}")
+    top = [m for m in matches if m.score == matches[0].score]
+    if len({m.profile.canonical_url for m in top}) > 1:
+        raise ServiceError(
+            status_code=409,
+            detail={
+                "message": f"{profile!r} is ambiguous",
+                "candidates": _alias_candidates(matches),
+            },
+        )
+    return matches[0].profile.canonical_url
+
+
+def _resolve_artifact(facts, canonical: str, version: Optional[str]):
+    result = facts.resolve_artifact(canonical, version)
+    if not result:
+        raise ServiceError(status_code=404, detail="Artifact not found for canonical/version")
+    artifact, pkg = result
+    return artifact, pkg
+
+
+def _profile_ref(artifact) -> dict:
+    return {
+        "canonical_url": artifact.canonical_url,
+        "version": artifact.version,
+        "name": artifact.name,
+        "sd_type": artifact.sd_type,
+        "file_path": artifact.file_path,
+    }
+
+
+def _inherited_usages(facts, rows, usage_fields, overrides=None) -> list:
+    """Usages inherited by descendants of each profile in rows (transitive where-used).
+
+    A descendant with its own usage at the same path is already a direct usage; one for which
+    overrides(artifact_id, path) is true has replaced the inherited definition.
+    """
+    direct = {(r.artifact_id, r.path) for r in rows}
+    inherited = []
+    by_artifact: dict[int, list] = {}
+    for r in rows:
+        by_artifact.setdefault(r.artifact_id, []).append(r)
+    for artifact_id, usages in by_artifact.items():
+        for depth, descendant in facts.descendants(artifact_id):
+            for r in usages:
+                if (descendant.id, r.path) in direct or (
+                    overrides is not None and overrides(descendant.id, r.path)
+                ):
+                    continue
+                inherited.append(
+                    {
+                        "profile": _profile_ref(descendant),
+                        "path": r.path,
+                        **usage_fields(r),
+                        "inherited_from": {"canonical_url": r.canonical_url, "version": r.version},
+                        "depth": depth,
+                    }
+                )
+    return inherited
+
+
+def must_support(
+    facts, canonical: str, version: Optional[str] = None, path_prefix: Optional[str] = None
+) -> dict:
+    artifact, pkg = _resolve_artifact(facts, canonical, version)
+    paths = facts.must_support(artifact.id, path_prefix=path_prefix or None)
+    if not paths:
+        raise ServiceError(status_code=404, detail="No mustSupport elements found for this profile")
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-MS-01",
+        "question": "List mustSupport paths",
+        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
+        "profile": {
+            "canonical_url": artifact.canonical_url,
+            "version": artifact.version,
+            "name": artifact.name,
+            "sd_type": artifact.sd_type,
+        },
+        "path_prefix": path_prefix,
+        "must_support_paths": [{"path": row.path, "min": row.min, "max": row.max} for row in paths],
+        "generated_at": generated_at,
+    }
+
+
+def bindings(facts, canonical: str, path: str, version: Optional[str] = None) -> dict:
+    artifact, pkg = _resolve_artifact(facts, canonical, version)
+    bindings = sorted(facts.bindings(artifact.id, path), key=lambda r: r.value_set)
+    if not bindings:
+        raise ServiceError(status_code=404, detail="No bindings found for this path")
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-BIND-01",
+        "question": "List bindings for path",
+        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
+        "profile": {
+            "canonical_url": artifact.canonical_url,
+            "version": artifact.version,
+            "name": artifact.name,
+            "sd_type": artifact.sd_type,
+            "file_path": artifact.file_path,
+        },
+        "path": path,
+        "bindings": [
+            {"strength": row.strength, "value_set": row.value_set, "source": row.source_choice}
+            for row in bindings
+        ],
+        "generated_at": generated_at,
+    }
+
+
+def constraints(
+    facts,
+    canonical: str,
+    version: Optional[str] = None,
+    path: Optional[str] = None,
+    path_prefix: Optional[str] = None,
+) -> dict:
+    artifact, pkg = _resolve_artifact(facts, canonical, version)
+    rows = facts.constraints(artifact.id, path or None, path_prefix=path_prefix or None)
+    if not rows:
+        raise ServiceError(status_code=404, detail="No constraints found for this profile/path")
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    if path:
+        question = "List constraints for path"
+    elif path_prefix:
+        question = "List constraints for subtree"
+    else:
+        question = "List constraints for profile"
+    return {
+        "query_id": "PSCA-GQ-CONSTR-01",
+        "question": question,
+        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
+        "profile": {
+            "canonical_url": artifact.canonical_url,
+            "version": artifact.version,
+            "name": artifact.name,
+            "sd_type": artifact.sd_type,
+            "file_path": artifact.file_path,
+        },
+        "path": path,
+        "path_prefix": path_prefix,
+        "constraints": [
+            {
+                "path": r.path,
+                "key": r.key,
+                "severity": r.severity,
+                "human": r.human,
+                "expression": r.expression,
+                "source": r.source_choice,
+            }
+            for r in rows
+        ],
+        "generated_at": generated_at,
+    }
+
+
+def constraints_search(
+    facts,
+    q: Optional[str] = None,
+    expression: Optional[str] = None,
+    ig: Optional[str] = None,
+    ig_version: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> dict:
+    if not q and not expression:
+        raise ServiceError(status_code=400, detail="Provide q and/or expression")
+    _check_range("limit", limit, 1, CONSTRAINTS_SEARCH_MAX_LIMIT)
+    _check_range("offset", offset, 0)
+    total, rows = facts.search_constraints(
+        q or None, expression or None, ig=ig, ig_version=ig_version, limit=limit, offset=offset
+    )
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-CONSTR-SEARCH-01",
+        "question": "Which constraints mention this text or expression",
+        "scope": {"ig": ig, "ig_version": ig_version},
+        "query": {"q": q, "expression": expression},
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "constraints": [
+            {
+                "profile": {
+                    "canonical_url": r.canonical_url,
+                    "version": r.version,
+                    "name": r.name,
+                    "sd_type": r.sd_type,
+                    "ig": r.ig,
+                    "ig_version": r.ig_version,
+                },
+                "path": r.path,
+                "key": r.key,
+                "severity": r.severity,
+                "human": r.human,
+                "expression": r.expression,
+                "source": r.source_choice,
+                "rank": r.rank,
+            }
+            for r in rows
+        ],
+        "generated_at": generated_at,
+    }
+
+
+def search(
+    facts,
+    q: str,
+    ig: Optional[str] = None,
+    ig_version: Optional[str] = None,
+    limit: int = 10,
+) -> dict:
+    _check_range("limit", limit, 1, SEARCH_MAX_LIMIT)
+    terms = list(dict.fromkeys(tokenize(q)))
+    if not terms:
+        raise ServiceError(status_code=400, detail="q has no searchable terms")
+    hits = facts.search_text(terms, ig=ig, ig_version=ig_version, limit=limit)
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-SEARCH-01",
+        "question": "Which elements and constraints are described by this text?",
+        "scope": {"ig": ig, "ig_version": ig_version},
+        "q": q,
+        "terms": terms,
+        "limit": limit,
+        "results": [
+            {
+                "profile": {
+                    "canonical_url": h.canonical_url,
+                    "version": h.version,
+                    "name": h.name,
+                    "sd_type": h.sd_type,
+                    "ig": h.ig,
+                    "ig_version": h.ig_version,
+                },
+                "path": h.path,
+                "kind": h.kind,
+                "key": h.key,
+                "text": h.snippet,
+                "score": round(h.score, 4),
+            }
+            for h in hits
+        ],
+        "generated_at": generated_at,
+    }
+
+
+def elements(
+    facts,
+    canonical: str,
+    version: Optional[str] = None,
+    path_prefix: Optional[str] = None,
+    must_support_only: bool = False,
+) -> dict:
+    artifact, pkg = _resolve_artifact(facts, canonical, version)
+    rows = facts.elements(
+        artifact.id, path_prefix=path_prefix or None, must_support_only=must_support_only
+    )
+    if not rows:
+        raise ServiceError(status_code=404, detail="No elements found for this profile/subtree")
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-ELEMENTS-01",
+        "question": "List elements for subtree" if path_prefix else "List elements for profile",
+        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
+        "profile": {
+            "canonical_url": artifact.canonical_url,
+            "version": artifact.version,
+            "name": artifact.name,
+            "sd_type": artifact.sd_type,
+        },
+        "path_prefix": path_prefix,
+        "must_support_only": must_support_only,
+        "elements": [
+            {"path": r.path, "min": r.min, "max": r.max, "must_support": r.must_support}
+            for r in rows
+        ],
+        "count": len(rows),
+        "generated_at": generated_at,
+    }
+
+
+def elements_search(
+    facts,
+    path: str,
+    match: str = "exact",
+    must_support: Optional[bool] = None,
+    card_min: Optional[int] = None,
+    card_max: Optional[str] = None,
+    ig: Optional[str] = None,
+    ig_version: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> dict:
+    if match not in ELEMENT_MATCHES:
+        raise ServiceError(
+            status_code=400, detail=f"match must be one of {', '.join(ELEMENT_MATCHES)}"
+        )
+    _check_range("limit", limit, 1, ELEMENTS_SEARCH_MAX_LIMIT)
+    _check_range("offset", offset, 0)
+    total, rows = facts.search_elements(
+        path,
+        match=match,
+        must_support=must_support,
+        card_min=card_min,
+        card_max=card_max,
+        ig=ig,
+        ig_version=ig_version,
+        limit=limit,
+        offset=offset,
+    )
+
+    profiles = []
+    for _artifact_id, group in groupby(rows, key=lambda r: r.artifact_id):
+        group = list(group)
+        first = group[0]
+        profiles.append(
+            {
+                "canonical_url": first.canonical_url,
+                "version": first.version,
+                "name": first.name,
+                "sd_type": first.sd_type,
+                "ig": first.ig,
+                "ig_version": first.ig_version,
+                "elements": [
+                    {"path": r.path, "min": r.min, "max": r.max, "must_support": r.must_support}
+                    for r in group
+                ],
+            }
+        )
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-ELEMENT-SEARCH-01",
+        "question": "Which profiles constrain this element path",
+        "scope": {"ig": ig, "ig_version": ig_version},
+        "query": {
+            "path": path,
+            "match": match,
+            "must_support": must_support,
+            "min": card_min,
+            "max": card_max,
+        },
+        "total_profiles": total,
+        "limit": limit,
+        "offset": offset,
+        "profiles": profiles,
+        "generated_at": generated_at,
+    }
+
+
+def _value_set_usage(r) -> dict:
+    return {
+        "profile": _profile_ref(r),
+        "path": r.path,
+        "strength": r.strength,
+        "source": r.source_choice,
+    }
+
+
+def value_set_where_used(
+    facts, value_set: str, ig: str = "ps-ca", ig_version: str = "2.1.1", transitive: bool = False
+) -> dict:
+    pkg = facts.find_package(ig, ig_version)
+    if not pkg:
+        raise ServiceError(status_code=404, detail="Package not found")
+
+    rows = facts.value_set_usages(pkg.id, value_set)
+    if not rows:
+        raise ServiceError(status_code=404, detail="ValueSet not used in this IG/version")
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-VS-WHEREUSED-01",
+        "question": "Where is this ValueSet used?",
+        "scope": {"ig": ig, "ig_version": ig_version},
+        "value_set": value_set,
+        "usages": [_value_set_usage(r) for r in rows],
+        "inherited_usages": (
+            _inherited_usages(
+                facts,
+                rows,
+                lambda r: {"strength": r.strength, "source": r.source_choice},
+                # A descendant binding the path to another ValueSet no longer uses this one.
+                overrides=lambda artifact_id, path: bool(
+                    facts.bindings(artifact_id, path, limit=1)
+                ),
+            )
+            if transitive
+            else None
+        ),
+        "generated_at": generated_at,
+    }
+
+
+def _value_set_matches(requested: str, bound: set[str]) -> list[str]:
+    """Binding values a requested canonical covers.
+
+    A bare URL covers the unversioned binding and every url|version; url|version covers
+    itself and the unversioned binding (which resolves to whatever version is current).
+    """
+    url, _, version = requested.partition("|")
+    if version:
+        return [v for v in (requested, url) if v in bound]
+    return sorted(v for v in bound if v == url or v.startswith(url + "|"))
+
+
+def value_set_where_used_bulk(
+    facts, value_sets: list[str], ig: str = "ps-ca", ig_version: str = "2.1.1"
+) -> dict:
+    _check_range("Number of value_sets", len(value_sets), 1, BULK_MAX_VALUE_SETS)
+    pkg = facts.find_package(ig, ig_version)
+    if not pkg:
+        raise ServiceError(status_code=404, detail="Package not found")
+
+    requested = list(dict.fromkeys(value_sets))
+    exact, any_version = set(), set()
+    for vs in requested:
+        url, _, version = vs.partition("|")
+        if version:
+            exact.update((vs, url))
+        else:
+            any_version.add(url)
+    usages = facts.value_set_usages_many(pkg.id, sorted(exact), any_version=sorted(any_version))
+    bound = set(usages)
+    matches = {vs: _value_set_matches(vs, bound) for vs in requested}
+
+    value_sets = []
+    not_used = []
+    for vs in requested:
+        rows = [(v, r) for v in matches[vs] for r in usages.get(v, ())]
+        if not rows:
+            not_used.append(vs)
+            continue
+        counts = summarize_usages(vs, [r for _v, r in rows])
+        value_sets.append(
+            {
+                "value_set": vs,
+                "matched": matches[vs],
+                "counts": {
+                    "required": counts.required_count,
+                    "extensible": counts.extensible_count,
+                    "preferred": counts.preferred_count,
+                    "example": counts.example_count,
+                    "other": counts.other_count,
+                    "total": counts.total_count,
+                },
+                "profiles": counts.profile_count,
+                "usages": [{**_value_set_usage(r), "value_set": v} for v, r in rows],
+            }
+        )
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-VS-WHEREUSED-BULK-01",
+        "question": "Where are these ValueSets used?",
+        "scope": {"ig": ig, "ig_version": ig_version},
+        "value_sets": value_sets,
+        "not_used": not_used,
+        "counts": {
+            "requested": len(requested),
+            "used": len(value_sets),
+            "not_used": len(not_used),
+            "usages": sum(v["counts"]["total"] for v in value_sets),
+        },
+        "generated_at": generated_at,
+    }
+
+
+def _type_ref_where_used(facts, ig: str, ig_version: str, canonical: str, extension: bool):
+    pkg = facts.find_package(ig, ig_version)
+    if not pkg:
+        raise ServiceError(status_code=404, detail="Package not found")
+    return facts.type_ref_usages(pkg.id, canonical, extension)
+
+
+def _type_ref_fields(r) -> dict:
+    return {"type": r.code, "kind": r.kind}
+
+
+def _type_ref_usage_rows(rows) -> list:
+    return [{"profile": _profile_ref(r), "path": r.path, **_type_ref_fields(r)} for r in rows]
+
+
+def profiles_resolve(
+    aliases: ProfileAliasStore,
+    q: str,
+    ig: Optional[str] = None,
+    ig_version: Optional[str] = None,
+    limit: int = 10,
+) -> dict:
+    if not q:
+        raise ServiceError(status_code=400, detail="q must not be empty")
+    _check_range("limit", limit, 1, RESOLVE_MAX_LIMIT)
+    matches = aliases.index().resolve(q, ig=ig, ig_version=ig_version, limit=limit)
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-PROFILE-RESOLVE-01",
+        "question": "Which profile is this?",
+        "scope": {"ig": ig, "ig_version": ig_version},
+        "q": q,
+        "matches": _alias_candidates(matches),
+        "generated_at": generated_at,
+    }
+
+
+def slot_terms(store: SlotTermsStore) -> dict:
+    terms = store.terms()
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-SLOT-TERMS-01",
+        "question": "Which names, paths and ValueSets can a question mention?",
+        "generation": [list(g) for g in terms.generation],
+        "profiles": [p._asdict() for p in terms.profiles],
+        "paths": list(terms.paths),
+        "value_sets": list(terms.value_sets),
+        "generated_at": generated_at,
+    }
+
+
+def lineage(facts, canonical: str, version: Optional[str] = None) -> dict:
+    artifact, pkg = _resolve_artifact(facts, canonical, version)
+    ancestors = facts.lineage(artifact.id)
+    top = ancestors[-1][1] if ancestors else artifact
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-11",
+        "question": "What does this profile derive from?",
+        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
+        "profile": _profile_ref(artifact),
+        "ancestors": [
+            {"depth": depth, **_profile_ref(a), "base_definition": a.base_definition}
+            for depth, a in ancestors
+        ],
+        # The chain ends where baseDefinition points outside the loaded packages (e.g. core FHIR).
+        "external_base": top.base_definition,
+        "generated_at": generated_at,
+    }
+
+
+def descendants(facts, canonical: str, version: Optional[str] = None) -> dict:
+    artifact, pkg = _resolve_artifact(facts, canonical, version)
+    descendants = facts.descendants(artifact.id)
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-DESCENDANTS-01",
+        "question": "What inherits from this profile?",
+        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
+        "profile": _profile_ref(artifact),
+        "descendants": [{"depth": depth, **_profile_ref(a)} for depth, a in descendants],
+        "count": len(descendants),
+        "generated_at": generated_at,
+    }
+
+
+def _diff_or_503(result):
+    if result is None:
+        raise ServiceError(status_code=503, detail="Version diffs need the database")
+    return result
+
+
+def _grouped_changes(changes) -> tuple[dict, dict]:
+    """Fact changes by kind as added/removed/changed lists, plus their counts."""
+    grouped = {kind: {"added": [], "removed": [], "changed": []} for kind in FACT_KINDS}
+    for c in changes:
+        entry = {"path": c.path, **c.key}
+        if c.before is None:
+            grouped[c.kind]["added"].append({**entry, **c.after})
+        elif c.after is None:
+            grouped[c.kind]["removed"].append({**entry, **c.before})
+        else:
+            fields = [f for f in c.after if c.before[f] != c.after[f]]
+            grouped[c.kind]["changed"].append(
+                {**entry, "changed_fields": fields, "before": c.before, "after": c.after}
+            )
+    counts = {kind: {k: len(v) for k, v in lists.items()} for kind, lists in grouped.items()}
+    return grouped, counts
+
+
+def diff_profile(
+    facts, canonical: str, from_version: str, to_version: Optional[str] = None
+) -> dict:
+    old, old_pkg = _resolve_artifact(facts, canonical, from_version)
+    new, new_pkg = _resolve_artifact(facts, canonical, to_version)
+    changes, counts = _grouped_changes(_diff_or_503(facts.diff_profiles(old.id, new.id)))
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-DIFF-PROFILE-01",
+        "question": "What changed in this profile between two versions?",
+        "from": {"ig": old_pkg.ig, "ig_version": old_pkg.ig_version, **_profile_ref(old)},
+        "to": {"ig": new_pkg.ig, "ig_version": new_pkg.ig_version, **_profile_ref(new)},
+        "changes": changes,
+        "counts": counts,
+        "generated_at": generated_at,
+    }
+
+
+def diff_package(
+    facts, from_version: str, to_version: str, ig: str = "ps-ca", include_changes: bool = True
+) -> dict:
+    old_pkg = facts.find_package(ig, from_version)
+    new_pkg = facts.find_package(ig, to_version)
+    if not old_pkg or not new_pkg:
+        raise ServiceError(status_code=404, detail="Package not found")
+
+    diff = _diff_or_503(facts.diff_packages(old_pkg.id, new_pkg.id))
+    # Changes come ordered by fact kind, then profile; regroup per profile.
+    by_pair = {}
+    for c in diff.changes:
+        by_pair.setdefault(c.pair_id, []).append(c)
+    profiles_changed = []
+    for pair in diff.pairs:
+        if pair.pair_id not in by_pair:
+            continue
+        changes, counts = _grouped_changes(by_pair[pair.pair_id])
+        profiles_changed.append(
+            {
+                "canonical_url": pair.canonical_url,
+                "from_version": pair.from_version,
+                "to_version": pair.to_version,
+                "counts": counts,
+                "changes": changes if include_changes else None,
+            }
+        )
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-DIFF-PACKAGE-01",
+        "question": "What changed in this IG between two versions?",
+        "scope": {"ig": ig, "from_version": from_version, "to_version": to_version},
+        "profiles_added": [{"canonical_url": u, "version": v} for u, v in diff.profiles_added],
+        "profiles_removed": [{"canonical_url": u, "version": v} for u, v in diff.profiles_removed],
+        "profiles_changed": profiles_changed,
+        "counts": {
+            "profiles_added": len(diff.profiles_added),
+            "profiles_removed": len(diff.profiles_removed),
+            "profiles_changed": len(profiles_changed),
+            "profiles_unchanged": len(diff.pairs) - len(profiles_changed),
+        },
+        "generated_at": generated_at,
+    }
+
+
+def profile_where_used(
+    facts, canonical: str, ig: str = "ps-ca", ig_version: str = "2.1.1", transitive: bool = False
+) -> dict:
+    rows = _type_ref_where_used(facts, ig, ig_version, canonical, extension=False)
+    if not rows:
+        raise ServiceError(status_code=404, detail="Profile not referenced in this IG/version")
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-PROFILE-WHEREUSED-01",
+        "question": "Which elements reference this profile (type profile or targetProfile)?",
+        "scope": {"ig": ig, "ig_version": ig_version},
+        "canonical": canonical,
+        "usages": _type_ref_usage_rows(rows),
+        "inherited_usages": (
+            _inherited_usages(facts, rows, _type_ref_fields) if transitive else None
+        ),
+        "generated_at": generated_at,
+    }
+
+
+def extension_where_used(
+    facts, canonical: str, ig: str = "ps-ca", ig_version: str = "2.1.1", transitive: bool = False
+) -> dict:
+    rows = _type_ref_where_used(facts, ig, ig_version, canonical, extension=True)
+    if not rows:
+        raise ServiceError(status_code=404, detail="Extension not used in this IG/version")
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-EXT-WHEREUSED-01",
+        "question": "Where is this extension used?",
+        "scope": {"ig": ig, "ig_version": ig_version},
+        "canonical": canonical,
+        "usages": _type_ref_usage_rows(rows),
+        "inherited_usages": (
+            _inherited_usages(facts, rows, _type_ref_fields) if transitive else None
+        ),
+        "generated_at": generated_at,
+    }
+
+
+def value_set_usage_matrix(facts, ig: str = "ps-ca", ig_version: str = "2.1.1") -> dict:
+    pkg = facts.find_package(ig, ig_version)
+    if not pkg:
+        raise ServiceError(status_code=404, detail="Package not found")
+
+    rows = facts.value_set_usage_matrix(pkg.id)
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-VS-USAGE-MATRIX-01",
+        "question": "How is each ValueSet used, by binding strength?",
+        "scope": {"ig": ig, "ig_version": ig_version},
+        "value_sets": [
+            {
+                "value_set": r.value_set,
+                "counts": {
+                    "required": r.required_count,
+                    "extensible": r.extensible_count,
+                    "preferred": r.preferred_count,
+                    "example": r.example_count,
+                    "other": r.other_count,
+                    "total": r.total_count,
+                },
+                "profiles": r.profile_count,
+            }
+            for r in rows
+        ],
+        "generated_at": generated_at,
+    }
+
+
+def profile_summary(
+    facts, canonical: str, version: Optional[str] = None, include_all: bool = False
+) -> dict:
+    artifact, pkg = _resolve_artifact(facts, canonical, version)
+
+    # Counts
+    ms_count, bind_count, constr_count = facts.fact_counts(artifact.id)
+
+    # Tops (deterministic)
+    limit_val = None if include_all else 10
+    ms_top = facts.must_support(artifact.id, limit=limit_val)
+    bind_top = facts.bindings(artifact.id, limit=limit_val)
+    constr_top = facts.constraints(artifact.id, limit=limit_val)
+
+    has_more_ms = False if include_all else ms_count > len(ms_top)
+    has_more_bind = False if include_all else bind_count > len(bind_top)
+    has_more_constr = False if include_all else constr_count > len(constr_top)
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-MCP-PROFILE-SUMMARY-01",
+        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
+        "profile": {
+            "canonical_url": artifact.canonical_url,
+            "version": artifact.version,
+            "name": artifact.name,
+            "sd_type": artifact.sd_type,
+            "title": artifact.title,
+            "base_definition": artifact.base_definition,
+            "file_path": artifact.file_path,
+        },
+        "counts": {
+            "must_support_paths": ms_count,
+            "bindings": bind_count,
+            "constraints": constr_count,
+        },
+        "top_limit": None if include_all else 10,
+        "top": {
+            "must_support_paths": [{"path": r.path, "min": r.min, "max": r.max} for r in ms_top],
+            "must_support_paths_paths": [r.path for r in ms_top],
+            "bindings": [
+                {
+                    "path": r.path,
+                    "strength": r.strength,
+                    "value_set": r.value_set,
+                    "source": r.source_choice,
+                }
+                for r in bind_top
+            ],
+            "constraints": [
+                {
+                    "path": r.path,
+                    "key": r.key,
+                    "severity": r.severity,
+                    "human": r.human,
+                    "expression": r.expression,
+                    "source": r.source_choice,
+                }
+                for r in constr_top
+            ],
+        },
+        "has_more": {
+            "must_support_paths": has_more_ms,
+            "bindings": has_more_bind,
+            "constraints": has_more_constr,
+        },
+        "generated_at": generated_at,
+    }
+
+
+def _profile_block(artifact) -> dict:
+    return {
+        "canonical_url": artifact.canonical_url,
+        "version": artifact.version,
+        "name": artifact.name,
+        "sd_type": artifact.sd_type,
+        "title": artifact.title,
+        "base_definition": artifact.base_definition,
+    }
+
+
+def _binding_detail(b) -> dict:
+    return {"strength": b.strength, "value_set": b.value_set, "source": b.source_choice}
+
+
+def _constraint_detail(c) -> dict:
+    return {
+        "key": c.key,
+        "severity": c.severity,
+        "human": c.human,
+        "expression": c.expression,
+        "source": c.source_choice,
+    }
+
+
+def element_details(
+    facts,
+    canonical: str,
+    path: str,
+    version: Optional[str] = None,
+    include_profile_summary: bool = True,
+    include_raw: bool = False,
+) -> dict:
+    artifact, pkg = _resolve_artifact(facts, canonical, version)
+
+    element_row = facts.element(artifact.id, path)
+    if not element_row:
+        raise ServiceError(status_code=404, detail="Element not found for this profile")
+
+    bindings = facts.bindings(artifact.id, path)
+    constraints = facts.constraints(artifact.id, path)
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+
+    profile_block = _profile_block(artifact) if include_profile_summary else None
+
+    return {
+        "query_id": "PSCA-MCP-ELEMENT-DETAILS-01",
+        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
+        "profile": profile_block,
+        "element": {
+            "path": element_row.path,
+            "must_support": element_row.must_support,
+            "min": element_row.min,
+            "max": element_row.max,
+            "json": facts.element_json(artifact.id, path) if include_raw else None,
+        },
+        "bindings": [_binding_detail(b) for b in bindings],
+        "constraints": [_constraint_detail(c) for c in constraints],
+        "counts": {
+            "bindings": len(bindings),
+            "constraints": len(constraints),
+        },
+        "generated_at": generated_at,
+    }
+
+
+def element_details_batch(
+    facts,
+    canonical: str,
+    path: Optional[list[str]] = None,
+    version: Optional[str] = None,
+    must_support_only: bool = False,
+    include_profile_summary: bool = True,
+) -> dict:
+    artifact, pkg = _resolve_artifact(facts, canonical, version)
+
+    # One query per fact kind (path = ANY(:paths)), assembled per path here.
+    paths = list(dict.fromkeys(path)) if path else None
+    element_rows = facts.elements(artifact.id, must_support_only=must_support_only, paths=paths)
+    if paths is None:
+        paths = [e.path for e in element_rows]
+    bindings = facts.bindings(artifact.id, paths=paths)
+    constraints = facts.constraints(artifact.id, paths=paths)
+
+    elements = {
+        e.path: {
+            "path": e.path,
+            "must_support": e.must_support,
+            "min": e.min,
+            "max": e.max,
+            "bindings": [],
+            "constraints": [],
+        }
+        for e in element_rows
+    }
+    for b in bindings:
+        if b.path in elements:
+            elements[b.path]["bindings"].append(_binding_detail(b))
+    for c in constraints:
+        if c.path in elements:
+            elements[c.path]["constraints"].append(_constraint_detail(c))
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-MCP-ELEMENT-DETAILS-BATCH-01",
+        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
+        "profile": _profile_block(artifact) if include_profile_summary else None,
+        "elements": elements,
+        "missing_paths": [p for p in (path or ()) if p not in elements],
+        "counts": {
+            "elements": len(elements),
+            "bindings": sum(len(e["bindings"]) for e in elements.values()),
+            "constraints": sum(len(e["constraints"]) for e in elements.values()),
+        },
+        "generated_at": generated_at,
+    }
+
+
+def evidence(
+    facts,
+    canonical: Optional[str] = None,
+    q: Optional[str] = None,
+    path: Optional[str] = None,
+    version: Optional[str] = None,
+    ig: Optional[str] = None,
+    ig_version: Optional[str] = None,
+    budget: int = 1500,
+    include_legend: bool = True,
+) -> dict:
+    """Facts ranked for q (and/or a focus path), packed in compact records up to budget tokens.
+
+    Without canonical, the best search hit for q picks the profile (and the focus path).
+    The legend of record keys is charged against the budget; pass include_legend=False to
+    leave it out and spend the whole budget on facts. "tokens" counts both.
+    """
+    _check_range("budget", budget, EVIDENCE_MIN_BUDGET, EVIDENCE_MAX_BUDGET)
+    terms = list(dict.fromkeys(tokenize(q or "")))
+    resolved_by = "request"
+    if not canonical:
+        if not terms:
+            raise ServiceError(status_code=400, detail="Provide canonical/profile or q")
+        hits = facts.search_text(terms, ig=ig, ig_version=ig_version, limit=1)
+        if not hits:
+            raise ServiceError(status_code=404, detail="No element or constraint matches q")
+        canonical, version = hits[0].canonical_url, hits[0].version
+        path = path or hits[0].path
+        resolved_by = "search"
+    artifact, pkg = _resolve_artifact(facts, canonical, version)
+
+    legend_tokens = evidence_bundle.LEGEND_TOKENS if include_legend else 0
+    (records, used, omitted), cached = evidence_bundle.cached_assemble(
+        facts, artifact.id, (pkg.id, pkg.generation), terms, path, budget - legend_tokens
+    )
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "query_id": "PSCA-GQ-EVIDENCE-01",
+        "question": "Which facts of this profile answer the question, within a token budget?",
+        "scope": {"ig": pkg.ig, "ig_version": pkg.ig_version},
+        "profile": {
+            "canonical_url": artifact.canonical_url,
+            "version": artifact.version,
+            "name": artifact.name,
+            "sd_type": artifact.sd_type,
+        },
+        "q": q,
+        "path": path,
+        "resolved_by": resolved_by,
+        "budget": budget,
+        "tokens": used + legend_tokens,
+        "legend": evidence_bundle.LEGEND if include_legend else None,
+        "facts": records,
+        "omitted": omitted,
+        "cached": cached,
+        "generated_at": generated_at,
+    }
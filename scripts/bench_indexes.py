@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""EXPLAIN-verified benchmark for the hot /gq/* queries.
+
+For each query the script:
+- picks realistic parameters from the loaded data (busiest ValueSet, profile with the
+  most mustSupport elements / bindings / constraints),
+- runs EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) and checks that the expected index is
+  used with the expected scan: an Index Only Scan, except for the constraint listing,
+  whose unbounded human/expression text is fetched from the heap (an Index Scan),
+- times N executions and reports min / p50 / p95 in milliseconds.
+
+Index-only scans need an up-to-date visibility map, so the tables are VACUUM ANALYZEd
+first (pass --no-vacuum to skip). On a small dataset the planner may still prefer a
+sequential scan; --force-index disables seq/bitmap scans to check the index is usable.
+Exit code is 1 if any plan misses its index.
+
+Usage:
+    python scripts/bench_indexes.py [--runs 200] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+TABLES = ["sd_elements", "sd_bindings", "sd_constraints", "artifacts", "element_paths"]
+
+PARAMS_SQL = {
+    "value_set": """
+        SELECT value_set FROM sd_bindings WHERE value_set <> ''
+        GROUP BY value_set ORDER BY count(*) DESC, value_set LIMIT 1
+    """,
+    "ms_artifact": """
+        SELECT artifact_id FROM sd_elements WHERE must_support IS TRUE
+        GROUP BY artifact_id ORDER BY count(*) DESC, artifact_id LIMIT 1
+    """,
+    "binding_artifact": """
+        SELECT artifact_id FROM sd_bindings
+        GROUP BY artifact_id ORDER BY count(*) DESC, artifact_id LIMIT 1
+    """,
+    "constraint_artifact": """
+        SELECT artifact_id FROM sd_constraints
+        GROUP BY artifact_id ORDER BY count(*) DESC, artifact_id LIMIT 1
+    """,
+}
+
+# name -> (sql, parameter source, expected index, expected scan node)
+QUERIES = {
+    "value_set_where_used": (
+        """
+        SELECT a.canonical_url, a.version, a.name, a.sd_type, a.file_path,
+               p.path, b.strength, b.source_choice
+        FROM artifacts a
+        JOIN sd_bindings b ON b.artifact_id = a.id
+        JOIN element_paths p ON p.id = b.path_id
+        WHERE b.value_set = :p
+        ORDER BY a.sd_type, a.canonical_url, p.path
+        """,
+        "value_set",
+        "ix_sd_binding_value_set_covering",
+        "Index Only Scan",
+    ),
+    "must_support_list": (
+        """
+        SELECT p.path, e.min, e.max
+        FROM sd_elements e JOIN element_paths p ON p.id = e.path_id
+        WHERE e.artifact_id = :p AND e.must_support IS TRUE
+        ORDER BY p.path
+        """,
+        "ms_artifact",
+        "ix_sd_element_must_support",
+        "Index Only Scan",
+    ),
+    "must_support_count": (
+        "SELECT count(*) FROM sd_elements WHERE artifact_id = :p AND must_support IS TRUE",
+        "ms_artifact",
+        "ix_sd_element_must_support",
+        "Index Only Scan",
+    ),
+    "binding_list": (
+        """
+        SELECT p.path, b.strength, b.value_set, b.source_choice
+        FROM sd_bindings b JOIN element_paths p ON p.id = b.path_id
+        WHERE b.artifact_id = :p ORDER BY p.path, b.strength, b.value_set
+        """,
+        "binding_artifact",
+        "ix_sd_binding_listing_covering",
+        "Index Only Scan",
+    ),
+    "constraint_list": (
+        """
+        SELECT p.path, c.key, c.severity, c.human, c.expression, c.source_choice
+        FROM sd_constraints c JOIN element_paths p ON p.id = c.path_id
+        WHERE c.artifact_id = :p ORDER BY p.path, c.key
+        """,
+        "constraint_artifact",
+        "ix_sd_constraint_listing",
+        "Index Scan",
+    ),
+}
+
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--no-vacuum", action="store_true")
+    parser.add_argument("--force-index", action="store_true", help="SET enable_seqscan/bitmapscan off")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_engine(os.environ["DATABASE_URL"], pool_pre_ping=True)
+
+    if not args.no_vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for table in TABLES:
+                conn.execute(text(f"VACUUM (ANALYZE) {table}"))
+
+    report = {"runs": args.runs, "queries": {}}
+    failed = False
+    with engine.connect() as conn:
+        if args.force_index:
+            conn.execute(text("SET enable_seqscan = off"))
+            conn.execute(text("SET enable_bitmapscan = off"))
+        params = {name: conn.execute(text(sql)).scalar() for name, sql in PARAMS_SQL.items()}
+        report["params"] = params
+
+        for name, (sql, param_name, expected_index, expected_scan) in QUERIES.items():
+            value = params[param_name]
+            if value is None:
+                report["queries"][name] = {"skipped": f"no data for {param_name}"}
+                continue
+            bind = {"p": value}
+            explain = conn.execute(
+                text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), bind
+            ).scalar_one()
+            root = explain[0]["Plan"]
+            nodes = [
+                {
+                    "node": n["Node Type"],
+                    "relation": n.get("Relation Name"),
+                    "index": n.get("Index Name"),
+                    "heap_fetches": n.get("Heap Fetches"),
+                }
+                for n in _walk(root)
+                if n["Node Type"].endswith("Scan")
+            ]
+            uses_index = any(
+                n["node"] == expected_scan and n["index"] == expected_index for n in nodes
+            )
+            failed = failed or not uses_index
+
+            samples = []
+            stmt = text(sql)
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                conn.execute(stmt, bind).all()
+                samples.append((time.perf_counter() - start) * 1000)
+
+            report["queries"][name] = {
+                "expected_index": expected_index,
+                "expected_scan": expected_scan,
+                "uses_index": uses_index,
+                "scans": nodes,
+                "planning_ms": explain[0].get("Planning Time"),
+                "execution_ms": explain[0].get("Execution Time"),
+                "ms_min": round(min(samples), 3),
+                "ms_p50": round(statistics.median(samples), 3),
+                "ms_p95": round(_percentile(samples, 95), 3),
+            }
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        for name, result in report["queries"].items():
+            if "skipped" in result:
+                print(f"{name:22} SKIPPED ({result['skipped']})")
+                continue
+            status = "OK  " if result["uses_index"] else "MISS"
+            print(
+                f"{name:22} {status} {result['expected_index']:36} "
+                f"p50={result['ms_p50']:.3f}ms p95={result['ms_p95']:.3f}ms"
+            )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
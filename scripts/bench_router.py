@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""Accuracy and latency benchmark for psca_router, with a local stand-in for Ollama.
+
+The script:
+- loads tests/acceptance/psca_golden_questions.json and derives each question's expected
+  intent (from its wording, see EXPECTATIONS) and slots (canonical, path, ValueSet),
+- adds deterministic paraphrases of every golden question (--paraphrases per question),
+- starts a fake Ollama HTTP server on localhost (/api/generate) that answers with the expected
+  route after a scripted latency, and gives a wrong intent or an unparseable reply at the
+  configured rates (seeded per question, so every mode sees the same answers),
+- replays all questions through psca_router in each mode (deterministic, ollama, speculative)
+  and reports intent accuracy (primary intent; recall: anywhere in a multi-intent plan), slot
+  accuracy, fallback rate and p50/p95/p99 latency.
+
+Slots come from the router's usual sources: the slot vocabulary (GET /gq/slot-terms at
+MCP_API_BASE, or in-process with MCP_BACKEND=inprocess) and its heuristics. Without a
+reachable backend only the heuristics run, and slot accuracy drops accordingly. Tool calls
+are not executed unless --execute is given, so latency is routing time only. The router cache
+is disabled unless --cache is given.
+
+Usage:
+    python scripts/bench_router.py [--paraphrases 3] [--llm-latency-ms 300] [--json] [--out FILE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parents[1]
+GOLDEN_PATH = ROOT / "tests" / "acceptance" / "psca_golden_questions.json"
+MODES = ("deterministic", "ollama", "speculative")
+SLOTS = ("canonical", "path", "value_set")
+
+# Golden question wording -> intent the router should pick.
+EXPECTATIONS = [
+    (re.compile(r"mustSupport elements", re.I), "must_support"),
+    (re.compile(r"binding applies", re.I), "bindings"),
+    (re.compile(r"^List constraints", re.I), "constraints"),
+    (re.compile(r"bind to ValueSet", re.I), "where_used_value_set"),
+    # There is no lineage intent; the profile summary carries the baseDefinition.
+    (re.compile(r"baseDefinition chain", re.I), "profile_summary"),
+    (re.compile(r"changed vs base", re.I), "element_details"),
+]
+
+PARAPHRASES = {
+    "must_support": [
+        "Which elements of {name} are must support?",
+        "Show the mustSupport paths in {name}.",
+        "What must a system support for {name}?",
+        "must support list for {name}",
+    ],
+    "bindings": [
+        "Which value set is bound to {path} in {name}?",
+        "What is the binding strength on {path} for {name}?",
+        "Show the binding for {path} ({name}).",
+        "{name} {path} terminology binding?",
+    ],
+    "constraints": [
+        "What invariants apply to {path} in {name}?",
+        "Show the constraint rules on {path} for {name}.",
+        "Which constraints does {name} put on {path}?",
+        "{path} constraints in {name}",
+    ],
+    "where_used_value_set": [
+        "Where is ValueSet {value_set} used across the IG?",
+        "Which profiles bind {value_set}?",
+        "List the elements bound to {value_set}.",
+        "where used: {value_set}",
+    ],
+    "profile_summary": [
+        "Give me a profile summary of {name}.",
+        "Summarize {name}.",
+        "What does {name} derive from?",
+        "{name} overview",
+    ],
+    "element_details": [
+        "Tell me about element {path} in {name}.",
+        "Details for {path} in {name}?",
+        "How is {path} profiled in {name}?",
+        "{name}: {path} element",
+    ],
+}
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _rng(seed: int, *parts: str) -> random.Random:
+    digest = hashlib.sha256(":".join([str(seed), *parts]).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def load_cases(paraphrases: int, seed: int) -> list[dict]:
+    """Golden questions plus paraphrases, each with expected intent and slots."""
+    cases = []
+    for item in json.loads(GOLDEN_PATH.read_text()):
+        question = item["question"]
+        intent = next((i for pattern, i in EXPECTATIONS if pattern.search(question)), "unknown")
+        vs = re.search(r"ValueSet (\S+?)\??$", question)
+        expected = {
+            "canonical": item.get("profile_canonical_url"),
+            "path": item.get("element_path"),
+            "value_set": vs.group(1) if vs else None,
+        }
+        cases.append({"id": item["id"], "question": question, "intent": intent, "slots": expected})
+
+        name = re.search(r"\bin (\w+)", question)
+        fields = {
+            "name": name.group(1) if name else (expected["canonical"] or "").rsplit("/", 1)[-1],
+            "path": expected["path"] or "",
+            "value_set": expected["value_set"] or "",
+        }
+        templates = PARAPHRASES.get(intent, [])
+        usable = [t for t in templates if all(fields[k] for k in re.findall(r"{(\w+)}", t))]
+        picks = _rng(seed, item["id"]).sample(usable, min(paraphrases, len(usable)))
+        for n, template in enumerate(picks, 1):
+            cases.append(
+                {
+                    "id": f"{item['id']}-P{n}",
+                    "question": template.format(**fields),
+                    "intent": intent,
+                    "slots": expected,
+                }
+            )
+    return cases
+
+
+class FakeOllama:
+    """Scripted /api/generate: the expected route after latency_ms +- jitter_ms.
+
+    With probability wrong_rate the intent is wrong (confidence wrong_confidence), and with
+    fail_rate the reply is not JSON, so the router falls back. Outcomes are seeded per question.
+    """
+
+    def __init__(
+        self,
+        cases: list[dict],
+        latency_ms: float,
+        jitter_ms: float,
+        wrong_rate: float,
+        fail_rate: float,
+        wrong_confidence: float,
+        seed: int,
+    ):
+        self.cases = {c["question"]: c for c in cases}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.wrong_rate = wrong_rate
+        self.fail_rate = fail_rate
+        self.wrong_confidence = wrong_confidence
+        self.seed = seed
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "FakeOllama":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reply(self, prompt: str) -> tuple[float, str]:
+        """(seconds to wait, response text) for one prompt."""
+        match = re.search(r"Input question: (.*)", prompt)
+        question = match.group(1).strip() if match else ""
+        case = self.cases.get(question)
+        rng = _rng(self.seed, "ollama", question)
+        delay = max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        roll = rng.random()
+        if case is None or roll < self.fail_rate:
+            return delay, "I think this is about bindings."
+        intent, confidence = case["intent"], 0.9
+        if roll < self.fail_rate + self.wrong_rate:
+            others = sorted(set(PARAPHRASES) - {intent})
+            intent, confidence = rng.choice(others), self.wrong_confidence
+        route = {"intent": intent, "intents": [intent], **case["slots"], "version": None}
+        return delay, json.dumps({**route, "confidence": confidence, "notes": "fake"})
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with fake._lock:
+                    fake.requests += 1
+                delay, text = fake.reply(body.get("prompt", ""))
+                time.sleep(delay)
+                payload = json.dumps({"model": body.get("model"), "response": text, "done": True})
+                data = payload.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def run_mode(router, mode: str, cases: list[dict], execute: bool) -> tuple[dict, list[dict]]:
+    os.environ["ROUTER_MODE"] = mode
+    latencies, misses = [], []
+    intent_hits = intent_recalled = slot_hits = fallbacks = errors = 0
+    slot_checked, slot_correct = Counter(), Counter()
+    speculation = Counter()
+    for case in cases:
+        started = time.perf_counter()
+        try:
+            out = router(case["question"], execute=execute)
+        except Exception as e:  # noqa: BLE001
+            errors += 1
+            misses.append({"id": case["id"], "question": case["question"], "error": str(e)})
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        routing, info = out["routing"], out["router"]
+        fallbacks += bool(info.get("fallback_used"))
+        if info.get("speculation"):
+            speculation[info["speculation"]] += 1
+        intent_ok = routing["intent"] == case["intent"]
+        wrong_slots = []
+        for slot in SLOTS:
+            expected = case["slots"][slot]
+            if expected is None:
+                continue
+            slot_checked[slot] += 1
+            if routing["extracted"].get(slot) == expected:
+                slot_correct[slot] += 1
+            else:
+                wrong_slots.append(slot)
+        intent_hits += intent_ok
+        intent_recalled += case["intent"] in routing.get("intents", [routing["intent"]])
+        slot_hits += not wrong_slots
+        if not intent_ok or wrong_slots:
+            misses.append(
+                {
+                    "id": case["id"],
+                    "question": case["question"],
+                    "expected_intent": case["intent"],
+                    "intent": routing["intent"],
+                    "wrong_slots": {
+                        s: {"expected": case["slots"][s], "got": routing["extracted"].get(s)}
+                        for s in wrong_slots
+                    },
+                }
+            )
+
+    n = len(cases)
+    result = {
+        "questions": n,
+        "errors": errors,
+        "intent_accuracy": round(intent_hits / n, 4) if n else None,
+        "intent_recall": round(intent_recalled / n, 4) if n else None,
+        "slot_accuracy": round(slot_hits / n, 4) if n else None,
+        "slot_accuracy_by_slot": {
+            s: round(slot_correct[s] / slot_checked[s], 4) for s in SLOTS if slot_checked[s]
+        },
+        "fallback_rate": round(fallbacks / n, 4) if n else None,
+        "latency_ms": (
+            {
+                "p50": round(_percentile(latencies, 50), 3),
+                "p95": round(_percentile(latencies, 95), 3),
+                "p99": round(_percentile(latencies, 99), 3),
+                "max": round(max(latencies), 3),
+            }
+            if latencies
+            else None
+        ),
+    }
+    if speculation:
+        result["speculation"] = dict(sorted(speculation.items()))
+    return result, misses
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated router modes")
+    parser.add_argument(
+        "--paraphrases", type=int, default=3, help="Paraphrases per golden question"
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-wrong-rate", type=float, default=0.1, help="Share of wrong intents")
+    parser.add_argument("--llm-wrong-confidence", type=float, default=0.6)
+    parser.add_argument(
+        "--llm-fail-rate", type=float, default=0.05, help="Share of unparseable replies"
+    )
+    parser.add_argument(
+        "--speculative-wait", type=float, default=None, help="ROUTER_SPECULATIVE_WAIT override (s)"
+    )
+    parser.add_argument("--execute", action="store_true", help="Also run the planned tool calls")
+    parser.add_argument("--cache", action="store_true", help="Keep the router cache enabled")
+    parser.add_argument("--details", action="store_true", help="Include every miss in the report")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--out", type=Path, default=None, help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    load_dotenv()
+    cases = load_cases(args.paraphrases, args.seed)
+    fake = FakeOllama(
+        cases,
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.llm_jitter_ms,
+        wrong_rate=args.llm_wrong_rate,
+        fail_rate=args.llm_fail_rate,
+        wrong_confidence=args.llm_wrong_confidence,
+        seed=args.seed,
+    ).start()
+
+    # The server module reads these at import time.
+    os.environ["OLLAMA_URL"] = fake.url
+    if not args.cache:
+        os.environ["ROUTER_CACHE"] = "0"
+    if args.speculative_wait is not None:
+        os.environ["ROUTER_SPECULATIVE_WAIT"] = str(args.speculative_wait)
+    sys.path.insert(0, str(ROOT))
+    from app.mcp_server import server
+
+    extractor = server._slot_extractor()  # load the vocabulary outside the timed calls
+    report: dict = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "questions": len(cases),
+        "golden": sum(1 for c in cases if "-P" not in c["id"]),
+        "config": {
+            "paraphrases": args.paraphrases,
+            "seed": args.seed,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_wrong_rate": args.llm_wrong_rate,
+            "llm_wrong_confidence": args.llm_wrong_confidence,
+            "llm_fail_rate": args.llm_fail_rate,
+            "speculative_wait": server.ROUTER_SPECULATIVE_WAIT,
+            "speculative_confidence": server.ROUTER_SPECULATIVE_CONFIDENCE,
+            "execute": args.execute,
+            "cache": args.cache,
+            "backend": server.MCP_BACKEND,
+        },
+        "slot_vocabulary_terms": len(extractor) if extractor is not None else None,
+        "modes": {},
+    }
+    try:
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            result, misses = run_mode(server.psca_router, mode, cases, args.execute)
+            if args.details:
+                result["misses"] = misses
+            report["modes"][mode] = result
+    finally:
+        fake.stop()
+    report["ollama_requests"] = fake.requests
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2) + "\n")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        vocabulary = report["slot_vocabulary_terms"]
+        print(
+            f"{report['questions']} questions ({report['golden']} golden), slot vocabulary: "
+            f"{vocabulary if vocabulary is not None else 'unavailable (heuristics only)'}"
+        )
+        for mode, r in report["modes"].items():
+            lat: Optional[dict] = r["latency_ms"]
+            timing = (
+                f"p50={lat['p50']:.1f}ms p95={lat['p95']:.1f}ms p99={lat['p99']:.1f}ms"
+                if lat
+                else "no timings"
+            )
+            print(
+                f"{mode:14} intent={r['intent_accuracy']:.1%} (recall {r['intent_recall']:.1%}) "
+                f"slots={r['slot_accuracy']:.1%} "
+                f"fallback={r['fallback_rate']:.1%} {timing}"
+                + (f" {r['speculation']}" if r.get("speculation") else "")
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())